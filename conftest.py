@@ -25,6 +25,24 @@ DJANGO_TEMPLATE_CONFIG = {
 }
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="run benchmarks (tests marked with `benchmark`)",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="use --benchmark to run benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
 def pytest_configure():
     settings.configure(
         DATABASES={
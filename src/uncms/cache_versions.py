@@ -0,0 +1,62 @@
+"""
+Version tokens for things which each process caches for itself.
+
+The page tree cache, the redirects cache and the HTML cache all work the same
+way: a version token, stored in the Django cache named by an option, is
+replaced whenever whatever they contain changes, and anything built from an
+older token is considered stale.
+"""
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+
+from uncms.conf import defaults
+
+
+class CacheVersion:
+    """
+    CacheVersion is a version token kept under `key`, in the Django cache
+    named by the option `setting` (e.g. "PAGE_TREE_CACHE"). It does nothing
+    if that option is not set.
+    """
+
+    def __init__(self, setting, key):
+        self.setting = setting
+        self.key = key
+
+    def get(self):
+        """
+        Returns the current version token, or None if the option is not set.
+        If there is no token (e.g. the cache has been cleared), a new one will
+        be created; this will cause everything built from an older one to be
+        considered stale.
+        """
+        alias = getattr(defaults, self.setting)
+        if not alias:
+            return None
+        cache = caches[alias]
+        version = cache.get(self.key)
+        if version is None:
+            cache.add(self.key, uuid.uuid4().hex, None)
+            version = cache.get(self.key)
+        return version
+
+    def bump(self):
+        """Marks everything built from the current token, in every process, as stale."""
+        alias = getattr(defaults, self.setting)
+        if not alias:
+            return
+        caches[alias].set(self.key, uuid.uuid4().hex, None)
+
+    def invalidate(self):
+        """
+        Bumps the token now, and again when the current transaction commits.
+        """
+        if not getattr(defaults, self.setting):
+            return
+        self.bump()
+        # Another process could rebuild from the new token between now and
+        # the end of the current transaction, and it would not see our
+        # changes. Bump it again once they are visible to everyone else.
+        transaction.on_commit(self.bump)
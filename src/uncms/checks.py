@@ -3,10 +3,31 @@ import re
 import nh3
 from django.conf import settings
 from django.core import checks
+from django.core.exceptions import FieldDoesNotExist
 from django.urls import NoReverseMatch, reverse
 from django.utils.translation import gettext_lazy as _
+from PIL import Image
+from sorl.thumbnail.base import EXTENSIONS
 
 from uncms.conf import AppSettings, defaults
+from uncms.models.fields import get_rendered_html_fields
+
+# Options which name one of settings.CACHES, and the IDs of the errors for
+# when they name one which does not exist.
+CACHE_OPTIONS = [
+    ("PAGE_TREE_CACHE", "uncms.010"),
+    ("REDIRECTS_CACHE", "uncms.011"),
+    ("HTML_CACHE", "uncms.012"),
+]
+
+
+def is_avif_supported():
+    """
+    Returns True if both Pillow (natively, or with pillow-avif-plugin) and
+    sorl-thumbnail can write AVIF images.
+    """
+    Image.init()
+    return "AVIF" in Image.SAVE and "AVIF" in EXTENSIONS
 
 
 @checks.register()
@@ -134,6 +155,46 @@ def check_django_settings(app_configs, **kwargs):
                 ),
             )
 
+    for option, check_id in CACHE_OPTIONS:
+        alias = getattr(defaults, option)
+        if alias and alias not in settings.CACHES:
+            errors.append(
+                checks.Error(
+                    _(
+                        'UNCMS["{option}"] is "{alias}", which is not in settings.CACHES'
+                    ).format(option=option, alias=alias),
+                    id=check_id,
+                ),
+            )
+
+    for name, widths in defaults.IMAGE_WIDTH_SETS.items():
+        if not (
+            isinstance(widths, (list, tuple))
+            and widths
+            and all(isinstance(width, int) and width > 0 for width in widths)
+        ):
+            errors.append(
+                checks.Error(
+                    _(
+                        'UNCMS["IMAGE_WIDTH_SETS"]["{name}"] must be a non-empty list of positive integers'
+                    ).format(name=name),
+                    id="uncms.014",
+                ),
+            )
+
+    if defaults.IMAGE_USE_AVIF and not is_avif_supported():
+        errors.append(
+            checks.Error(
+                _(
+                    'UNCMS["IMAGE_USE_AVIF"] is True, but the installed Pillow or sorl-thumbnail cannot write AVIF images'
+                ),
+                hint=_(
+                    "Upgrade to Pillow 11.2 or later (or install pillow-avif-plugin) and a recent sorl-thumbnail, or set IMAGE_USE_AVIF to False."
+                ),
+                id="uncms.015",
+            ),
+        )
+
     try:
         nh3.clean("<p>Hi</p>", **defaults.NH3_OPTIONS)
     except Exception as e:  # pylint:disable=broad-except
@@ -146,3 +207,20 @@ def check_django_settings(app_configs, **kwargs):
         )
 
     return errors
+
+
+@checks.register(checks.Tags.models)
+def check_rendered_html_fields(app_configs, **kwargs):
+    errors = []
+    for model, field in get_rendered_html_fields(app_configs):
+        try:
+            model._meta.get_field(field.rendered_field)
+        except FieldDoesNotExist:
+            errors.append(
+                checks.Error(
+                    f"rendered_field refers to the nonexistent field '{field.rendered_field}'.",
+                    obj=field,
+                    id="uncms.013",
+                )
+            )
+    return errors
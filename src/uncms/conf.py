@@ -19,12 +19,16 @@ class AppSettings:
         "BREADCRUMBS_CLASS_PREFIX": "breadcrumbs",
         "BREADCRUMBS_SHOW_TAIL": False,
         "BREADCRUMBS_TEMPLATE": "pages/breadcrumbs.{extension}",
+        "HTML_CACHE": None,
+        "HTML_CACHE_MAX_LENGTH": 250000,
         "HTML_CLEANERS": ["uncms.html.clean_html"],
         "HTML_OUTPUT_FORMATTERS": ["uncms.html.format_html"],
         "HTML_IMAGE_WIDTH": 1280,
         "IMAGE_CLASS_PREFIX": "image",
         "IMAGE_TEMPLATE": "media/multi_format_image.html",
+        "IMAGE_USE_AVIF": False,
         "IMAGE_USE_WEBP": True,
+        "IMAGE_WIDTH_SETS": {},
         "MEDIA_FILE_MODEL": "media.File",
         "MEDIA_LIST_GRID_VIEW": True,
         "MEDIA_UPLOAD_ALLOWED_EXTENSIONS": [],
@@ -123,14 +127,20 @@ class AppSettings:
             # which does not seem correct to me.
             "link_rel": None,
         },
+        "NOT_FOUND_CACHE_SIZE": 0,
+        "NOT_FOUND_CACHE_TIMEOUT": 60,
         "ONLINE_DEFAULT": True,
         "OPENGRAPH_FALLBACK_IMAGE": None,
         "PAGE_ADMIN_ANCESTORS": [],
         "PAGE_MODEL": "pages.Page",
+        "PAGE_TREE_CACHE": None,
+        "PAGE_TREE_GAP": 0,
         "PAGE_TREE_PREFETCH_DEPTH": 2,
         "PATH_SIGNING_SECRET": settings.SECRET_KEY,
         "PUBLICATION_MIDDLEWARE_EXCLUDE_URLS": [r"^/admin/"],
+        "REDIRECTS_CACHE": None,
         "REDIRECTS_CSV_IMPORT_ENABLED": True,
+        "REDIRECTS_HIT_FLUSH_INTERVAL": 60,
         "REGEX_REDIRECTS": False,
         "SITE_DOMAIN": None,
         "WYSIWYG_EXTRA_OPTIONS": {},
@@ -1,23 +1,125 @@
 """HTML processing routines."""
+import hashlib
+import time
+from functools import lru_cache
+from html.parser import HTMLParser
+
 import nh3
-from bs4 import BeautifulSoup
 from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.module_loading import import_string
 
+from uncms.cache_versions import CacheVersion
 from uncms.conf import defaults
+from uncms.signals import html_stage_finished
+
+HTML_CACHE_VERSION_KEY = "uncms.html.version"
+
+# The options which change the output of `process_html`, and so are part of
+# the keys it caches it under.
+HTML_CACHE_SETTINGS = [
+    "HTML_CLEANERS",
+    "HTML_IMAGE_WIDTH",
+    "HTML_OUTPUT_FORMATTERS",
+    "IMAGE_CLASS_PREFIX",
+    "IMAGE_TEMPLATE",
+    "IMAGE_USE_AVIF",
+    "IMAGE_USE_WEBP",
+    "MEDIA_URLS_NAMESPACE",
+    "NH3_OPTIONS",
+    "PATH_SIGNING_SECRET",
+]
 
 
 def clean_html(html):
     return nh3.clean(html, **defaults.NH3_OPTIONS)
 
 
+class HTMLPipeline:
+    """
+    HTMLPipeline runs HTML through a list of functions, given as dotted
+    paths, each of which accepts HTML and returns it. The functions are
+    imported once, when the pipeline is created, rather than on every call.
+    """
+
+    def __init__(self, name, paths):
+        self.name = name
+        self.stages = [(path, import_string(path)) for path in paths]
+
+    def __call__(self, html):
+        if not html_stage_finished.has_listeners(HTMLPipeline):
+            for _, func in self.stages:
+                html = func(html)
+            return html
+
+        for path, func in self.stages:
+            start = time.perf_counter()
+            html = func(html)
+            html_stage_finished.send(
+                sender=HTMLPipeline,
+                pipeline=self.name,
+                stage=path,
+                duration=time.perf_counter() - start,
+            )
+        return html
+
+
+@lru_cache(maxsize=16)
+def get_html_pipeline(name, paths):
+    """
+    Returns an HTMLPipeline for the functions in `paths` (a tuple). The
+    pipeline is only built again if the setting called `name` changes.
+    """
+    return HTMLPipeline(name, paths)
+
+
 def clean_all(html):
-    for cleaner in defaults.HTML_CLEANERS:
-        cleaner_func = import_string(cleaner)
-        html = cleaner_func(html)
+    return get_html_pipeline("HTML_CLEANERS", tuple(defaults.HTML_CLEANERS))(html)
+
+
+class ImageTagFinder(HTMLParser):
+    """
+    Finds every <img> tag in some HTML, without building a tree from it.
+    After `find`, `images` is a list of (offset, length, attributes) tuples,
+    one for each tag, giving where it is in the HTML.
+    """
 
-    return html
+    def __init__(self):
+        # Character references are left alone, because nothing is done with
+        # the text, and converting them would only slow things down.
+        super().__init__(convert_charrefs=False)
+        self.images = []
+        self.line_offsets = []
+
+    def find(self, text):
+        # getpos() gives a line number and a column, so we need to know
+        # where each line starts. HTMLParser only counts "\n" as a line
+        # break.
+        self.line_offsets = [0]
+        index = text.find("\n")
+        while index != -1:
+            self.line_offsets.append(index + 1)
+            index = text.find("\n", index + 1)
+        self.feed(text)
+        self.close()
+        return self.images
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "img":
+            return
+        line, column = self.getpos()
+        self.images.append(
+            (
+                self.line_offsets[line - 1] + column,
+                len(self.get_starttag_text()),
+                # A valueless attribute has a value of None.
+                {name: value or "" for name, value in attrs},
+            )
+        )
 
 
 def format_html(text):
@@ -38,61 +140,153 @@ def format_html(text):
     new_prefix = media_model(id=0).get_temporary_url()
     new_prefix = new_prefix[: new_prefix.index("0")]
 
-    soup = BeautifulSoup(text, "html.parser")
-
-    for image in soup.find_all("img"):
-        if not image.get("src"):
+    # Find every image reference first, so that the images can be fetched
+    # with a single query.
+    references = []
+    for offset, length, attrs in ImageTagFinder().find(text):
+        src = attrs.get("src")
+        if not src:
             continue
 
         image_id = None
 
         for prefix in old_prefix, new_prefix:
-            if image["src"].startswith(prefix):
-                image_id = image["src"][len(prefix) :].rstrip("/")
+            if src.startswith(prefix):
+                image_id = src[len(prefix) :].rstrip("/")
                 break
 
         if not image_id:
             continue
 
-        # Don't throw an exception if the given image does not exist.
+        # Don't throw an exception if the given ID is not a valid one.
         try:
-            obj = media_model.objects.get(pk=image_id)
-        except (media_model.DoesNotExist, ValueError):
+            image_id = media_model._meta.pk.to_python(image_id)
+        except ValidationError:
             continue
+        references.append((offset, length, attrs, image_id))
+
+    if not references:
+        return text
 
-        new_image = BeautifulSoup(
+    # Missing images are left alone.
+    objs = media_model.objects.in_bulk({image_id for _, _, _, image_id in references})
+
+    # Everything other than the images that are replaced is passed through
+    # as it is.
+    parts = []
+    position = 0
+    for offset, length, attrs, image_id in references:
+        obj = objs.get(image_id)
+        if obj is None:
+            continue
+
+        parts.append(text[position:offset])
+        parts.append(
             obj.render_multi_format(
                 width=defaults.HTML_IMAGE_WIDTH,
                 # Copy over alt text if it is present. If it is an explicit empty
                 # string, obey it - if it is not present it will be None, which
                 # render_multi_format treats as "replace with alt text from the
                 # File model".
-                alt_text=image.get("alt_text"),
-                extra_styles=image.get("style"),
-                # Copy over "class" - note BS4 returns an array for element['class']
-                extra_classes=" ".join(image.get("class", [])),
+                alt_text=attrs.get("alt_text"),
+                extra_styles=attrs.get("style"),
+                # Copy over "class", normalising the whitespace in it.
+                extra_classes=" ".join(attrs.get("class", "").split()),
                 # Copy over all attributes except "style" and "class" (those are
                 # handled above)
                 extra_attributes={
                     key: value
-                    for key, value in image.attrs.items()
+                    for key, value in attrs.items()
                     if key not in ["class", "style", "src"]
                 },
-            ),
-            "html.parser",
+            )
         )
-        image.replace_with(new_image)
+        position = offset + length
+    parts.append(text[position:])
 
-    return str(soup)
+    return "".join(parts)
 
 
 def format_all(html):
-    for formatter in defaults.HTML_OUTPUT_FORMATTERS:
-        formatter_func = import_string(formatter)
-        html = formatter_func(html)
+    return get_html_pipeline(
+        "HTML_OUTPUT_FORMATTERS", tuple(defaults.HTML_OUTPUT_FORMATTERS)
+    )(html)
+
+
+# Replaced whenever the output of `process_html` may have changed.
+html_cache_version = CacheVersion("HTML_CACHE", HTML_CACHE_VERSION_KEY)
+
+
+def invalidate_html_cache():
+    """
+    Invalidates the output of `process_html`. This is called whenever a
+    media file is saved or deleted (because formatted HTML contains
+    thumbnails of them), but must be called by anything that changes media
+    files without sending signals, or that changes how HTML is processed.
+    """
+    html_cache_version.invalidate()
+
+
+def _get_stable_repr(value):
+    """
+    Returns a representation of `value` (a setting) which is the same in
+    every process, unlike repr() of a set, or of a function.
+    """
+    if isinstance(value, dict):
+        return "{%s}" % ", ".join(
+            sorted(
+                f"{_get_stable_repr(key)}: {_get_stable_repr(item)}"
+                for key, item in value.items()
+            )
+        )
+    if isinstance(value, (set, frozenset)):
+        return "{%s}" % ", ".join(sorted(_get_stable_repr(item) for item in value))
+    if isinstance(value, (list, tuple)):
+        return "[%s]" % ", ".join(_get_stable_repr(item) for item in value)
+    if callable(value):
+        return f"{value.__module__}.{value.__qualname__}"
+    return repr(value)
 
-    return html
+
+@lru_cache(maxsize=None)
+def get_html_settings_digest():
+    """
+    Returns a hash of the HTML_CACHE_SETTINGS, so that changing any of them
+    (e.g. in a deployment) does not serve HTML processed under the old ones.
+    Settings do not change while a process is running (except in tests), so
+    this is only worked out once.
+    """
+    return hashlib.sha256(
+        _get_stable_repr(
+            {name: getattr(defaults, name) for name in HTML_CACHE_SETTINGS}
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+@receiver(setting_changed)
+def clear_html_settings_digest(**kwargs):
+    get_html_settings_digest.cache_clear()
 
 
 def process_html(html):
-    return format_all(clean_all(html))
+    """
+    Runs `html` through HTML_CLEANERS, then HTML_OUTPUT_FORMATTERS. If
+    HTML_CACHE is set, the result is cached, keyed by a hash of `html` and
+    of the settings which affect it.
+    """
+    if not html:
+        return ""
+    if not defaults.HTML_CACHE or len(html) > defaults.HTML_CACHE_MAX_LENGTH:
+        return format_all(clean_all(html))
+
+    cache = caches[defaults.HTML_CACHE]
+    key = "uncms.html.{version}.{settings}.{digest}".format(
+        version=html_cache_version.get(),
+        settings=get_html_settings_digest(),
+        digest=hashlib.sha256(html.encode("utf-8")).hexdigest(),
+    )
+    processed = cache.get(key)
+    if processed is None:
+        processed = format_all(clean_all(html))
+        cache.set(key, processed)
+    return processed
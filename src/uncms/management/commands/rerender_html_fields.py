@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from uncms.html import invalidate_html_cache
+from uncms.models.fields import rerender_html_fields
+
+
+class Command(BaseCommand):
+    help = "Clean and format the HTML stored in every HtmlField with a rendered_field again"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help=_("number of objects to render and update at once"),
+        )
+
+    def handle(self, *args, **options):
+        # The HTML is rendered again because something has changed how it is
+        # rendered, so nothing that has been cached is of any use.
+        invalidate_html_cache()
+        updated = rerender_html_fields(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(_("{updated} objects updated").format(updated=updated))
+        )
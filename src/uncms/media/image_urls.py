@@ -0,0 +1,91 @@
+"""
+Builds URLs for the image thumbnailing view without calling reverse().
+
+Rendering an image calls File.get_thumbnail for every size and format, and
+a page of images can render hundreds of thumbnails. Reversing a URL is
+surprisingly expensive, but every image_view URL has the same shape, so it
+is reversed once (per URLconf and script prefix) with placeholder values,
+and turned into a template that can be filled in with str.format.
+"""
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+from uncms.conf import defaults
+
+# The characters which reverse() does not quote.
+SAFE_CHARACTERS = RFC3986_SUBDELIMS + "/~:@"
+
+# Values for image_view's arguments which are unlikely to appear anywhere
+# else in its URL, so that they can be replaced with template fields.
+PLACEHOLDERS = {
+    "pk": 987654321987654321,
+    "width": "uncmswidthplaceholder",
+    "height": "uncmsheightplaceholder",
+    "crop": "uncmscropplaceholder",
+    "format": "uncmsformatplaceholder",
+    "colorspace": "uncmscolorspaceplaceholder",
+    "quality": "uncmsqualityplaceholder",
+}
+
+# URL templates, keyed by the namespace, URLconf and script prefix they were
+# reversed with. A template is None if one could not be made.
+_templates = {}
+
+
+def get_image_url_template():
+    """
+    Returns a template for image_view URLs, for use with str.format, or None
+    if the URL does not have the expected shape.
+    """
+    key = (
+        defaults.MEDIA_URLS_NAMESPACE,
+        get_urlconf() or settings.ROOT_URLCONF,
+        get_script_prefix(),
+    )
+    try:
+        return _templates[key]
+    except KeyError:
+        pass
+
+    url = reverse(f"{defaults.MEDIA_URLS_NAMESPACE}:image_view", kwargs=PLACEHOLDERS)
+    template = url.replace("{", "{{").replace("}", "}}")
+    for name, placeholder in PLACEHOLDERS.items():
+        if template.count(str(placeholder)) != 1:
+            template = None
+            break
+        template = template.replace(str(placeholder), f"{{{name}}}")
+    _templates[key] = template
+    return template
+
+
+@lru_cache(maxsize=1024)
+def quote_value(value):
+    # There are usually only a few distinct values (e.g. "auto" and "webp").
+    return quote(value, safe=SAFE_CHARACTERS)
+
+
+def get_image_url(pk, **kwargs):
+    """
+    Returns the same URL as reversing image_view with `pk` and `kwargs`
+    (which must be the rest of its arguments), but much more quickly.
+    """
+    template = get_image_url_template()
+    values = {name: str(value) for name, value in kwargs.items()}
+    # reverse() refuses anything that its <str> converters would not match,
+    # so let it raise the appropriate exception.
+    if (
+        template is None
+        or not isinstance(pk, int)
+        or any(value == "" or "/" in value for value in values.values())
+    ):
+        return reverse(
+            f"{defaults.MEDIA_URLS_NAMESPACE}:image_view", kwargs={"pk": pk, **kwargs}
+        )
+    return template.format(
+        pk=pk,
+        **{name: quote_value(value) for name, value in values.items()},
+    )
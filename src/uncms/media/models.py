@@ -1,4 +1,7 @@
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
@@ -7,6 +10,7 @@ from django.utils.translation import gettext_lazy as _
 from PIL import Image
 
 from uncms.conf import defaults
+from uncms.html import invalidate_html_cache
 from uncms.media.fields import FileRefField, ImageRefField, VideoFileRefField
 from uncms.media.filetypes import (
     IMAGE_MIMETYPES,
@@ -14,8 +18,10 @@ from uncms.media.filetypes import (
     is_image,
     normalised_file_extension,
 )
+from uncms.media.image_urls import get_image_url
 from uncms.media.types import MultiThumbnail, Thumbnail
 from uncms.models.base import path_token_generator
+from uncms.models.fields import get_rendered_html_fields, rerender_html_fields
 
 
 class Label(models.Model):
@@ -37,6 +43,10 @@ class Label(models.Model):
 class File(models.Model):
     """A static file."""
 
+    # The values of this file's fields when it was loaded or last saved, so
+    # that HTML which refers to it is only rendered again if they change.
+    _loaded_values = None
+
     title = models.CharField(
         max_length=200,
     )
@@ -98,6 +108,17 @@ class File(models.Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance._get_field_values()
+        return instance
+
+    def _get_field_values(self):
+        return [
+            self.__dict__.get(field.attname) for field in self._meta.concrete_fields
+        ]
+
     @cached_property
     def contents(self):
         """
@@ -183,17 +204,14 @@ class File(models.Model):
         if width == "auto" and height == "auto":
             raise ValueError("no dimensions provided - specify either height or width")
 
-        url = reverse(
-            f"{defaults.MEDIA_URLS_NAMESPACE}:image_view",
-            kwargs={
-                "pk": self.pk,
-                "width": str(width),
-                "height": str(height),
-                "crop": crop,
-                "format": fmt,
-                "colorspace": colorspace,
-                "quality": quality or "default",
-            },
+        url = get_image_url(
+            self.pk,
+            width=width,
+            height=height,
+            crop=crop,
+            format=fmt,
+            colorspace=colorspace,
+            quality=quality or "default",
         )
 
         # Now try and calculate the expected width. If they have specified
@@ -222,6 +240,41 @@ class File(models.Model):
             height=thumb_height,
         )
 
+    def get_srcset_dimensions(self, *, width="auto", height="auto", widths=None):
+        """
+        Returns a list of (width, height) pairs for each thumbnail that should
+        be in a srcset, the requested width and height first.
+
+        `widths` is a list of extra widths, or the name of one of the lists in
+        IMAGE_WIDTH_SETS. Widths larger than the image itself are left out,
+        because they would only be upscaled. If both `width` and `height` are
+        given, the heights of the others keep the same aspect ratio.
+
+        Numeric strings (e.g. from a template) are treated as numbers. If the
+        image's own width is not known, there are no extra widths.
+        """
+        width, height = (
+            value if value == "auto" else int(value) for value in (width, height)
+        )
+        dimensions = [(width, height)]
+        if widths is None or not self.width:
+            return dimensions
+        if isinstance(widths, str):
+            try:
+                widths = defaults.IMAGE_WIDTH_SETS[widths]
+            except KeyError as e:
+                raise ValueError(f'no IMAGE_WIDTH_SETS named "{widths}"') from e
+
+        for extra_width in sorted({int(extra_width) for extra_width in widths}):
+            if extra_width > self.width or extra_width == width:
+                continue
+            if width != "auto" and height != "auto":
+                extra_height = round(height * (extra_width / width))
+            else:
+                extra_height = "auto"
+            dimensions.append((extra_width, extra_height))
+        return dimensions
+
     def render_multi_format(
         self,
         *,
@@ -229,6 +282,8 @@ class File(models.Model):
         height="auto",
         colorspace="auto",
         quality=None,
+        widths=None,
+        sizes=None,
         aspect=True,
         alt_text=None,
         lazy=True,
@@ -261,20 +316,30 @@ class File(models.Model):
             context["alt_text"] = self.alt_text or ""
 
         always_args = {"colorspace": colorspace, "quality": quality}
+        dimensions = self.get_srcset_dimensions(
+            width=width, height=height, widths=widths
+        )
 
         multi = MultiThumbnail()
 
-        # Do WebP first - browsers will look at the srcset in the given order.
+        # Browsers use the first <source> whose type they support, so do the
+        # smallest formats first: AVIF, then WebP.
+        web_formats = []
+        if defaults.IMAGE_USE_AVIF:
+            web_formats.append(("image/avif", "avif"))
         if defaults.IMAGE_USE_WEBP:
-            multi.add_size(
-                "image/webp",
-                self.get_thumbnail(
-                    width=width,
-                    height=height,
-                    fmt="webp",
-                    **always_args,
-                ),
-            )
+            web_formats.append(("image/webp", "webp"))
+        for web_mime_type, fmt in web_formats:
+            for size_width, size_height in dimensions:
+                multi.add_size(
+                    web_mime_type,
+                    self.get_thumbnail(
+                        width=size_width,
+                        height=size_height,
+                        fmt=fmt,
+                        **always_args,
+                    ),
+                )
 
         original_thumb = self.get_thumbnail(
             width=width,
@@ -283,7 +348,24 @@ class File(models.Model):
             **always_args,
         )
 
-        multi.add_size(IMAGE_MIMETYPES[self.file_extension], original_thumb)
+        mime_type = IMAGE_MIMETYPES[self.file_extension]
+        multi.add_size(mime_type, original_thumb)
+        for size_width, size_height in dimensions[1:]:
+            multi.add_size(
+                mime_type,
+                self.get_thumbnail(
+                    width=size_width,
+                    height=size_height,
+                    fmt="source",
+                    **always_args,
+                ),
+            )
+
+        # Without `sizes`, browsers assume the image fills the viewport.
+        if len(multi.formats[mime_type].sizes) > 1:
+            if sizes is None and width != "auto":
+                sizes = f"(max-width: {width}px) 100vw, {width}px"
+            context["sizes"] = sizes or "100vw"
 
         # Add the "ratio" attribute so browsers can pre-size the image
         # appropriately.
@@ -302,14 +384,23 @@ class File(models.Model):
     def save(
         self, force_insert=False, force_update=False, using=None, update_fields=None
     ):
+        adding = self._state.adding
         super().save(force_insert, force_update, using, update_fields)
         if self.is_image():
             dimensions = self.get_dimensions()
 
-            if dimensions:
+            if dimensions and dimensions != (self.width, self.height):
                 self.width, self.height = dimensions
                 super().save(False, True, using=using, update_fields=update_fields)
 
+        # This is done here, rather than in a post_save receiver, so that it
+        # is done once, after the dimensions have been saved. Nothing can
+        # refer to a file which has only just been created.
+        values = self._get_field_values()
+        if not adding and values != self._loaded_values:
+            rerender_html_references(self)
+        self._loaded_values = values
+
     @cached_property
     def text_contents(self):
         """
@@ -323,6 +414,35 @@ class File(models.Model):
             return ""
 
 
+def rerender_html_references(file):
+    """
+    Renders every rendered HtmlField which refers to `file` again, because
+    its copy of the file may be out of date.
+    """
+    if not get_rendered_html_fields():
+        return
+    content_type_id = ContentType.objects.get_for_model(file).id
+    paths = [
+        file.get_temporary_url().rstrip("/"),
+        f"/r/{content_type_id}-{file.pk}",
+    ]
+    # A terminator stops e.g. file 1 from matching references to file 10.
+    rerender_html_fields(
+        references=[f"{path}{terminator}" for path in paths for terminator in "/\"'"]
+    )
+
+
+@receiver(post_save, sender=defaults.MEDIA_FILE_MODEL)
+@receiver(post_delete, sender=defaults.MEDIA_FILE_MODEL)
+def invalidate_html_cache_on_change(**kwargs):
+    invalidate_html_cache()
+
+
+@receiver(post_delete, sender=defaults.MEDIA_FILE_MODEL)
+def rerender_html_references_on_delete(sender, instance, **kwargs):
+    rerender_html_references(instance)
+
+
 __all__ = [
     "File",
     "Label",
@@ -1,6 +1,7 @@
 """Custom middleware used by the pages application."""
 
 import re
+from functools import lru_cache
 
 from django.template.response import SimpleTemplateResponse
 from django.utils.deprecation import MiddlewareMixin
@@ -11,6 +12,51 @@ from uncms.models import (
     path_token_generator,
     publication_manager,
 )
+from uncms.utils import BACKREFERENCE_RE, REGEX_SPECIAL_CHARACTERS
+
+
+@lru_cache(maxsize=None)
+def compile_exclude_urls(patterns):
+    """
+    Returns a function which tells whether a path matches any of the
+    regular expressions in `patterns` (a tuple), as with `re.match`.
+
+    Patterns which are only a fixed string (optionally starting with "^")
+    are checked with `str.startswith`; the rest are combined into a single
+    regular expression, unless they contain backreferences. This is cached,
+    so that patterns are compiled only once for each value of
+    PUBLICATION_MIDDLEWARE_EXCLUDE_URLS.
+    """
+    prefixes = []
+    expressions = []
+    compiled = []
+    for pattern in patterns:
+        prefix = pattern[1:] if pattern.startswith("^") else pattern
+        if REGEX_SPECIAL_CHARACTERS.isdisjoint(prefix):
+            prefixes.append(prefix)
+        elif BACKREFERENCE_RE.search(pattern):
+            # Backreferences by number would refer to the wrong group once
+            # the patterns are combined.
+            compiled.append(re.compile(pattern))
+        else:
+            expressions.append(pattern)
+    prefixes = tuple(prefixes)
+
+    if expressions:
+        try:
+            compiled.append(
+                re.compile("|".join(f"(?:{pattern})" for pattern in expressions))
+            )
+        except re.error:
+            # Some patterns cannot be combined, e.g. those with global flags
+            # which must come at the start of the expression.
+            compiled.extend(re.compile(pattern) for pattern in expressions)
+
+    if not compiled:
+        return lambda path: path.startswith(prefixes)
+    return lambda path: path.startswith(prefixes) or any(
+        expression.match(path) for expression in compiled
+    )
 
 
 class PublicationMiddleware(MiddlewareMixin):
@@ -20,11 +66,11 @@ class PublicationMiddleware(MiddlewareMixin):
     def process_request(self, request):
         """Starts preview mode, if available."""
 
-        exclude_urls = [
-            re.compile(url) for url in defaults.PUBLICATION_MIDDLEWARE_EXCLUDE_URLS
-        ]
+        is_excluded = compile_exclude_urls(
+            tuple(defaults.PUBLICATION_MIDDLEWARE_EXCLUDE_URLS)
+        )
 
-        if not any(pattern.match(request.path) for pattern in exclude_urls):
+        if not is_excluded(request.path):
             # See if preview mode is requested.
             try:
                 path = f"{request.path_info[1:] if request.path_info[1:] else request.path_info}"
@@ -1,4 +1,5 @@
 """Abstract base models used by the page management application."""
+from functools import lru_cache
 from urllib.parse import urlencode, urlparse
 
 from django.db import models
@@ -17,6 +18,23 @@ from uncms.models.managers import (
 )
 
 
+@lru_cache(maxsize=10000)
+def _make_path_token(key_salt, secret, path):
+    return salted_hmac(key_salt=key_salt, value=path, secret=secret).hexdigest()[::2]
+
+
+def is_plain_path(path):
+    """
+    Returns True if `path` is a local path with no query string, fragment
+    or parameters, i.e. if urlparse would return it unchanged as the path.
+    """
+    return (
+        path.startswith("/")
+        and not path.startswith("//")
+        and not any(character in path for character in "?#;")
+    )
+
+
 class PathTokenGenerator:
     """
     PathTokenGenerator is a simple token generator that takes a path and
@@ -36,17 +54,17 @@ class PathTokenGenerator:
         )
 
     def make_token(self, path):
-        return salted_hmac(
-            key_salt=self.key_salt,
-            value=path,
-            secret=defaults.PATH_SIGNING_SECRET,
-        ).hexdigest()[::2]
+        # The same paths (e.g. of thumbnails) are signed over and over again,
+        # so the most recent signatures are remembered.
+        return _make_path_token(self.key_salt, defaults.PATH_SIGNING_SECRET, path)
 
     def make_url(self, path, token_parameter="preview"):
+        query = urlencode({token_parameter: self.make_token(path)})
+        if is_plain_path(path):
+            # Nothing to parse or replace, so skip urlparse (which is slow).
+            return f"{path}?{query}"
         parsed = urlparse(path)
-        parsed = parsed._replace(
-            query=urlencode({token_parameter: self.make_token(path)})
-        )
+        parsed = parsed._replace(query=query)
         return parsed.geturl()
 
 
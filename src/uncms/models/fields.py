@@ -4,11 +4,100 @@ from urllib import parse as urlparse
 
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import class_prepared, post_save, pre_save
+from django.utils.safestring import mark_safe
 
 
 class HtmlField(models.TextField):
 
-    """A field that contains HTML data."""
+    """
+    A field that contains HTML data.
+
+    If `rendered_field` is given, it names a text field on the same model in
+    which the HTML will be stored after it has been cleaned and formatted
+    (as with the `html` template filter) whenever the model is saved, so
+    that it does not need to be done every time it is output. It is
+    available from `get_XXX_rendered()`.
+    """
+
+    def __init__(self, *args, rendered_field=None, **kwargs):
+        self.rendered_field = rendered_field
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.rendered_field:
+            kwargs["rendered_field"] = self.rendered_field
+        return name, path, args, kwargs
+
+    def contribute_to_class(self, cls, name, private_only=False):
+        """Adds in an accessor for the rendered HTML."""
+        super().contribute_to_class(cls, name, private_only=private_only)
+        if not self.rendered_field:
+            return
+
+        # These are signals, rather than pre_save(), because the rendered
+        # field's value may already have been read by the time this field's
+        # pre_save() is called. Proxy models and multi-table inheritance
+        # children are connected too, when they are created.
+        if not cls._meta.abstract:
+            class_prepared.connect(self.connect_model)
+
+        field = self
+
+        def get_XXX_rendered(self):
+            rendered = getattr(self, field.rendered_field)
+            if rendered or not getattr(self, field.attname):
+                return mark_safe(rendered)
+            # This has not been rendered yet (e.g. it was saved before
+            # `rendered_field` was added).
+            return mark_safe(field.render(getattr(self, field.attname)))
+
+        setattr(cls, "get_{}_rendered".format(name), get_XXX_rendered)
+
+    def render(self, value):
+        """Returns `value`, cleaned and formatted."""
+        # pylint:disable=import-outside-toplevel
+        from uncms.html import process_html
+
+        if not value:
+            return ""
+        return process_html(value)
+
+    def connect_model(self, sender, **kwargs):
+        """
+        Renders this field's HTML whenever `sender` is saved, if it is this
+        field's model or a subclass of it.
+        """
+        if issubclass(sender, self.model) and not sender._meta.abstract:
+            pre_save.connect(self.update_rendered_field, sender=sender)
+            post_save.connect(self.save_rendered_field, sender=sender)
+
+    def update_rendered_field(self, instance, raw=False, update_fields=None, **kwargs):
+        """Renders this field's HTML into `rendered_field`."""
+        if raw or (update_fields is not None and self.name not in update_fields):
+            return
+        setattr(
+            instance, self.rendered_field, self.render(getattr(instance, self.attname))
+        )
+
+    def save_rendered_field(
+        self, instance, raw=False, using=None, update_fields=None, **kwargs
+    ):
+        """
+        Saves `rendered_field` if this field was in `update_fields`, but it
+        was not.
+        """
+        if (
+            raw
+            or update_fields is None
+            or self.name not in update_fields
+            or self.rendered_field in update_fields
+        ):
+            return
+        self.model._base_manager.using(using).filter(
+            pk=getattr(instance, self.model._meta.pk.attname)
+        ).update(**{self.rendered_field: getattr(instance, self.rendered_field)})
 
     def formfield(self, **kwargs):
         """Returns a HtmlWidget."""
@@ -19,6 +108,75 @@ class HtmlField(models.TextField):
         return super().formfield(**kwargs)
 
 
+def get_rendered_html_fields(app_configs=None):
+    """
+    Returns a list of (model, field) tuples for every HtmlField, on every
+    installed model (or every model in `app_configs`, if given), which has a
+    `rendered_field`.
+    """
+    # pylint:disable=import-outside-toplevel
+    from django.apps import apps
+
+    if app_configs is None:
+        model_list = apps.get_models()
+    else:
+        model_list = [
+            model for app_config in app_configs for model in app_config.get_models()
+        ]
+    return [
+        (model, field)
+        for model in model_list
+        for field in model._meta.concrete_fields
+        # Inherited fields belong to the model they were defined on.
+        if isinstance(field, HtmlField)
+        and field.rendered_field
+        and field.model is model
+    ]
+
+
+def rerender_html_fields(batch_size=500, references=None):
+    """
+    Renders every HtmlField's HTML into its `rendered_field` again, and
+    returns the number of objects whose rendered HTML has changed. This
+    does not send signals.
+
+    If `references` is given, only objects whose HTML contains one of
+    those strings are rendered.
+    """
+    updated = 0
+    for model, field in get_rendered_html_fields():
+        queryset = model._base_manager.order_by("pk").only(
+            "pk", field.attname, field.rendered_field
+        )
+        if references is not None:
+            if not references:
+                break
+            query = models.Q()
+            for reference in references:
+                query |= models.Q(**{f"{field.attname}__contains": reference})
+            queryset = queryset.filter(query)
+
+        last_pk = None
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            changed = []
+            for obj in batch:
+                rendered = field.render(getattr(obj, field.attname))
+                if rendered != getattr(obj, field.rendered_field):
+                    setattr(obj, field.rendered_field, rendered)
+                    changed.append(obj)
+            model._base_manager.bulk_update(
+                changed, [field.rendered_field], batch_size=batch_size
+            )
+            updated += len(changed)
+    return updated
+
+
 class LinkResolutionError(Exception):
 
     """A link could not be resolved."""
@@ -0,0 +1,98 @@
+"""
+Per-process caches of paths which are known to be 404s.
+
+Crawlers often request the same non-existent paths over and over again. For
+each of them, the page middleware has to find the closest page and try its
+URLconf, and the redirects middleware has to look for a redirect. A
+NotFoundCache remembers the paths for which this found nothing, for up to
+NOT_FOUND_CACHE_TIMEOUT seconds, so that it does not have to be done again.
+
+Each process has its own caches; they are not shared. Saving or deleting a
+page (or a redirect) clears the relevant cache in the process that saved it.
+In other processes, the cache is also cleared when the page tree (or
+redirects) version changes, if PAGE_TREE_CACHE (or REDIRECTS_CACHE) is set;
+otherwise, entries expire after NOT_FOUND_CACHE_TIMEOUT seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from uncms.conf import defaults
+
+# All NotFoundCaches, by name.
+_caches = {}
+
+
+class NotFoundCache:
+    """
+    NotFoundCache is a bounded, least-recently-used set of paths, whose
+    entries expire after NOT_FOUND_CACHE_TIMEOUT seconds. It does nothing if
+    NOT_FOUND_CACHE_SIZE is 0.
+
+    `get_version`, if given, is called on every lookup; if the value that it
+    returns changes, the cache is cleared.
+    """
+
+    def __init__(self, name, get_version=None):
+        self.name = name
+        self.get_version = get_version
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        _caches[name] = self
+
+    def __contains__(self, path):
+        if not defaults.NOT_FOUND_CACHE_SIZE:
+            return False
+        version = self.get_version() if self.get_version else None
+        with self._lock:
+            self._check_version(version)
+            expires = self._entries.get(path)
+            if expires is not None and expires > time.monotonic():
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return True
+            if expires is not None:
+                del self._entries[path]
+            self.misses += 1
+            return False
+
+    def add(self, path):
+        """Remembers that `path` is a 404."""
+        size = defaults.NOT_FOUND_CACHE_SIZE
+        if not size:
+            return
+        version = self.get_version() if self.get_version else None
+        with self._lock:
+            self._check_version(version)
+            self._entries[path] = time.monotonic() + defaults.NOT_FOUND_CACHE_TIMEOUT
+            self._entries.move_to_end(path)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def _check_version(self, version):
+        """Clears the cache if `version` is not the one it was filled at."""
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+        }
+
+
+def get_not_found_cache_stats():
+    """
+    Returns the hit and miss counts, and the current number of entries, for
+    every NotFoundCache in this process, keyed by cache name.
+    """
+    return {name: cache.get_stats() for name, cache in _caches.items()}
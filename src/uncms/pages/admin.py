@@ -37,6 +37,7 @@ from watson.search import search_context_manager
 from uncms.admin import PageBaseAdmin
 from uncms.conf import defaults
 from uncms.pages.models import Page, PageSearchAdapter, get_registered_content
+from uncms.pages.tree import invalidate_page_tree
 
 # Used to track references to and from the JS sitemap.
 PAGE_FROM_KEY = "from"
@@ -772,23 +773,25 @@ class PageAdmin(PageBaseAdmin):
             right=F("right") * -1,
         )
 
-        # Move the other page.
-        branch_width = first_page["right"] - first_page["left"] + 1
+        # Move the other page to where the first one started. (If there is
+        # no gap between them, this is the width of the first page.)
+        offset = second_page["left"] - first_page["left"]
         Page.objects.filter(
             left__gte=second_page["left"], right__lte=second_page["right"]
         ).update(
-            left=F("left") - branch_width,
-            right=F("right") - branch_width,
+            left=F("left") - offset,
+            right=F("right") - offset,
         )
 
-        # Put the page back in.
-        second_branch_width = second_page["right"] - second_page["left"] + 1
+        # Put the page back in, ending where the other one ended.
+        second_offset = second_page["right"] - first_page["right"]
         Page.objects.filter(
             left__lte=-first_page["left"], right__gte=-first_page["right"]
         ).update(
-            left=(F("left") - second_branch_width) * -1,
-            right=(F("right") - second_branch_width) * -1,
+            left=(F("left") - second_offset) * -1,
+            right=(F("right") - second_offset) * -1,
         )
+        invalidate_page_tree()
 
         # if we've managed to POST, "next" should always be safe (if we've
         # managed to do a POST with an attacker-supplied URL we've got other
@@ -802,22 +805,18 @@ class PageAdmin(PageBaseAdmin):
         """
         publish_selected (and also unpublish_selected) on this ModelAdmin are
         overrides of the OnlineBaseAdmin methods of the same name. This is
-        because using `.update` as OnlineBaseAdmin does, does not go through
-        the save method, and the save method does a bunch of things to ensure
-        that the page tree is in a sane state.
+        because using `.update` as OnlineBaseAdmin does, does not send any
+        signals, so the selected pages would not be added to the current
+        revision, and nothing would know that the page tree has changed.
 
-        Instead, we do it the slow way of looping through each instance and
-        calling save().
+        Instead, we use PageManager.set_is_online, which does all of that
+        with one UPDATE, rather than saving each page.
         """
-        for obj in queryset:
-            obj.is_online = True
-            obj.save()
+        Page.objects.set_is_online(queryset, True)
 
     @admin.display(description=_("Take selected %(verbose_name_plural)s offline"))
     def unpublish_selected(self, request, queryset):
-        for obj in queryset:
-            obj.is_online = False
-            obj.save()
+        Page.objects.set_is_online(queryset, False)
 
 
 admin.site.register(Page, PageAdmin)
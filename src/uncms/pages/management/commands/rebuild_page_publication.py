@@ -0,0 +1,31 @@
+from django.core.management import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy as _
+
+from uncms.pages import get_page_model
+from uncms.pages.tree import invalidate_page_tree
+
+
+class Command(BaseCommand):
+    help = "Recalculate which pages are published, taking their ancestors into account"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help=_("number of pages to update in each query"),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            changed = get_page_model().objects.update_effective_publication(
+                batch_size=options["batch_size"]
+            )
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+        invalidate_page_tree()
+        self.stdout.write(
+            self.style.SUCCESS(
+                _("{changed} pages updated").format(changed=len(changed))
+            )
+        )
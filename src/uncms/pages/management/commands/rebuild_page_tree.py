@@ -0,0 +1,63 @@
+from django.core.management import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy as _
+
+from uncms.pages import get_page_model
+
+
+class Command(BaseCommand):
+    help = "Recalculate the position of every page in the page tree"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help=_(
+                "don't save anything; exit with an error if the page tree needs to be rebuilt"
+            ),
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help=_(
+                "renumber the page tree even if it is consistent (e.g. to add gaps after setting PAGE_TREE_GAP)"
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help=_("number of pages to update in each query"),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            changed = get_page_model().objects.rebuild_tree(
+                dry_run=options["check"],
+                force=options["force"],
+                batch_size=options["batch_size"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        if options["check"] or options["verbosity"] > 1:
+            for page in changed:
+                self.stdout.write(
+                    _("page {id}: left={left}, right={right}").format(
+                        id=page.pk, left=page.left, right=page.right
+                    )
+                )
+
+        if options["check"]:
+            if changed:
+                raise CommandError(
+                    _("{changed} pages are in the wrong position").format(
+                        changed=len(changed)
+                    )
+                )
+            self.stdout.write(self.style.SUCCESS(_("The page tree is consistent")))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    _("{changed} pages moved").format(changed=len(changed))
+                )
+            )
@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+from uncms.pages import get_page_model
+from uncms.pages.tree import invalidate_page_tree
+
+
+class Command(BaseCommand):
+    help = "Recalculate the stored URL path of every page"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help=_("number of pages to update in each query"),
+        )
+
+    def handle(self, *args, **options):
+        changed = get_page_model().objects.rebuild_url_paths(
+            batch_size=options["batch_size"]
+        )
+        invalidate_page_tree()
+        self.stdout.write(
+            self.style.SUCCESS(
+                _("{changed} page URL paths updated").format(changed=changed)
+            )
+        )
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+from django.utils.translation import gettext_lazy as _
+
+from uncms.pages.tree import sweep_publication
+
+
+class Command(BaseCommand):
+    help = "Find pages which have been published or expired since the last run, and invalidate caches of the page tree"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=None,
+            help=_(
+                "keep running, sweeping every INTERVAL seconds, rather than exiting after the first sweep"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # Don't hold on to a connection that the database server may
+            # since have dropped.
+            close_old_connections()
+            pages = sweep_publication()
+            if options["verbosity"] > 1:
+                for page in pages:
+                    self.stdout.write(
+                        _("page {id}: {page}").format(id=page.pk, page=page)
+                    )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    _("{changed} pages published or expired").format(changed=len(pages))
+                )
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
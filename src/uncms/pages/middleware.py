@@ -13,7 +13,19 @@ from django.utils.functional import cached_property
 from django.views.debug import technical_404_response
 
 from uncms.conf import defaults
+from uncms.models.managers import publication_manager
 from uncms.pages import get_page_model
+from uncms.pages.tree import get_page_tree, page_not_found_cache
+
+
+def _children_loaded(page):
+    """Whether `page.children` can be evaluated without a database query."""
+    return (
+        page.right - page.left <= 1
+        or page._page_tree is not None
+        or "children" in page.__dict__
+        or "child_set" in getattr(page, "_prefetched_objects_cache", {})
+    )
 
 
 class RequestPageManager:
@@ -27,9 +39,21 @@ class RequestPageManager:
         self.path_info = self.request.path_info
         self.page_model = get_page_model()
 
+    @cached_property
+    def tree(self):
+        """
+        The shared page tree (see uncms.pages.tree), or None if the
+        PAGE_TREE_CACHE option is not set.
+        """
+        if not defaults.PAGE_TREE_CACHE:
+            return None
+        return get_page_tree()
+
     @cached_property
     def homepage(self):
         """Returns the site homepage."""
+        if self.tree is not None:
+            return self.tree.homepage
         try:
             return self.page_model.objects.get_homepage(
                 prefetch_depth=defaults.PAGE_TREE_PREFETCH_DEPTH
@@ -45,6 +69,9 @@ class RequestPageManager:
     @cached_property
     def breadcrumbs(self):
         """The breadcrumbs for the current request."""
+        if self.tree is not None:
+            return self.tree.get_breadcrumbs(self.path_info)
+
         breadcrumbs = []
         slugs = self.path_info.strip("/").split("/")
         slugs.reverse()
@@ -52,6 +79,11 @@ class RequestPageManager:
         def do_breadcrumbs(page):
             breadcrumbs.append(page)
             if slugs:
+                # Below the prefetched part of the tree, find all of the
+                # remaining pages at once, rather than one level at a time.
+                if not _children_loaded(page) and page.url_path is not None:
+                    breadcrumbs.extend(self._get_descendants(page, slugs[::-1]))
+                    return
                 slug = slugs.pop()
                 for child in page.children:
                     if child.slug == slug:
@@ -62,6 +94,35 @@ class RequestPageManager:
             do_breadcrumbs(self.homepage)
         return breadcrumbs
 
+    def _get_descendants(self, page, slugs):
+        """
+        Returns the chain of descendants of `page` matching `slugs`, in a
+        single query on their url_path.
+        """
+        url_paths = []
+        url_path = page.url_path
+        for slug in slugs:
+            if not slug:
+                break
+            url_path = f"{url_path}{slug}/"
+            url_paths.append(url_path)
+        if not url_paths:
+            return []
+
+        matches = {
+            match.url_path: match
+            for match in self.page_model.objects.filter(url_path__in=url_paths)
+        }
+        descendants = []
+        for url_path in url_paths:
+            match = matches.get(url_path)
+            if match is None or match.parent_id != page.pk:
+                break
+            match.parent = page
+            descendants.append(match)
+            page = match
+        return descendants
+
     @cached_property
     def section(self):
         """The current primary level section, or None."""
@@ -112,6 +173,9 @@ class RequestPageManager:
         else:
             page_id = int(page)
 
+        if self.tree is not None:
+            return self.tree.get(page_id)
+
         return find_recursive([self.homepage], page_id)
 
 
@@ -130,9 +194,17 @@ class PageMiddleware(MiddlewareMixin):
         if response.status_code != 404:
             return response
 
+        # Remember paths that nothing can be found for, but only for the
+        # public; staff previewing offline pages may see more of them.
+        cacheable = publication_manager.select_published_active()
+        if cacheable and request.path in page_not_found_cache:
+            return response
+
         # Get the current page.
         page = request.pages.current
         if page is None:
+            if cacheable:
+                page_not_found_cache.add(request.path)
             return response
         script_name = page.get_absolute_url()[:-1]
         path_info = request.path[len(script_name) :]
@@ -159,6 +231,8 @@ class PageMiddleware(MiddlewareMixin):
                         pass
                     else:
                         return redirect(script_name + new_path_info, permanent=True)
+                if cacheable:
+                    page_not_found_cache.add(request.path)
                 return response
 
             # Redirect to the login URL if this page requires authentication.
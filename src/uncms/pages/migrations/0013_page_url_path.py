@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+def populate_url_paths(apps, schema_editor):
+    Page = apps.get_model("pages", "Page")
+    children = {}
+    for page_id, parent_id, slug in Page.objects.values_list("id", "parent_id", "slug"):
+        children.setdefault(parent_id, []).append((page_id, slug))
+
+    pages = []
+    stack = [(page_id, "/") for page_id, _ in children.get(None, [])]
+    while stack:
+        page_id, url_path = stack.pop()
+        pages.append(Page(id=page_id, url_path=url_path))
+        for child_id, slug in children.get(page_id, []):
+            stack.append((child_id, f"{url_path}{slug}/"))
+
+    Page.objects.bulk_update(pages, ["url_path"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pages", "0012_remove_page_twitter_card_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="page",
+            name="url_path",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=1000, null=True
+            ),
+        ),
+        migrations.RunPython(populate_url_paths, migrations.RunPython.noop),
+    ]
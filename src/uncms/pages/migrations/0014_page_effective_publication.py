@@ -0,0 +1,84 @@
+from django.db import migrations, models
+
+
+def populate_effective_publication(apps, schema_editor):
+    Page = apps.get_model("pages", "Page")
+    children = {}
+    for page in Page.objects.only(
+        "parent_id", "is_online", "publication_date", "expiry_date"
+    ):
+        children.setdefault(page.parent_id, []).append(page)
+
+    pages = []
+    stack = [(page, None) for page in children.get(None, [])]
+    while stack:
+        page, parent = stack.pop()
+        if parent is None:
+            page.effective_is_online = page.is_online
+            page.effective_publication_date = page.publication_date
+            page.effective_expiry_date = page.expiry_date
+        else:
+            page.effective_is_online = parent.effective_is_online and page.is_online
+            page.effective_publication_date = max(
+                (
+                    date
+                    for date in (
+                        parent.effective_publication_date,
+                        page.publication_date,
+                    )
+                    if date
+                ),
+                default=None,
+            )
+            page.effective_expiry_date = min(
+                (
+                    date
+                    for date in (parent.effective_expiry_date, page.expiry_date)
+                    if date
+                ),
+                default=None,
+            )
+        pages.append(page)
+        stack.extend((child, page) for child in children.get(page.pk, []))
+
+    Page.objects.bulk_update(
+        pages,
+        ["effective_is_online", "effective_publication_date", "effective_expiry_date"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pages", "0013_page_url_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="page",
+            name="effective_expiry_date",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="page",
+            name="effective_is_online",
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="page",
+            name="effective_publication_date",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="page",
+            index=models.Index(
+                fields=[
+                    "effective_is_online",
+                    "effective_publication_date",
+                    "effective_expiry_date",
+                ],
+                name="pages_page_published_idx",
+            ),
+        ),
+        migrations.RunPython(populate_effective_publication, migrations.RunPython.noop),
+    ]
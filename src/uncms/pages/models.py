@@ -1,9 +1,14 @@
 """Core models used by UnCMS."""
+from typing import Optional
+
 from django import urls
 from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
-from django.db import connection, models, transaction
-from django.db.models import F, Q
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
+from django.db.models import F, Max, Q, Value
+from django.db.models.functions import Concat, Length, Substr
+from django.db.models.signals import post_save, pre_save
 from django.utils import timezone
 from django.utils.encoding import force_str
 from django.utils.functional import cached_property
@@ -11,8 +16,47 @@ from django.utils.translation import gettext_lazy as _
 from reversion.models import Version
 
 from uncms import sitemaps
+from uncms.conf import defaults
 from uncms.models import OnlineBaseManager, PageBase, PageBaseSearchAdapter
 from uncms.models.managers import publication_manager
+from uncms.pages.tree import (
+    excise_branch,
+    insert_branch,
+    invalidate_page_tree,
+    make_room,
+    move_branch,
+)
+from uncms.signals import page_paths_changed
+
+# Fields of Page which are calculated from its own publication fields, and
+# those of its ancestors.
+EFFECTIVE_PUBLICATION_FIELDS = [
+    "effective_is_online",
+    "effective_publication_date",
+    "effective_expiry_date",
+]
+
+
+def _get_effective_publication(parent, is_online, publication_date, expiry_date):
+    """
+    Returns the values of EFFECTIVE_PUBLICATION_FIELDS for a page, given
+    its own publication fields and the effective values of its parent (or
+    None, if it has no parent).
+    """
+    if parent is None:
+        return (is_online, publication_date, expiry_date)
+    parent_is_online, parent_publication_date, parent_expiry_date = parent
+    return (
+        parent_is_online and is_online,
+        max(
+            (date for date in (parent_publication_date, publication_date) if date),
+            default=None,
+        ),
+        min(
+            (date for date in (parent_expiry_date, expiry_date) if date),
+            default=None,
+        ),
+    )
 
 
 class PageManager(OnlineBaseManager):
@@ -20,50 +64,20 @@ class PageManager(OnlineBaseManager):
     """Manager for Page objects."""
 
     def select_published(self, queryset, page_alias=None):
-        """Selects only published pages."""
+        """
+        Selects only published pages. A page is published only if it and
+        all of its ancestors are; rather than checking its ancestors here,
+        this uses the `effective_*` fields that Page.save maintains.
+
+        `page_alias` is no longer needed, and is ignored.
+        """
         queryset = super().select_published(queryset)
         now = timezone.now().replace(second=0, microsecond=0)
-        # Perform local filtering.
-        queryset = queryset.filter(
-            Q(publication_date=None) | Q(publication_date__lte=now)
+        return queryset.filter(
+            Q(effective_publication_date=None) | Q(effective_publication_date__lte=now),
+            Q(effective_expiry_date=None) | Q(effective_expiry_date__gt=now),
+            effective_is_online=True,
         )
-        queryset = queryset.filter(Q(expiry_date=None) | Q(expiry_date__gt=now))
-        # Perform parent ordering.
-        quote_name = connection.ops.quote_name
-        page_alias = page_alias or quote_name("pages_page")
-        queryset = queryset.extra(
-            where=(
-                """
-                NOT EXISTS (
-                    SELECT *
-                    FROM {pages_page} AS {ancestors}
-                    WHERE
-                        {ancestors}.{left} < {page_alias}.{left} AND
-                        {ancestors}.{right} > {page_alias}.{right} AND (
-                            {ancestors}.{is_online} = FALSE OR
-                            {ancestors}.{publication_date} > %s OR
-                            {ancestors}.{expiry_date} <= %s
-                        )
-                )
-            """.format(
-                    page_alias=page_alias,
-                    **dict(
-                        (name, quote_name(name))
-                        for name in (
-                            "pages_page",
-                            "ancestors",
-                            "left",
-                            "right",
-                            "is_online",
-                            "publication_date",
-                            "expiry_date",
-                        )
-                    ),
-                ),
-            ),
-            params=(now, now),
-        )
-        return queryset
 
     def get_homepage(self, prefetch_depth=0):
         """Returns the site homepage."""
@@ -79,6 +93,277 @@ class PageManager(OnlineBaseManager):
     def prefetch_children_args(self, *, depth):
         return ["__".join(["child_set"] * (i + 1)) for i in range(depth)]
 
+    def set_is_online(self, pages, is_online):
+        """
+        Sets `is_online` on the given pages (an iterable or queryset) in a
+        single UPDATE, and returns the pages that were changed.
+
+        Changing `is_online` does not move anything in the page tree, so this
+        does not need to lock it, or to save each page separately. pre_save
+        and post_save are still sent for each changed page, with
+        `update_fields` of "is_online" and the `effective_*` publication
+        fields; amongst other things, this adds them to the current
+        django-reversion revision, if there is one. The `effective_*` fields
+        of their descendants are updated too.
+        """
+        changed = [page for page in pages if page.is_online != is_online]
+        if not changed:
+            return []
+
+        using = router.db_for_write(self.model)
+        update_fields = frozenset(["is_online", *EFFECTIVE_PUBLICATION_FIELDS])
+        with transaction.atomic(using=using):
+            for page in changed:
+                # As with Model.save, receivers see the new value.
+                page.is_online = is_online
+                pre_save.send(
+                    sender=self.model,
+                    instance=page,
+                    raw=False,
+                    using=using,
+                    update_fields=update_fields,
+                )
+
+            self.model._base_manager.using(using).filter(
+                pk__in=[page.pk for page in changed]
+            ).update(is_online=is_online)
+            effective = {
+                page.pk: page for page in self.update_effective_publication(changed)
+            }
+
+            for page in changed:
+                if page.pk in effective:
+                    for field_name in EFFECTIVE_PUBLICATION_FIELDS:
+                        setattr(
+                            page, field_name, getattr(effective[page.pk], field_name)
+                        )
+                post_save.send(
+                    sender=self.model,
+                    instance=page,
+                    created=False,
+                    raw=False,
+                    using=using,
+                    update_fields=update_fields,
+                )
+            invalidate_page_tree()
+        return changed
+
+    def get_publication_changes(self, since, until):
+        """
+        Returns a queryset of the pages which have become published, or have
+        expired, because of their (effective) publication or expiry dates at
+        some point after `since`, up to and including `until`.
+
+        Like select_published, this works to the minute.
+        """
+        since = since.replace(second=0, microsecond=0)
+        until = until.replace(second=0, microsecond=0)
+        return self.model._base_manager.filter(
+            Q(
+                effective_publication_date__gt=since,
+                effective_publication_date__lte=until,
+            )
+            | Q(effective_expiry_date__gt=since, effective_expiry_date__lte=until),
+            effective_is_online=True,
+        ).order_by("left")
+
+    def update_effective_publication(self, pages=None, batch_size=500):
+        """
+        Recalculates the `effective_*` publication fields for the given pages
+        (or every page, if `pages` is None) and all of their descendants.
+        Returns the pages whose fields changed, with the new values.
+
+        This is only needed if pages have been changed without going through
+        Page.save, e.g. with `loaddata` or QuerySet.update.
+        """
+        base_manager = self.model._base_manager
+        if pages is None:
+            queryset = base_manager.all()
+        else:
+            subtrees = Q()
+            for left, right in base_manager.filter(
+                pk__in=[page.pk for page in pages]
+            ).values_list("left", "right"):
+                subtrees |= Q(left__gte=left, right__lte=right)
+            if not subtrees:
+                return []
+            queryset = base_manager.filter(subtrees)
+
+        rows = {
+            row[0]: row[1:]
+            for row in queryset.values_list(
+                "id",
+                "parent_id",
+                "is_online",
+                "publication_date",
+                "expiry_date",
+                *EFFECTIVE_PUBLICATION_FIELDS,
+            )
+        }
+        # The parents of the top of each subtree are not being updated, so
+        # their values can be used as they are.
+        effective = {
+            row[0]: row[1:]
+            for row in base_manager.filter(
+                pk__in={row[0] for row in rows.values()} - set(rows)
+            ).values_list("id", *EFFECTIVE_PUBLICATION_FIELDS)
+        }
+
+        changed = []
+        for ancestor_id in rows:
+            # Work up to the nearest ancestor we already know about, then back
+            # down again.
+            unresolved = []
+            while ancestor_id in rows and ancestor_id not in effective:
+                unresolved.append(ancestor_id)
+                ancestor_id = rows[ancestor_id][0]
+                if len(unresolved) > len(rows):
+                    raise ValueError("The parents of some pages form a cycle")
+            for page_id in reversed(unresolved):
+                parent_id, is_online, publication_date, expiry_date = rows[page_id][:4]
+                values = _get_effective_publication(
+                    effective.get(parent_id), is_online, publication_date, expiry_date
+                )
+                effective[page_id] = values
+                if values != tuple(rows[page_id][4:]):
+                    changed.append(
+                        self.model(
+                            id=page_id,
+                            **dict(zip(EFFECTIVE_PUBLICATION_FIELDS, values)),
+                        )
+                    )
+
+        base_manager.bulk_update(
+            changed, EFFECTIVE_PUBLICATION_FIELDS, batch_size=batch_size
+        )
+        return changed
+
+    def rebuild_url_paths(self, batch_size=500):
+        """
+        Recalculates `url_path` for every page from the slugs of its
+        ancestors, and returns the number of pages whose `url_path` changed.
+        This is only needed if pages have been changed without going through
+        Page.save, e.g. with `loaddata` or QuerySet.update.
+        """
+        rows = self.model._base_manager.values_list(
+            "id", "parent_id", "slug", "url_path"
+        )
+        children = {}
+        for page_id, parent_id, slug, url_path in rows:
+            children.setdefault(parent_id, []).append((page_id, slug, url_path))
+
+        changed = []
+        stack = [
+            (page_id, url_path, "/") for page_id, _, url_path in children.get(None, [])
+        ]
+        while stack:
+            page_id, old_url_path, url_path = stack.pop()
+            if url_path != old_url_path:
+                changed.append(self.model(id=page_id, url_path=url_path))
+            for child_id, slug, old_child_url_path in children.get(page_id, []):
+                stack.append((child_id, old_child_url_path, f"{url_path}{slug}/"))
+
+        self.model._base_manager.bulk_update(
+            changed, ["url_path"], batch_size=batch_size
+        )
+        return len(changed)
+
+    def _tree_is_consistent(self, rows):
+        """
+        Returns whether the given (id, parent_id, left, right) rows, ordered
+        by `left`, form a valid nested set which agrees with the parents of
+        each page. Gaps between values are allowed.
+        """
+        # Stack of (id, right) for the ancestors of the current page.
+        ancestors = []
+        previous_left = None
+        for page_id, parent_id, left, right in rows:
+            if right <= left or (previous_left is not None and left <= previous_left):
+                return False
+            while ancestors and ancestors[-1][1] < left:
+                ancestors.pop()
+            if ancestors and right >= ancestors[-1][1]:
+                return False
+            if parent_id != (ancestors[-1][0] if ancestors else None):
+                return False
+            ancestors.append((page_id, right))
+            previous_left = left
+        return True
+
+    @transaction.atomic
+    def rebuild_tree(self, *, dry_run=False, force=False, batch_size=500):
+        """
+        If the `left` and `right` values of the page tree are inconsistent
+        with the `parent` of each page (or `force` is True), recalculates
+        them, keeping siblings in their current order. Returns the pages whose
+        `left` or `right` was changed, with the new values; these will not be
+        saved if `dry_run` is True.
+
+        If PAGE_TREE_GAP is set, it is left spare inside every page which has
+        children.
+
+        Raises ValueError if any pages cannot be reached from the top of the
+        tree (i.e. their parents form a cycle).
+        """
+        # Locking every page also locks the homepage; see Page._lock_tree.
+        rows = list(
+            self.model._base_manager.select_for_update()
+            .order_by("left", "id")
+            .values_list("id", "parent_id", "left", "right")
+        )
+        if not force and self._tree_is_consistent(rows):
+            return []
+
+        children = {}
+        old_values = {}
+        for page_id, parent_id, left, right in rows:
+            children.setdefault(parent_id, []).append(page_id)
+            old_values[page_id] = (left, right)
+
+        new_values = {}
+        counter = 1
+        # The current path from the top of the tree, and an iterator over the
+        # remaining children at each level of it.
+        path = []
+        stack = [iter(children.get(None, []))]
+        while stack:
+            page_id = next(stack[-1], None)
+            if page_id is None:
+                stack.pop()
+                if path:
+                    finished_id = path.pop()
+                    finished_left = new_values[finished_id][0]
+                    if finished_left + 1 < counter:
+                        counter += defaults.PAGE_TREE_GAP
+                    new_values[finished_id] = (finished_left, counter)
+                    counter += 1
+                continue
+            new_values[page_id] = (counter, None)
+            counter += 1
+            path.append(page_id)
+            stack.append(iter(children.get(page_id, [])))
+
+        unreachable = sorted(set(old_values) - set(new_values))
+        if unreachable:
+            raise ValueError(
+                "Pages {} are not connected to the page tree".format(
+                    ", ".join(str(page_id) for page_id in unreachable)
+                )
+            )
+
+        changed = [
+            self.model(id=page_id, left=left, right=right)
+            for page_id, (left, right) in new_values.items()
+            if (left, right) != old_values[page_id]
+        ]
+        if not dry_run:
+            self.model._base_manager.bulk_update(
+                changed, ["left", "right"], batch_size=batch_size
+            )
+            if changed:
+                invalidate_page_tree()
+        return changed
+
 
 class Page(PageBase):
 
@@ -86,6 +371,9 @@ class Page(PageBase):
 
     objects = PageManager()
 
+    # The PageTree this page was created from, if any; see uncms.pages.tree.
+    _page_tree = None
+
     # Hierarchy fields.
 
     parent = models.ForeignKey(
@@ -95,6 +383,9 @@ class Page(PageBase):
         related_name="child_set",
         on_delete=models.CASCADE,
     )
+    # Declared for the benefit of static analysis; the ForeignKey above
+    # provides it.
+    parent_id: Optional[int]
 
     left = models.IntegerField(
         editable=False,
@@ -106,6 +397,17 @@ class Page(PageBase):
         db_index=True,
     )
 
+    # The path of this page, relative to the script prefix, with leading and
+    # trailing slashes (so "/" for the homepage). This is maintained by
+    # `save` so that finding a page's URL does not require its ancestors.
+    url_path = models.CharField(
+        max_length=1000,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
+
     # Publication fields.
 
     publication_date = models.DateTimeField(
@@ -128,6 +430,28 @@ class Page(PageBase):
         ),
     )
 
+    # The publication state of this page, taking into account all of its
+    # ancestors; this page is only published if all of them are. These are
+    # maintained by `save`, so that PageManager.select_published doesn't have
+    # to look at ancestors.
+
+    effective_is_online = models.BooleanField(
+        default=True,
+        editable=False,
+    )
+
+    effective_publication_date = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
+    effective_expiry_date = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
     # Navigation fields.
 
     short_title = models.CharField(
@@ -172,10 +496,42 @@ class Page(PageBase):
     class Meta:
         unique_together = (("parent", "slug"),)
         ordering = ("left",)
+        indexes = [
+            models.Index(
+                fields=EFFECTIVE_PUBLICATION_FIELDS,
+                name="pages_page_published_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.short_title or self.title
 
+    def clean(self):
+        super().clean()
+        # This page's URL path, and those of its descendants, must fit in
+        # `url_path`.
+        url_paths = dict(
+            Page._base_manager.filter(pk__in=[self.pk, self.parent_id]).values_list(
+                "pk", "url_path"
+            )
+        )
+        if self.parent_id is None or url_paths.get(self.parent_id) is None:
+            return
+        length = len(url_paths[self.parent_id]) + len(self.slug) + 1
+        if url_paths.get(self.pk) is not None:
+            length += Page._base_manager.filter(
+                url_path__startswith=url_paths[self.pk]
+            ).aggregate(longest=Max(Length("url_path")))["longest"] - len(
+                url_paths[self.pk]
+            )
+        max_length = Page._meta.get_field("url_path").max_length
+        if length > max_length:
+            message = _(
+                "The URL of this page, or of a page below it, would be longer than"
+                " {max_length} characters. Please use a shorter slug."
+            )
+            raise ValidationError({"slug": message.format(max_length=max_length)})
+
     def auth_required(self):
         if self.requires_authentication or not self.parent:
             return self.requires_authentication
@@ -201,6 +557,9 @@ class Page(PageBase):
         This does not permit further filtering on the children, and that is
         the point; use Page.child_set if you wish to do this.
         """
+        # Pages from the page tree cache already know their children.
+        if self._page_tree is not None:
+            return self._page_tree.get_children(self)
         # Optimization - don't fetch children we know aren't there!
         if self.right - self.left > 1:
             return list(self.child_set.all())
@@ -230,6 +589,10 @@ class Page(PageBase):
 
     def get_absolute_url(self):
         """Generates the absolute url of the page."""
+        if self.url_path is not None:
+            return urls.get_script_prefix() + self.url_path[1:]
+
+        # This page has not been saved yet.
         if not self.parent:
             return urls.get_script_prefix()
 
@@ -241,55 +604,129 @@ class Page(PageBase):
     def _branch_width(self):
         return self.right - self.left + 1
 
-    def _excise_branch(self):
-        """Excises this whole branch from the tree."""
-        branch_width = self._branch_width
-        Page.objects.filter(left__gte=self.left).update(
-            left=F("left") - branch_width,
-        )
-        Page.objects.filter(right__gte=self.left).update(
-            right=F("right") - branch_width,
-        )
+    def _get_url_path(self, parent):
+        """
+        Returns the `url_path` for this page, given `parent` (a dict of its
+        parent's current values, or None).
+        """
+        if parent is None:
+            return "/"
+        if parent["url_path"] is None:
+            return None
+        return f"{parent['url_path']}{self.slug}/"
 
-    def _insert_branch(self):
-        """Inserts this whole branch into the tree."""
-        branch_width = self._branch_width
-        Page.objects.filter(left__gte=self.left).update(
-            left=F("left") + branch_width,
+    def _set_effective_publication(self, page, parent):
+        """
+        Sets the `effective_*` publication fields on this page, given the
+        current values of the page and its parent (dicts, or None). Returns
+        True if they have changed, meaning that its descendants need to be
+        updated too.
+        """
+        old_values, parent_values = (
+            None
+            if values is None
+            else tuple(
+                values[field_name] for field_name in EFFECTIVE_PUBLICATION_FIELDS
+            )
+            for values in (page, parent)
         )
-        Page.objects.filter(right__gte=self.left).update(
-            right=F("right") + branch_width,
+        new_values = _get_effective_publication(
+            parent_values, self.is_online, self.publication_date, self.expiry_date
         )
+        for field_name, value in zip(EFFECTIVE_PUBLICATION_FIELDS, new_values):
+            setattr(self, field_name, value)
+        return old_values not in (None, new_values)
 
-    @transaction.atomic
-    def save(self, *args, **kwargs):
-        # Lock the table. This causes a SELECT FOR UPDATE (on sensible
-        # databases) which will cause anything *else* that attempts a similar
-        # lock to fail. As long as all operations that change the page tree
-        # also attempt to use a SELECT FOR UPDATE lock, this means that we
-        # can't have e.g. two concurrent saves trashing the page tree.
-        existing_pages = dict(
+    def _update_descendants(self, old_url_path, effective_publication_changed):
+        """
+        Updates the fields of this page's descendants that depend on its
+        own, after it has been saved, and sends page_paths_changed if this
+        branch has appeared at or moved to a new path.
+        """
+        if old_url_path is not None and old_url_path != self.url_path:
+            self._move_descendant_url_paths(old_url_path)
+        if effective_publication_changed:
+            Page.objects.update_effective_publication([self])
+        if old_url_path != self.url_path:
+            page_paths_changed.send(
+                sender=Page,
+                paths=[
+                    path for path in (old_url_path, self.url_path) if path is not None
+                ],
+            )
+
+    def _move_descendant_url_paths(self, old_url_path):
+        """
+        Updates the `url_path` of all descendants of this page, after its own
+        has changed from `old_url_path`.
+        """
+        new_url_path = None
+        if self.url_path is not None:
+            new_url_path = Concat(
+                Value(self.url_path),
+                Substr("url_path", len(old_url_path) + 1),
+            )
+        Page._base_manager.filter(url_path__startswith=old_url_path).exclude(
+            pk=self.pk
+        ).update(url_path=new_url_path)
+
+    def _lock_tree(self, *page_ids):
+        """
+        Locks the page tree, and returns the current values of the homepage
+        and of the pages with the given IDs, as a dict of dicts keyed by ID.
+
+        This causes a SELECT FOR UPDATE (on sensible databases) on the
+        homepage, which will cause anything *else* that attempts a similar
+        lock to fail. As long as all operations that change the page tree
+        also lock the homepage this way (or lock every page), this means that
+        we can't have e.g. two concurrent saves trashing the page tree, and
+        we don't have to read the whole tree to prevent it.
+        """
+        page_ids = [page_id for page_id in page_ids if page_id is not None]
+        return dict(
             (page["id"], page)
-            for page in Page.objects.select_for_update().values(
-                "id", "parent_id", "left", "right"
+            for page in Page.objects.select_for_update()
+            .filter(Q(parent=None) | Q(pk__in=page_ids))
+            .values(
+                "id",
+                "parent_id",
+                "left",
+                "right",
+                "url_path",
+                *EFFECTIVE_PUBLICATION_FIELDS,
             )
         )
 
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        # Lock the table, and get the current state of this page and its
+        # (possibly new) parent.
+        parent_id = self.parent_id
+        existing_pages = self._lock_tree(self.pk, parent_id)
+        old_url_path = existing_pages.get(self.id, {}).get("url_path")
+
         if self.left is None or self.right is None:
             # This page is being inserted.
             if existing_pages:
-                if not self.parent_id:  # pylint:disable=access-member-before-definition
+                if not parent_id:
                     # There is no parent - we're updating the homepage.
                     # Set the parent to be the homepage by default
-                    # pylint:disable-next=attribute-defined-outside-init
-                    self.parent_id = Page.objects.get_homepage().pk
-
-                parent_right = existing_pages[self.parent_id]["right"]
-                # Set the model left and right.
-                self.left = parent_right
-                self.right = self.left + 1
-                # Update the whole tree structure.
-                self._insert_branch()
+                    self.parent_id = next(
+                        page["id"]
+                        for page in existing_pages.values()
+                        if page["parent_id"] is None
+                    )
+
+                if defaults.PAGE_TREE_GAP:
+                    self.left, _ = make_room(existing_pages[self.parent_id], 2)
+                    self.right = self.left + 1
+                else:
+                    parent_right = existing_pages[self.parent_id]["right"]
+                    # Set the model left and right.
+                    self.left = parent_right
+                    self.right = self.left + 1
+                    # Update the whole tree structure.
+                    insert_branch(self.left, self._branch_width)
             else:
                 # This is the first page to be created, ever!
                 self.left = 1
@@ -301,7 +738,18 @@ class Page(PageBase):
             else:
                 old_parent_id = existing_pages[self.id]["parent_id"]
 
-            if old_parent_id != self.parent_id:
+            moved = old_parent_id != self.parent_id
+            if (
+                moved
+                and defaults.PAGE_TREE_GAP
+                and self.parent_id
+                and old_parent_id != -1
+            ):
+                # Only this branch needs to change.
+                self.left, self.right = move_branch(
+                    existing_pages[self.id], existing_pages[self.parent_id]
+                )
+            elif moved:
                 # The page has moved.
                 branch_width = self.right - self.left + 1
                 # Disconnect child branch.
@@ -312,7 +760,7 @@ class Page(PageBase):
                         left=F("left") * -1,
                         right=F("right") * -1,
                     )
-                self._excise_branch()
+                excise_branch(self.left, self._branch_width)
                 # Store old left and right values.
                 old_left = self.left
                 old_right = self.right
@@ -323,7 +771,7 @@ class Page(PageBase):
                         parent_right -= self._branch_width
                     self.left = parent_right
                     self.right = self.left + branch_width - 1
-                    self._insert_branch()
+                    insert_branch(self.left, self._branch_width)
 
                     # Put all children back into the tree.
                     if branch_width > 2:
@@ -335,17 +783,29 @@ class Page(PageBase):
                             right=(F("right") - child_offset) * -1,
                         )
 
+        self.url_path = self._get_url_path(existing_pages.get(self.parent_id))
+        effective_publication_changed = self._set_effective_publication(
+            existing_pages.get(self.id), existing_pages.get(self.parent_id)
+        )
+
         # Now actually save it!
         super().save(*args, **kwargs)
 
+        self._update_descendants(old_url_path, effective_publication_changed)
+        invalidate_page_tree()
+
     @transaction.atomic
     def delete(self, *args, **kwargs):
         """Deletes the page."""
-        # Lock entire table.
-        list(Page.objects.all().select_for_update().values_list("left", "right"))
+        # Lock the table.
+        self._lock_tree()
         super().delete(*args, **kwargs)
-        # Update the entire tree.
-        self._excise_branch()
+        # Update the entire tree, unless we are leaving gaps in it.
+        if not defaults.PAGE_TREE_GAP:
+            excise_branch(self.left, self._branch_width)
+        invalidate_page_tree()
+        if self.url_path is not None:
+            page_paths_changed.send(sender=Page, paths=[self.url_path])
 
     def last_modified(self):
         versions = Version.objects.get_for_object(self)
@@ -376,6 +836,9 @@ class PageSearchAdapter(PageBaseSearchAdapter):
 
     """Search adapter for Page models."""
 
+    # url_path only repeats the slugs of this page and its ancestors.
+    exclude = ("url_path",)
+
     def get_content(self, obj):
         """Returns the search text for the page."""
         content_obj = obj.content
@@ -389,11 +852,9 @@ class PageSearchAdapter(PageBaseSearchAdapter):
 
     def get_live_queryset(self):
         """Selects the live page queryset."""
-        # HACK: Prevents a table name collision in the Django queryset manager.
-        with publication_manager.select_published(False):
-            qs = Page._base_manager.all()
+        qs = Page._base_manager.all()
         if publication_manager.select_published_active():
-            qs = Page.objects.select_published(qs, page_alias="U0")
+            qs = Page.objects.select_published(qs)
         # Filter out unindexable pages.
         qs = filter_indexable_pages(qs)
         # All done!
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent by `sweep_publication` (see uncms.pages.tree) when pages have become
+# published or expired because of their publication or expiry dates, rather
+# than because they were saved. `sender` is the page model, and `pages` is a
+# list of the pages whose publication state has changed.
+page_publication_changed = Signal()
@@ -0,0 +1,355 @@
+"""
+A process-wide cache of the page tree.
+
+Without this, every request builds its own page tree with one query per level
+of PAGE_TREE_PREFETCH_DEPTH. With the PAGE_TREE_CACHE option set, each process
+instead keeps a snapshot of the entire page tree in memory, as plain rows. A
+version token, stored in the Django cache named by PAGE_TREE_CACHE, is
+replaced whenever the tree changes; a process only reloads its snapshot when
+the version token it was built from is no longer current.
+
+Snapshots contain rows, not Page instances, so that nothing can leak between
+requests (or threads) via cached properties on a shared Page. Each request
+gets its own PageTree, which creates Page instances from the snapshot only
+when they are asked for, with their parents and children already in place.
+
+This module also has the functions which Page.save and Page.delete use to
+keep the nested set (the `left` and `right` of each page) up to date. Those
+must only be called with the page tree locked (see Page._lock_tree).
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from uncms.cache_versions import CacheVersion
+from uncms.conf import defaults
+from uncms.models.managers import publication_manager
+from uncms.not_found import NotFoundCache
+from uncms.pages import get_page_model
+from uncms.pages.signals import page_publication_changed
+
+PAGE_TREE_VERSION_KEY = "uncms.pages.tree.version"
+PUBLICATION_SWEEP_KEY = "uncms.pages.tree.publication_sweep"
+
+# Snapshots of the page tree built by this process, keyed by whether they
+# contain only published pages.
+_snapshots = {}
+
+
+# Replaced whenever the page tree changes.
+page_tree_version = CacheVersion("PAGE_TREE_CACHE", PAGE_TREE_VERSION_KEY)
+
+# Paths for which PageMiddleware found nothing to serve.
+page_not_found_cache = NotFoundCache("pages", get_version=page_tree_version.get)
+
+
+def invalidate_page_tree():
+    """
+    Invalidates the page tree. This must be called by anything that changes
+    the page tree.
+    """
+    page_not_found_cache.clear()
+    page_tree_version.invalidate()
+
+
+def sweep_publication(now=None):
+    """
+    Finds pages which have been published or have expired since the last
+    time this was called, because their publication or expiry dates have
+    passed. If there are any, this invalidates the page tree and sends
+    `page_publication_changed` for them. Returns the changed pages.
+
+    The time of the last sweep is kept in the cache named by PAGE_TREE_CACHE
+    (or the default cache, if it is not set). If there is no record of a
+    previous sweep, the page tree is invalidated, but no pages are returned,
+    because we cannot know which of them have changed.
+    """
+    now = now or timezone.now()
+    cache = caches[defaults.PAGE_TREE_CACHE or DEFAULT_CACHE_ALIAS]
+    last_sweep = cache.get(PUBLICATION_SWEEP_KEY)
+    cache.set(PUBLICATION_SWEEP_KEY, now, None)
+
+    if last_sweep is None:
+        invalidate_page_tree()
+        return []
+
+    page_model = get_page_model()
+    pages = list(page_model.objects.get_publication_changes(last_sweep, now))
+    if pages:
+        invalidate_page_tree()
+        page_publication_changed.send(sender=page_model, pages=pages)
+    return pages
+
+
+def excise_branch(left, branch_width):
+    """
+    Closes the gap left by removing a branch of the given width, which
+    started at `left`, from the tree.
+    """
+    page_model = get_page_model()
+    page_model.objects.filter(left__gte=left).update(
+        left=F("left") - branch_width,
+    )
+    page_model.objects.filter(right__gte=left).update(
+        right=F("right") - branch_width,
+    )
+
+
+def insert_branch(left, branch_width):
+    """
+    Opens a gap in the tree for a branch of the given width, starting at
+    `left`.
+    """
+    page_model = get_page_model()
+    page_model.objects.filter(left__gte=left).update(
+        left=F("left") + branch_width,
+    )
+    page_model.objects.filter(right__gte=left).update(
+        right=F("right") + branch_width,
+    )
+
+
+def make_room(parent, branch_width):
+    """
+    Finds space for a branch of the given width after the last child of
+    `parent` (a dict of its current values), for when PAGE_TREE_GAP is set.
+    If there is not enough, more is made, plus PAGE_TREE_GAP to spare.
+    Returns the `left` for the branch, and how far the rest of the tree was
+    moved to make room.
+    """
+    # The last child of the parent has the highest `right` of all of its
+    # descendants, so this can be found with the index on `right` alone.
+    # Offline pages take up space too, so _base_manager is used here.
+    base_manager = get_page_model()._base_manager
+    last_right = (
+        base_manager.filter(right__gt=parent["left"], right__lt=parent["right"])
+        .order_by("-right")
+        .values_list("right", flat=True)
+        .first()
+    )
+    left = (last_right or parent["left"]) + 1
+    if left + branch_width <= parent["right"]:
+        return left, 0
+
+    shift = left + branch_width + defaults.PAGE_TREE_GAP - parent["right"]
+    base_manager.filter(left__gte=parent["right"]).update(
+        left=F("left") + shift,
+    )
+    base_manager.filter(right__gte=parent["right"]).update(
+        right=F("right") + shift,
+    )
+    return left, shift
+
+
+def move_branch(page, parent):
+    """
+    Moves the descendants of `page` to the end of the children of `parent`,
+    for when PAGE_TREE_GAP is set, and returns the new `left` and `right`
+    for `page` itself. `page` and `parent` are dicts of their current
+    values.
+    """
+    old_left = page["left"]
+    old_right = page["right"]
+    branch_width = old_right - old_left + 1
+    left, shift = make_room(parent, branch_width)
+    # Making room may have moved this branch too.
+    if old_left >= parent["right"]:
+        old_left += shift
+        old_right += shift
+    offset = left - old_left
+    get_page_model()._base_manager.filter(
+        left__gt=old_left, right__lt=old_right
+    ).update(
+        left=F("left") + offset,
+        right=F("right") + offset,
+    )
+    return left, left + branch_width - 1
+
+
+@dataclass(frozen=True)
+class PageTreeSnapshot:
+    """
+    PageTreeSnapshot is an immutable copy of the rows of the page tree, as it
+    was at a given version.
+    """
+
+    version: str
+    db: str
+    field_names: tuple
+    # Mapping of page IDs to tuples of values, in the order of `field_names`.
+    rows: dict
+    # Mapping of page IDs to lists of their children's IDs, in tree order.
+    children: dict
+    # Mapping of page paths, relative to the homepage and without leading or
+    # trailing slashes (so "" for the homepage), to page IDs.
+    paths: dict
+    homepage_id: Optional[int]
+    # If this snapshot contains only published pages, this is the time at
+    # which some page will become published or expire.
+    valid_until: Optional[datetime] = None
+
+    @classmethod
+    def build(cls, version, select_published):
+        page_model = get_page_model()
+        field_names = tuple(field.attname for field in page_model._meta.concrete_fields)
+        id_index = field_names.index("id")
+        parent_id_index = field_names.index("parent_id")
+        slug_index = field_names.index("slug")
+        left_index = field_names.index("left")
+        right_index = field_names.index("right")
+
+        with publication_manager.select_published(select_published):
+            queryset = page_model.objects.order_by("left")
+            rows = {}
+            children = {}
+            paths = {}
+            homepage_id = None
+            # Stack of (right, path) for the ancestors of the current page.
+            # Ordering by "left" guarantees that we see every page after its
+            # ancestors, and children in the right order.
+            ancestors = []
+            for values in queryset.values_list(*field_names):
+                page_id = values[id_index]
+                parent_id = values[parent_id_index]
+                rows[page_id] = values
+                children.setdefault(page_id, [])
+                if parent_id is None:
+                    homepage_id = page_id
+                else:
+                    children.setdefault(parent_id, []).append(page_id)
+
+                while ancestors and ancestors[-1][0] < values[left_index]:
+                    ancestors.pop()
+                if ancestors:
+                    path = "/".join(
+                        part for part in (ancestors[-1][1], values[slug_index]) if part
+                    )
+                else:
+                    path = ""
+                paths[path] = page_id
+                ancestors.append((values[right_index], path))
+
+        valid_until = None
+        if select_published:
+            # Publication dates are evaluated to the minute; see
+            # PageManager.select_published.
+            now = timezone.now().replace(second=0, microsecond=0)
+            boundaries = page_model._base_manager.aggregate(
+                publication=Min("publication_date", filter=Q(publication_date__gt=now)),
+                expiry=Min("expiry_date", filter=Q(expiry_date__gt=now)),
+            )
+            valid_until = min(
+                (boundary for boundary in boundaries.values() if boundary),
+                default=None,
+            )
+
+        return cls(
+            version=version,
+            db=queryset.db,
+            field_names=field_names,
+            rows=rows,
+            children=children,
+            paths=paths,
+            homepage_id=homepage_id,
+            valid_until=valid_until,
+        )
+
+    def is_current(self, version):
+        if self.version != version:
+            return False
+        if self.valid_until is None:
+            return True
+        return timezone.now().replace(second=0, microsecond=0) < self.valid_until
+
+
+class PageTree:
+    """
+    PageTree gives access to the pages in a PageTreeSnapshot. It is intended
+    to live for the duration of a single request.
+
+    Pages are created from the snapshot as they are asked for, and only once
+    per PageTree, so that accessing e.g. `children` or `parent` on any page it
+    returns will not cause a database query.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.page_model = get_page_model()
+        self._pages = {}
+
+    @property
+    def homepage(self):
+        if self.snapshot.homepage_id is None:
+            return None
+        return self.get(self.snapshot.homepage_id)
+
+    def get(self, page_id):
+        """Returns the page with the given ID, or None if it is not in the tree."""
+        try:
+            return self._pages[page_id]
+        except KeyError:
+            pass
+
+        try:
+            values = self.snapshot.rows[page_id]
+        except KeyError:
+            return None
+
+        page = self.page_model.from_db(
+            self.snapshot.db, self.snapshot.field_names, values
+        )
+        page._page_tree = self
+        if page.parent_id is not None:
+            self.page_model.parent.field.set_cached_value(
+                page, self.get(page.parent_id)
+            )
+        self._pages[page_id] = page
+        return page
+
+    def get_children(self, page):
+        return [
+            self.get(child_id) for child_id in self.snapshot.children.get(page.pk, [])
+        ]
+
+    def get_for_path(self, path):
+        """
+        Returns the page whose path is the longest match for the start of
+        `path` (relative to the homepage), or None if there is no homepage.
+        """
+        slugs = path.strip("/").split("/")
+        for length in range(len(slugs), 0, -1):
+            page_id = self.snapshot.paths.get("/".join(slugs[:length]))
+            if page_id is not None:
+                return self.get(page_id)
+        return self.homepage
+
+    def get_breadcrumbs(self, path):
+        """
+        Returns the trail of pages from the homepage to the best match for
+        `path`; see `get_for_path`.
+        """
+        breadcrumbs = []
+        page = self.get_for_path(path)
+        while page is not None:
+            breadcrumbs.append(page)
+            page = page.parent
+        breadcrumbs.reverse()
+        return breadcrumbs
+
+
+def get_page_tree():
+    """
+    Returns a PageTree for the current publication state, reloading this
+    process's snapshot of the page tree if it has been invalidated.
+    """
+    select_published = publication_manager.select_published_active()
+    version = page_tree_version.get()
+    snapshot = _snapshots.get(select_published)
+    if snapshot is None or not snapshot.is_current(version):
+        snapshot = PageTreeSnapshot.build(version, select_published)
+        _snapshots[select_published] = snapshot
+    return PageTree(snapshot)
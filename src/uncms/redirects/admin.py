@@ -1,21 +1,53 @@
+from datetime import timedelta
+
 from django.contrib import admin, messages
 from django.contrib.admin.options import IS_POPUP_VAR
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
 from django.http import HttpResponseNotFound
 from django.shortcuts import redirect, render
 from django.urls import path, reverse
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.http import require_http_methods
 
 from uncms.conf import defaults
+from uncms.redirects.analysis import analyse_redirects
 from uncms.redirects.forms import RedirectImportForm, RedirectImportSaveForm
-from uncms.redirects.models import Redirect
+from uncms.redirects.models import Redirect, get_page_paths
+
+
+class StaleRedirectFilter(admin.SimpleListFilter):
+    """
+    Permit filtering the redirects list to show those which have not been
+    used recently (or at all, since hits started being counted).
+    """
+
+    parameter_name = "stale"
+    title = _("last used")
+
+    def lookups(self, request, model_admin):
+        return (
+            ("never", _("Never")),
+            ("30", _("Not in the last 30 days")),
+            ("90", _("Not in the last 90 days")),
+            ("365", _("Not in the last year")),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == "never":
+            return queryset.filter(last_hit__isnull=True)
+        if self.value() in {"30", "90", "365"}:
+            since = timezone.now() - timedelta(days=int(self.value()))
+            return queryset.filter(Q(last_hit__isnull=True) | Q(last_hit__lt=since))
+        return queryset
 
 
 @admin.register(Redirect)
 class RedirectAdmin(admin.ModelAdmin):
-    list_filter = ["type"]
+    list_filter = ["type", StaleRedirectFilter]
     search_fields = ("old_path", "new_path")
 
     def changelist_view(self, request, extra_context=None):
@@ -27,6 +59,7 @@ class RedirectAdmin(admin.ModelAdmin):
             # here - likely nothing will ever have an FK to us).
             IS_POPUP_VAR not in request.GET
         )
+        extra_context["show_analysis_button"] = IS_POPUP_VAR not in request.GET
         return super().changelist_view(request, extra_context)
 
     def is_import_enabled(self, request):
@@ -56,9 +89,18 @@ class RedirectAdmin(admin.ModelAdmin):
                 "new_path",
                 "regular_expression",
                 "type",
+                "hit_count",
+                "last_hit",
                 "test_redirect",
             ]
-        return ["old_path", "new_path", "type", "test_redirect"]
+        return [
+            "old_path",
+            "new_path",
+            "type",
+            "hit_count",
+            "last_hit",
+            "test_redirect",
+        ]
 
     def get_urls(self):
         """Adds in some custom admin URLs."""
@@ -68,8 +110,44 @@ class RedirectAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.import_csv_view),
                 name="redirects_redirect_import_csv",
             ),
+            path(
+                "analysis/",
+                self.admin_site.admin_view(self.analysis_view),
+                name="redirects_redirect_analysis",
+            ),
         ] + super().get_urls()
 
+    @method_decorator(require_http_methods(["GET"]))
+    def analysis_view(self, request):
+        """
+        Shows chains and loops of redirects. This does not save anything;
+        see RedirectManager.update_final_paths.
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        # This must agree with RedirectManager.update_final_paths.
+        analysis = analyse_redirects(
+            Redirect.objects.filter(regular_expression=False),
+            get_served_paths=get_page_paths,
+        )
+        # Sets (but does not save) final_path, to show where each chain
+        # really ends up.
+        analysis.apply()
+        return render(
+            request,
+            "admin/redirects/redirect/analysis.html",
+            {
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "title": _("Redirect chains and loops"),
+                "chains": analysis.chains,
+                "loops": [
+                    [analysis.redirects[path] for path in loop]
+                    for loop in analysis.loops
+                ],
+            },
+        )
+
     @method_decorator(require_http_methods(["GET", "POST"]))
     def import_csv_view(self, request):
         if not self.is_import_enabled(request):
@@ -0,0 +1,194 @@
+"""
+Finds chains and loops among (non-regular expression) redirects.
+
+Sites accumulate redirects over the years, and it is common for a redirect
+to point to a path which has since been redirected elsewhere (A 🡢 B 🡢 C).
+Each of those hops is a separate round trip for the client. Worse, a chain
+can loop back on itself, which will only be noticed when a browser gives
+up.
+
+`analyse_redirects` treats the redirects as a graph, in which each redirect
+points to the redirect for its `new_path` (if any), and works out where a
+client will end up by following each chain. That destination is stored in
+`Redirect.final_path`, so that the first redirect can send the client
+straight there.
+
+Only permanent hops are skipped: if a chain passes through a temporary
+redirect, or one which serves a 410 Gone, `final_path` stops at it, so that
+changing it still has the intended effect. Redirects only take effect on
+404s, so a chain also stops at any path where a page is served, rather than
+skipping over the page. Redirects which lead into a loop are left alone,
+and reported.
+"""
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from uncms.redirects.types import RedirectTypeChoices
+
+
+def get_local_path(url):
+    """
+    Returns `url` if it is a plain local path that a redirect could match,
+    or None (e.g. for external URLs, and those with a query string).
+    """
+    parsed = urlparse(url)
+    if parsed.scheme or parsed.netloc or parsed.query or parsed.fragment:
+        return None
+    if not parsed.path.startswith("/"):
+        return None
+    return parsed.path
+
+
+def get_path_variants(path):
+    """
+    Returns `path`, and `path` with its trailing slash removed or added.
+    """
+    if path.endswith("/"):
+        return [path, path[:-1]]
+    return [path, f"{path}/"]
+
+
+@dataclass
+class RedirectAnalysis:
+    # Mapping of old paths to redirects.
+    redirects: dict
+    # Mapping of old paths to the old path of the redirect that their
+    # `new_path` is redirected by.
+    successors: dict = field(default_factory=dict)
+    # Mapping of old paths to where a client will end up after following
+    # every permanent redirect, or "" if that is the redirect's own
+    # `new_path`.
+    final_paths: dict = field(default_factory=dict)
+    # Lists of old paths of redirects which form a loop.
+    loops: list = field(default_factory=list)
+    # Old paths of redirects which are in a loop, or lead into one.
+    looping: set = field(default_factory=set)
+    # Redirects whose `final_path` has been changed by `apply`.
+    changed: list = field(default_factory=list)
+
+    def get_chain(self, path):
+        """
+        Returns the list of redirects that will be followed from the one for
+        `path`, stopping before the first one to be repeated.
+        """
+        chain = []
+        seen = set()
+        while path is not None and path not in seen:
+            seen.add(path)
+            chain.append(self.redirects[path])
+            path = self.successors.get(path)
+        return chain
+
+    @property
+    def chains(self):
+        """
+        Returns every chain of redirects (see get_chain) which does not lead
+        into a loop, longest first. Chains are only given from their first
+        redirect, not from each redirect along them.
+        """
+        starts = self.successors.keys() - set(self.successors.values())
+        chains = [self.get_chain(path) for path in starts if path not in self.looping]
+        return sorted(chains, key=lambda chain: (-len(chain), chain[0].old_path))
+
+    def apply(self):
+        """
+        Sets `final_path` on every redirect, and returns those for which it
+        has changed (which will not have been saved).
+        """
+        self.changed = []
+        for path, redirect in self.redirects.items():
+            final_path = self.final_paths.get(path, "")
+            if redirect.final_path != final_path:
+                redirect.final_path = final_path
+                self.changed.append(redirect)
+        return self.changed
+
+
+def get_successor(redirects, redirect):
+    """
+    Returns the old path of the redirect in `redirects` that the client will
+    be sent to by `redirect`, or None. As in RedirectFallbackMiddleware, the
+    path is tried as it is, then with the trailing slash removed or added.
+    """
+    if redirect.regular_expression:
+        return None
+    path = get_local_path(redirect.new_path)
+    if path is None:
+        return None
+    for candidate in get_path_variants(path):
+        if candidate in redirects:
+            return candidate
+    return None
+
+
+def can_skip(redirect, served_paths=frozenset()):
+    """
+    Returns True if a client can be sent past `redirect` to wherever it
+    leads. It cannot if its `old_path` is in `served_paths`, because
+    something other than the redirect is served there.
+    """
+    return (
+        redirect.type == RedirectTypeChoices.PERMANENT
+        and redirect.new_path != ""
+        and redirect.old_path not in served_paths
+    )
+
+
+def analyse_redirects(redirects, get_served_paths=None):
+    """
+    Returns a RedirectAnalysis of `redirects`, an iterable of non-regular
+    expression Redirects.
+
+    `get_served_paths`, if given, is called with the set of old paths of the
+    redirects which others lead to, and must return those at which
+    something other than the redirect (i.e. a page) is served. Chains stop
+    at those, rather than skipping past them.
+    """
+    analysis = RedirectAnalysis(
+        redirects={redirect.old_path: redirect for redirect in redirects}
+    )
+    for path, redirect in analysis.redirects.items():
+        successor = get_successor(analysis.redirects, redirect)
+        if successor is not None:
+            analysis.successors[path] = successor
+
+    served_paths = set()
+    if get_served_paths is not None and analysis.successors:
+        served_paths = get_served_paths(set(analysis.successors.values()))
+
+    # Each redirect has at most one successor, so walking from each one in
+    # turn either reaches one which has already been resolved, one with no
+    # successor, or one already on this walk (a loop).
+    resolved = {}
+    for start in analysis.redirects:
+        walk = []
+        positions = {}
+        path = start
+        while path is not None and path not in resolved and path not in positions:
+            positions[path] = len(walk)
+            walk.append(path)
+            path = analysis.successors.get(path)
+
+        if path in positions:
+            analysis.loops.append(walk[positions[path] :])
+            analysis.looping.update(walk)
+            resolved.update(dict.fromkeys(walk))
+            continue
+
+        for path in reversed(walk):
+            redirect = analysis.redirects[path]
+            successor = analysis.successors.get(path)
+            if successor is None:
+                resolved[path] = redirect.new_path
+            elif successor in analysis.looping:
+                analysis.looping.add(path)
+                resolved[path] = None
+            elif can_skip(analysis.redirects[successor], served_paths):
+                resolved[path] = resolved[successor]
+            else:
+                resolved[path] = redirect.new_path
+
+    for path, final_path in resolved.items():
+        if final_path is not None and final_path != analysis.redirects[path].new_path:
+            analysis.final_paths[path] = final_path
+    return analysis
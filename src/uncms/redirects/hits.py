@@ -0,0 +1,108 @@
+"""
+Counts how often each redirect is used.
+
+Writing to the database every time a redirect is served would make every
+redirect a write, and have every process contend for the same rows. Instead,
+each process counts hits in memory, and writes them all at once, in a few
+batched UPDATE queries, REDIRECTS_HIT_FLUSH_INTERVAL seconds after the
+first hit that has not been written. The writes happen in a background
+thread, so they do not hold up whichever request is being served at the
+time, and they happen whether or not any more redirects are served.
+
+Whatever has not been written is written when the process exits normally.
+Hits are lost if it is killed, so the counts are a lower bound; and
+`last_hit` may be out by up to the flush interval. That is good enough to
+tell which redirects are no longer used.
+"""
+import atexit
+import threading
+
+from django.db import connections
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+
+from uncms.conf import defaults
+from uncms.redirects.models import Redirect
+
+
+class RedirectHitCounter:
+    """
+    RedirectHitCounter buffers hits on redirects in memory, and flushes
+    them to the database in batches.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        # Mapping of redirect IDs to (number of hits, time of the last hit).
+        self._hits = {}
+        # The timer which will flush the buffered hits, if there are any.
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def record(self, redirect):
+        """
+        Records a hit on `redirect`. The first hit to be buffered schedules
+        a flush REDIRECTS_HIT_FLUSH_INTERVAL seconds later; if that is 0,
+        it is flushed now.
+        """
+        interval = defaults.REDIRECTS_HIT_FLUSH_INTERVAL
+        if interval is None or redirect.pk is None:
+            return
+        with self._lock:
+            count, _ = self._hits.get(redirect.pk, (0, None))
+            self._hits[redirect.pk] = (count + 1, timezone.now())
+            due = not interval
+            if not due and self._timer is None:
+                self._timer = threading.Timer(interval, self._flush_in_background)
+                # Don't keep the process alive for it; see the atexit hook.
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Writes every buffered hit to the database."""
+        with self._lock:
+            hits, self._hits = self._hits, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        pks = list(hits)
+        for start in range(0, len(pks), self.batch_size):
+            batch = pks[start : start + self.batch_size]
+            Redirect._base_manager.filter(pk__in=batch).update(
+                hit_count=F("hit_count")
+                + Case(
+                    *[When(pk=pk, then=Value(hits[pk][0])) for pk in batch],
+                    default=Value(0),
+                ),
+                last_hit=Case(
+                    *[When(pk=pk, then=Value(hits[pk][1])) for pk in batch],
+                    output_field=DateTimeField(),
+                ),
+            )
+
+    def discard(self):
+        """Throws away every buffered hit, without writing it."""
+        with self._lock:
+            self._hits = {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            # Connections are per-thread, and nothing else will close this
+            # thread's.
+            connections.close_all()
+
+    def __len__(self):
+        """Returns the number of redirects with hits waiting to be written."""
+        return len(self._hits)
+
+
+redirect_hit_counter = RedirectHitCounter()
+atexit.register(redirect_hit_counter.flush)
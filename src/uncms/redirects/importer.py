@@ -15,12 +15,17 @@ the extra dependency for something most sites will want.
 """
 
 import csv
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 
+import django
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import connections, transaction
 from django.utils.translation import gettext_lazy as _
 
+from uncms.redirects.matcher import invalidate_redirects
 from uncms.redirects.models import Redirect
 
 
@@ -39,6 +44,28 @@ class RedirectError:
         return f"{self.filename}: {self.line_number}: {self.message}"
 
 
+def validate_lines(lines):
+    """
+    Validates `lines`, a list of (line_number, old_path, new_path) tuples.
+    Returns a list of (line_number, old_path, new_path, error) tuples, with
+    the paths normalised (see Redirect.clean) and `error` None for valid
+    lines.
+
+    This does not touch the database, and takes and returns only plain
+    values, so that it can run in another process.
+    """
+    results = []
+    for line_number, old_path, new_path in lines:
+        redirect = Redirect(old_path=old_path, new_path=new_path)
+        try:
+            redirect.full_clean(validate_unique=False)
+        except ValidationError as e:
+            results.append((line_number, old_path, new_path, "; ".join(e.messages)))
+        else:
+            results.append((line_number, redirect.old_path, redirect.new_path, None))
+    return results
+
+
 @dataclass
 class RedirectImporter:
     # List of `RedirectError`s found after `load()` was called.
@@ -50,14 +77,61 @@ class RedirectImporter:
     # List of tuples of (instance, created) after `RedirectImporter.save()`
     # was called.
     saved_objects: list = field(default_factory=list)
+    # Number of lines read by `iter_load()` (or `load()`).
+    line_count: int = 0
+    # Numbers of redirects created and updated.
+    created_count: int = 0
+    updated_count: int = 0
+    # The pool started by `start_workers()`, if any.
+    _executor: ProcessPoolExecutor = field(default=None, init=False, repr=False)
 
     def load(self, fd, skip_header=False):
         """
         Load the given file and validate all entries within it (call `save()`
         after this to actually save it to the database).
         """
+        for chunk in self.iter_load(fd, skip_header=skip_header):
+            self.to_create.extend(chunk)
+
+    def iter_load(self, fd, skip_header=False, chunk_size=500, workers=1):
+        """
+        Reads and validates the given file `chunk_size` lines at a time,
+        yielding a list of unsaved Redirect objects for each chunk. Errors
+        are added to `errors`.
+
+        Only a few chunks are held in memory at once. If `workers` is more
+        than 1, chunks are validated in parallel, in that many processes.
+        """
+        if workers > 1:
+            chunks = self._iter_parallel(fd, skip_header, chunk_size, workers)
+        else:
+            chunks = (
+                validate_lines(lines)
+                for lines in self._iter_chunks(fd, skip_header, chunk_size)
+            )
+        for results in chunks:
+            chunk = []
+            for line_number, old_path, new_path, message in results:
+                if message is None:
+                    chunk.append(Redirect(old_path=old_path, new_path=new_path))
+                else:
+                    self.errors.append(
+                        RedirectError(
+                            filename=fd.name, line_number=line_number, message=message
+                        )
+                    )
+            yield chunk
+
+    def _iter_chunks(self, fd, skip_header, chunk_size):
+        """
+        Yields lists of up to `chunk_size` (line_number, old_path, new_path)
+        tuples from the file, adding errors for lines which are obviously
+        wrong to `errors`.
+        """
+        lines = []
         reader = csv.reader(fd)
         for index, line in enumerate(reader):
+            self.line_count += 1
             index_1 = index + 1
             if index == 0 and skip_header:
                 continue
@@ -92,37 +166,128 @@ class RedirectImporter:
                     )
                 )
                 continue
+
+            lines.append((index_1, old_path, new_path))
+            if len(lines) >= chunk_size:
+                yield lines
+                lines = []
+        if lines:
+            yield lines
+
+    @contextmanager
+    def start_workers(self, workers):
+        """
+        Starts a pool of `workers` processes, which `iter_load()` uses to
+        validate lines until the block exits. This does nothing if `workers`
+        is 1 or less, or if a pool has already been started.
+
+        The workers are forked from this process, and must not share its
+        database connections, so this closes them first; call it before
+        starting a transaction. The workers never use the database.
+        """
+        if workers <= 1 or self._executor is not None:
+            yield
+            return
+        for connection in connections.all(initialized_only=True):
+            # Closing a connection in a transaction would abandon it.
+            if not connection.in_atomic_block:
+                connection.close()
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=django.setup
+        ) as executor:
+            # Forked processes are only started when the first task is
+            # submitted; do that now, rather than in a transaction.
+            executor.submit(int).result()
+            self._executor = executor
             try:
-                temporary_obj = Redirect(old_path=old_path, new_path=new_path)
-                temporary_obj.full_clean(validate_unique=False)
-            except ValidationError as e:
-                self.errors.append(
-                    RedirectError(
-                        filename=fd.name,
-                        line_number=index_1,
-                        message="; ".join(e.messages),
-                    )
-                )
-            else:
-                self.to_create.append(temporary_obj)
+                yield
+            finally:
+                self._executor = None
 
-    def save(self, dry_run=False):
-        with transaction.atomic():
-            for redirect in self.to_create:
-                self.saved_objects.append(
-                    Redirect.objects.update_or_create(
-                        defaults={"new_path": redirect.new_path},
-                        old_path=redirect.old_path,
-                    )
-                )
+    def _iter_parallel(self, fd, skip_header, chunk_size, workers):
+        """
+        Validates chunks in a pool of `workers` processes, yielding the
+        results in order. At most two chunks per worker are in flight at once.
+        """
+        pending = deque()
+        with self.start_workers(workers):
+            for lines in self._iter_chunks(fd, skip_header, chunk_size):
+                pending.append(self._executor.submit(validate_lines, lines))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
 
+    def save(self, dry_run=False, batch_size=500):
+        """
+        Saves the redirects loaded with `load()`, updating any which already
+        exist.
+        """
+        with transaction.atomic():
+            self.saved_objects.extend(
+                self.save_chunk(self.to_create, batch_size=batch_size)
+            )
+            Redirect.objects.update_final_paths(batch_size=batch_size)
             if dry_run:
                 transaction.set_rollback(True)
 
+    def save_chunk(self, redirects, batch_size=500):
+        """
+        Saves `redirects` (unsaved Redirect objects), updating any which
+        already exist, and returns a list of (instance, created) tuples.
+
+        Existing redirects are fetched, and new ones created or updated, in
+        batches of `batch_size`, rather than with a query (or two) for each
+        redirect.
+
+        As no signals are sent, the caller must call
+        `Redirect.objects.update_final_paths()` once every chunk has been
+        saved.
+        """
+        saved_objects = []
+        with transaction.atomic(savepoint=False):
+            existing = {}
+            paths = list(dict.fromkeys(redirect.old_path for redirect in redirects))
+            for start in range(0, len(paths), batch_size):
+                for redirect in Redirect.objects.filter(
+                    old_path__in=paths[start : start + batch_size]
+                ):
+                    existing[redirect.old_path] = redirect
+
+            to_insert = []
+            to_update = {}
+            for loaded in redirects:
+                redirect = existing.get(loaded.old_path)
+                if redirect is None:
+                    redirect = Redirect(
+                        old_path=loaded.old_path, new_path=loaded.new_path
+                    )
+                    existing[redirect.old_path] = redirect
+                    to_insert.append(redirect)
+                    saved_objects.append((redirect, True))
+                    continue
+
+                if redirect.new_path != loaded.new_path:
+                    redirect.new_path = loaded.new_path
+                    if redirect.pk is not None:
+                        to_update[redirect.pk] = redirect
+                saved_objects.append((redirect, False))
+
+            Redirect.objects.bulk_create(to_insert, batch_size=batch_size)
+            Redirect.objects.bulk_update(
+                to_update.values(), ["new_path"], batch_size=batch_size
+            )
+            # Neither of those send signals.
+            invalidate_redirects()
+
+        self.created_count += len(to_insert)
+        self.updated_count += len(saved_objects) - len(to_insert)
+        return saved_objects
+
     @property
     def statistics(self):
         return {
-            "total": len(self.saved_objects),
-            "created": len([obj for obj in self.saved_objects if obj[1] is True]),
-            "updated": len([obj for obj in self.saved_objects if obj[1] is False]),
+            "total": self.created_count + self.updated_count,
+            "created": self.created_count,
+            "updated": self.updated_count,
         }
@@ -0,0 +1,49 @@
+from django.core.management import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy as _
+
+from uncms.redirects.models import Redirect
+
+
+class Command(BaseCommand):
+    help = "Find chains and loops of redirects, and send clients straight to the end of each chain"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help=_("number of redirects to update in each query"),
+        )
+
+    def handle(self, *args, **options):
+        analysis = Redirect.objects.update_final_paths(batch_size=options["batch_size"])
+
+        chains = analysis.chains
+        if options["verbosity"] > 1:
+            for chain in chains:
+                self.stdout.write(
+                    _("chain: {chain}").format(
+                        chain=" 🡢 ".join(
+                            [redirect.old_path for redirect in chain]
+                            + [chain[-1].new_path]
+                        )
+                    )
+                )
+        for loop in analysis.loops:
+            self.stderr.write(
+                self.style.ERROR(
+                    _("loop: {loop}").format(loop=" 🡢 ".join(loop + loop[:1]))
+                )
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                _("{changed} redirects updated, {chains} chains found").format(
+                    changed=len(analysis.changed), chains=len(chains)
+                )
+            )
+        )
+        if analysis.loops:
+            raise CommandError(
+                _("{loops} redirect loops found").format(loops=len(analysis.loops))
+            )
@@ -1,7 +1,11 @@
+import time
+
 from django.core.management import BaseCommand, CommandError
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
 from uncms.redirects.importer import RedirectImporter
+from uncms.redirects.models import Redirect
 
 
 class Command(BaseCommand):
@@ -25,40 +29,63 @@ class Command(BaseCommand):
             action="store_true",
             help=_("ignore bad entries and attempt to continue"),
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=_("number of processes to validate lines in"),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help=_(
+                "number of lines to validate at once, and of redirects to fetch, create or update in each query"
+            ),
+        )
 
     def handle(self, *args, **options):
         importer = RedirectImporter()
-        for f in options["files"]:
-            with open(f, encoding="utf-8") as fd:
-                importer.load(fd, skip_header=options["skip_header"])
+        started = time.monotonic()
+        # Everything is saved in one transaction, so that nothing is saved if
+        # there are errors (unless they are ignored), or on a dry run. Any
+        # worker processes are started first, outside of it.
+        with importer.start_workers(options["workers"]), transaction.atomic():
+            for f in options["files"]:
+                with open(f, encoding="utf-8") as fd:
+                    for chunk in importer.iter_load(
+                        fd,
+                        skip_header=options["skip_header"],
+                        chunk_size=options["batch_size"],
+                        workers=options["workers"],
+                    ):
+                        saved_objects = importer.save_chunk(
+                            chunk, batch_size=options["batch_size"]
+                        )
+                        self.report_saved(saved_objects, options)
+                        if options["verbosity"] > 1:
+                            self.report_progress(importer, started)
 
-        if importer.errors:
-            for error in importer.errors:
-                if options["ignore_errors"]:
-                    style = self.style.WARNING
-                else:
-                    style = self.style.ERROR
-                self.stderr.write(style(str(error)))
-            if not options["ignore_errors"]:
-                raise CommandError(
-                    _(
-                        "abandoning import due to errors (use `--ignore-errors` to skip bad entries)"
+            if importer.errors:
+                for error in importer.errors:
+                    if options["ignore_errors"]:
+                        style = self.style.WARNING
+                    else:
+                        style = self.style.ERROR
+                    self.stderr.write(style(str(error)))
+                if not options["ignore_errors"]:
+                    raise CommandError(
+                        _(
+                            "abandoning import due to errors (use `--ignore-errors` to skip bad entries)"
+                        )
                     )
-                )
 
-        importer.save(dry_run=options["dry_run"])
+            Redirect.objects.update_final_paths(batch_size=options["batch_size"])
 
-        if options["dry_run"] or options["verbosity"] > 1:
-            for obj, created in importer.saved_objects:
-                if created:
-                    message = _("created: {obj}").format(obj=str(obj))
-                else:
-                    message = _("updated: {obj}").format(obj=str(obj))
-                if options["dry_run"]:
-                    self.stdout.write(_("DRY RUN: {message}").format(message=message))
-                else:  # we're printing because we're in super verbose mode
-                    self.stdout.write(message)
+            if options["dry_run"]:
+                transaction.set_rollback(True)
 
+        self.report_progress(importer, started)
         if options["dry_run"]:
             self.stdout.write(
                 self.style.SUCCESS(
@@ -75,3 +102,26 @@ class Command(BaseCommand):
                     ).format(**importer.statistics)
                 )
             )
+
+    def report_saved(self, saved_objects, options):
+        if not (options["dry_run"] or options["verbosity"] > 1):
+            return
+        for obj, created in saved_objects:
+            if created:
+                message = _("created: {obj}").format(obj=str(obj))
+            else:
+                message = _("updated: {obj}").format(obj=str(obj))
+            if options["dry_run"]:
+                self.stdout.write(_("DRY RUN: {message}").format(message=message))
+            else:  # we're printing because we're in super verbose mode
+                self.stdout.write(message)
+
+    def report_progress(self, importer, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            _("{lines} lines processed in {elapsed:.1f}s ({rate:.0f} lines/s)").format(
+                lines=importer.line_count,
+                elapsed=elapsed,
+                rate=importer.line_count / elapsed if elapsed else 0,
+            )
+        )
@@ -0,0 +1,192 @@
+"""
+A process-wide, precompiled index of every redirect.
+
+Without this, finding the redirect for a path means a query for exact
+redirects, and (with REGEX_REDIRECTS) loading every regular expression
+redirect and trying each of them in turn. With the REDIRECTS_CACHE option
+set, each process instead keeps a RedirectMatcher in memory: exact redirects
+are kept in a dict, and regular expression redirects are grouped by the
+first segment of the path that they match, with each group compiled into a
+single regular expression.
+
+As with the page tree cache (see uncms.pages.tree), a version token in the
+Django cache named by REDIRECTS_CACHE is replaced whenever a redirect is
+saved or deleted, and a process only rebuilds its matcher when the token it
+was built from is no longer current.
+"""
+import re
+
+from uncms.cache_versions import CacheVersion
+from uncms.conf import defaults
+from uncms.not_found import NotFoundCache
+from uncms.utils import BACKREFERENCE_RE, REGEX_SPECIAL_CHARACTERS
+
+REDIRECTS_VERSION_KEY = "uncms.redirects.matcher.version"
+
+# Matchers built by this process, keyed by whether they include regular
+# expression redirects.
+_matchers = {}
+
+
+# Replaced whenever a redirect is saved or deleted.
+redirects_version = CacheVersion("REDIRECTS_CACHE", REDIRECTS_VERSION_KEY)
+
+# Paths for which RedirectFallbackMiddleware found no redirect.
+redirect_not_found_cache = NotFoundCache("redirects", get_version=redirects_version.get)
+
+
+def invalidate_redirects():
+    """
+    Invalidates the redirect matcher. This is called whenever a redirect is
+    saved or deleted, but must be called by anything that changes redirects
+    without sending signals (e.g. QuerySet.update).
+    """
+    redirect_not_found_cache.clear()
+    redirects_version.invalidate()
+
+
+def get_bucket(path):
+    """
+    Returns the first segment of `path` (e.g. "/blog/" for "/blog/a/"), or
+    None if it does not have a complete one.
+    """
+    end = path.find("/", 1)
+    if not path.startswith("/") or end == -1:
+        return None
+    return path[: end + 1]
+
+
+def get_literal_prefix(pattern):
+    """
+    Returns the fixed string that every path matched by the regular
+    expression `pattern` (with `re.match`) must start with. This is
+    conservative; it may be shorter than it could be.
+    """
+    if "|" in pattern:
+        # An alternation could be anywhere, and make any prefix optional.
+        return ""
+    if pattern.startswith("^"):
+        pattern = pattern[1:]
+    for index, character in enumerate(pattern):
+        if character in REGEX_SPECIAL_CHARACTERS:
+            if character in "?*{":
+                # The previous character is optional.
+                index -= 1
+            return pattern[: max(index, 0)]
+    return pattern
+
+
+class RedirectMatcher:
+    """
+    RedirectMatcher finds the redirect for a path from an in-memory copy of
+    the redirects table. It gives the same results as trying every redirect
+    in turn, in `old_path` order, and picking the first that matches.
+    """
+
+    def __init__(self, version, db, field_names, rows):
+        self.version = version
+        self.db = db
+        self.field_names = field_names
+        # Redirect rows, in `old_path` order.
+        self.rows = rows
+        old_path_index = field_names.index("old_path")
+        regular_expression_index = field_names.index("regular_expression")
+
+        # Mapping of exact paths to indexes in `rows`.
+        self.exact = {}
+        # Mapping of path buckets (see get_bucket) to lists of indexes in
+        # `rows`, of the regular expression redirects that can only match
+        # paths in that bucket. Those which could match any path are under
+        # None.
+        buckets = {}
+        for index, row in enumerate(rows):
+            old_path = row[old_path_index]
+            if row[regular_expression_index]:
+                bucket = get_bucket(get_literal_prefix(old_path))
+                buckets.setdefault(bucket, []).append(index)
+            else:
+                self.exact.setdefault(old_path, index)
+
+        self.buckets = {
+            bucket: self.compile(
+                [(index, rows[index][old_path_index]) for index in indexes]
+            )
+            for bucket, indexes in buckets.items()
+        }
+
+    @classmethod
+    def build(cls, model, version):
+        """Builds a RedirectMatcher from every redirect in the database."""
+        field_names = tuple(field.attname for field in model._meta.concrete_fields)
+        queryset = model.objects.order_by("old_path")
+        return cls(
+            version, queryset.db, field_names, list(queryset.values_list(*field_names))
+        )
+
+    @staticmethod
+    def compile(patterns):
+        """
+        Returns a function which returns the index of the first of
+        `patterns` (a list of (index, pattern) tuples) to match a path, or
+        None.
+        """
+        # Backreferences by number would refer to the wrong group once the
+        # patterns are combined.
+        if not any(BACKREFERENCE_RE.search(pattern) for _, pattern in patterns):
+            try:
+                expression = re.compile(
+                    "|".join(f"(?P<r{index}>{pattern})" for index, pattern in patterns)
+                )
+            except re.error:
+                # They cannot be combined for some other reason, e.g. global
+                # flags, or group names used by more than one pattern.
+                pass
+            else:
+
+                def match_combined(path):
+                    match = expression.match(path)
+                    if match is None:
+                        return None
+                    # The group around each pattern closes after any groups
+                    # within it, so it is always the last group to match.
+                    return int(match.lastgroup[1:])
+
+                return match_combined
+
+        compiled = [(index, re.compile(pattern)) for index, pattern in patterns]
+
+        def match_each(path):
+            for index, pattern in compiled:
+                if pattern.match(path):
+                    return index
+            return None
+
+        return match_each
+
+    def get_for_path(self, path, model):
+        """Returns the redirect for `path`, or None."""
+        candidates = [self.exact.get(path)]
+        for bucket in dict.fromkeys([get_bucket(path), None]):
+            if bucket in self.buckets:
+                candidates.append(self.buckets[bucket](path))
+        index = min(
+            (candidate for candidate in candidates if candidate is not None),
+            default=None,
+        )
+        if index is None:
+            return None
+        return model.from_db(self.db, self.field_names, self.rows[index])
+
+
+def get_redirect_matcher(model):
+    """
+    Returns a RedirectMatcher for the current value of REGEX_REDIRECTS,
+    rebuilding this process's copy if it has been invalidated.
+    """
+    regex_enabled = bool(defaults.REGEX_REDIRECTS)
+    version = redirects_version.get()
+    matcher = _matchers.get(regex_enabled)
+    if matcher is None or matcher.version != version:
+        matcher = RedirectMatcher.build(model, version)
+        _matchers[regex_enabled] = matcher
+    return matcher
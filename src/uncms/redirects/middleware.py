@@ -1,3 +1,5 @@
+from uncms.redirects.hits import redirect_hit_counter
+from uncms.redirects.matcher import redirect_not_found_cache
 from uncms.redirects.models import Redirect
 
 
@@ -13,17 +15,21 @@ class RedirectFallbackMiddleware:
         if response.status_code != 404:
             return response
 
-        redirect = Redirect.objects.get_for_path(request.path)
+        if request.path in redirect_not_found_cache:
+            return response
 
-        # Try removing or adding the trailing slash.
-        if redirect is None:
-            if request.path.endswith("/"):
-                redirect = Redirect.objects.get_for_path(request.path[:-1])
-            else:
-                redirect = Redirect.objects.get_for_path("{}/".format(request.path))
+        # Try the path as it is, then with the trailing slash removed or
+        # added.
+        if request.path.endswith("/"):
+            alternative_path = request.path[:-1]
+        else:
+            alternative_path = "{}/".format(request.path)
+        redirect = Redirect.objects.get_for_paths([request.path, alternative_path])
 
         if redirect is not None:
+            redirect_hit_counter.record(redirect)
             return redirect.response_for_path(request.path)
 
         # No redirect was found. Return the original response.
+        redirect_not_found_cache.add(request.path)
         return response
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # `final_path` is left empty, meaning that clients follow each redirect
+    # in a chain in turn. Filling it in needs the page tree, which this app
+    # does not depend on; run the analyse_redirects command afterwards.
+    dependencies = [
+        ("redirects", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="redirect",
+            name="final_path",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Where clients will end up after following any other redirects that this one leads to, if this is not the new path.",
+                max_length=200,
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("redirects", "0002_redirect_final_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="redirect",
+            name="hit_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="hits"
+            ),
+        ),
+        migrations.AddField(
+            model_name="redirect",
+            name="last_hit",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="last used"
+            ),
+        ),
+    ]
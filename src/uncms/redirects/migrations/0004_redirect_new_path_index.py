@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("redirects", "0003_redirect_hits"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="redirect",
+            name="new_path",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="If you leave this empty, a 410 Gone response will be served for this URL.",
+                max_length=200,
+                verbose_name="redirect to",
+            ),
+        ),
+    ]
@@ -3,9 +3,13 @@ from functools import cached_property
 from sre_constants import error as RegexError
 from urllib.parse import urlparse
 
+from django.apps import apps
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.http import (
     HttpResponseGone,
     HttpResponsePermanentRedirect,
@@ -14,22 +18,136 @@ from django.http import (
 from django.utils.translation import gettext_lazy as _
 
 from uncms.conf import defaults
+from uncms.pages import get_page_model
+from uncms.redirects.analysis import (
+    analyse_redirects,
+    get_local_path,
+    get_path_variants,
+)
+from uncms.redirects.matcher import get_redirect_matcher, invalidate_redirects
 from uncms.redirects.types import RedirectTypeChoices
+from uncms.signals import page_paths_changed
+
+
+def get_page_paths(paths, batch_size=500):
+    """
+    Returns those of `paths` at which there is a page (online or not), with
+    or without a trailing slash. There are none if uncms.pages is not
+    installed.
+    """
+    if not apps.is_installed("uncms.pages"):
+        return set()
+    page_model = get_page_model()
+    variants = sorted(
+        {variant for path in paths for variant in get_path_variants(path)}
+    )
+    page_paths = set()
+    for start in range(0, len(variants), batch_size):
+        page_paths.update(
+            page_model._base_manager.filter(
+                url_path__in=variants[start : start + batch_size]
+            ).values_list("url_path", flat=True)
+        )
+    return {
+        path
+        for path in paths
+        if any(variant in page_paths for variant in get_path_variants(path))
+    }
 
 
 class RedirectManager(models.Manager):
     def get_for_path(self, path):
-        if not defaults.REGEX_REDIRECTS:
-            return Redirect.objects.filter(old_path=path).first()
+        """
+        Returns the redirect for `path`, or None. If more than one redirect
+        matches, the one with the first `old_path` wins.
+        """
+        return self.get_for_paths([path])
 
-        for redirect in self.all():
-            if redirect.old_path == path and not redirect.regular_expression:
-                return redirect
-            if redirect.regular_expression and re.match(redirect.old_path, path):
-                return redirect
+    def get_for_paths(self, paths):
+        """
+        Returns the redirect for the first of `paths` that has one, or None,
+        with a single query (or none at all, with REDIRECTS_CACHE).
+        """
+        if defaults.REDIRECTS_CACHE:
+            matcher = get_redirect_matcher(self.model)
+            for path in paths:
+                redirect = matcher.get_for_path(path, self.model)
+                if redirect is not None:
+                    return redirect
+            return None
+
+        if not defaults.REGEX_REDIRECTS:
+            redirects = {
+                redirect.old_path: redirect
+                for redirect in self.filter(old_path__in=paths)
+            }
+            return next((redirects[path] for path in paths if path in redirects), None)
 
+        redirects = list(
+            self.filter(
+                Q(old_path__in=paths, regular_expression=False)
+                | Q(regular_expression=True)
+            ).order_by("old_path")
+        )
+        for path in paths:
+            for redirect in redirects:
+                if redirect.regular_expression:
+                    if re.match(redirect.old_path, path):
+                        return redirect
+                elif redirect.old_path == path:
+                    return redirect
         return None
 
+    def get_connected(self, paths):
+        """
+        Returns the non-regular expression redirects which are linked, by a
+        chain of redirects in either direction, to any of `paths` (or any
+        redirect from them). This needs one query for each hop along the
+        longest chain.
+        """
+        redirects = {}
+        seen = set()
+        frontier = set(paths)
+        while frontier:
+            seen |= frontier
+            variants = {
+                variant for path in frontier for variant in get_path_variants(path)
+            }
+            frontier = set()
+            for redirect in self.filter(
+                Q(old_path__in=variants) | Q(new_path__in=variants),
+                regular_expression=False,
+            ):
+                if redirect.old_path in redirects:
+                    continue
+                redirects[redirect.old_path] = redirect
+                frontier.add(redirect.old_path)
+                new_path = get_local_path(redirect.new_path)
+                if new_path is not None:
+                    frontier.add(new_path)
+            frontier -= seen
+        return list(redirects.values())
+
+    def update_final_paths(self, batch_size=500, paths=None):
+        """
+        Finds chains and loops among the non-regular expression redirects,
+        and updates their `final_path` to the end of any chain that they
+        start (see uncms.redirects.analysis). Returns the RedirectAnalysis.
+
+        If `paths` is given, only the chains which pass through them are
+        updated, rather than every redirect.
+        """
+        if paths is None:
+            redirects = self.filter(regular_expression=False)
+        else:
+            redirects = self.get_connected(paths)
+        analysis = analyse_redirects(redirects, get_served_paths=get_page_paths)
+        changed = analysis.apply()
+        if changed:
+            self.bulk_update(changed, ["final_path"], batch_size=batch_size)
+            invalidate_redirects()
+        return analysis
+
     def get_queryset(self):
         # If regex redirects have been enabled at some point in time, then
         # turned off again for [reason], we don't want any regular expression
@@ -46,6 +164,10 @@ class RedirectManager(models.Manager):
 class Redirect(models.Model):
     objects = RedirectManager()
 
+    # The `old_path` that this redirect had when it was loaded, so that the
+    # chains which used to pass through it can be updated if it changes.
+    _loaded_old_path = None
+
     type = models.CharField(
         max_length=3,
         choices=RedirectTypeChoices.choices,
@@ -66,6 +188,8 @@ class Redirect(models.Model):
         "redirect to",
         max_length=200,
         blank=True,
+        # For finding the redirects that lead to another (see get_connected).
+        db_index=True,
         help_text=_(
             "If you leave this empty, a 410 Gone response will be served for this URL."
         ),
@@ -90,6 +214,29 @@ class Redirect(models.Model):
         ),
     )
 
+    final_path = models.CharField(
+        max_length=200,
+        blank=True,
+        editable=False,
+        help_text=_(
+            "Where clients will end up after following any other redirects "
+            "that this one leads to, if this is not the new path."
+        ),
+    )
+
+    hit_count = models.PositiveIntegerField(
+        _("hits"),
+        default=0,
+        editable=False,
+    )
+
+    last_hit = models.DateTimeField(
+        _("last used"),
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
     class Meta:
         verbose_name = _("redirect")
         verbose_name_plural = _("redirects")
@@ -200,6 +347,21 @@ class Redirect(models.Model):
                 }
             )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_old_path = instance.__dict__.get("old_path")
+        return instance
+
+    def update_chains(self):
+        """
+        Updates `final_path` on every redirect in a chain that passes through
+        this one, or did before its `old_path` changed.
+        """
+        paths = {self.old_path, self._loaded_old_path} - {None}
+        self._loaded_old_path = self.old_path
+        return Redirect.objects.update_final_paths(paths=paths)
+
     @cached_property
     def permanent(self):
         return self.type == RedirectTypeChoices.PERMANENT
@@ -217,8 +379,33 @@ class Redirect(models.Model):
 
         If this redirect is a regular expression, it will return a
         rewritten version of `request_path`; otherwise returns its own
-        `new_path`.
+        `new_path`, or the end of the chain of redirects that it starts (see
+        RedirectManager.update_final_paths).
         """
         if not self.regular_expression:
-            return self.new_path
+            return self.final_path or self.new_path
         return re.sub(self.old_path, self.new_path, request_path)
+
+
+@receiver(post_save, sender=Redirect)
+@receiver(post_delete, sender=Redirect)
+def invalidate_redirects_on_change(sender, instance, **kwargs):
+    invalidate_redirects()
+    instance.update_chains()
+
+
+@receiver(page_paths_changed)
+def update_final_paths_on_page_change(sender, paths, **kwargs):
+    # Chains must stop at paths where pages have appeared, and no longer
+    # need to where they have gone.
+    if "/" in paths:
+        Redirect.objects.update_final_paths()
+        return
+    query = Q()
+    for path in paths:
+        query |= Q(old_path__startswith=path.rstrip("/"))
+    Redirect.objects.update_final_paths(
+        paths=Redirect.objects.filter(query, regular_expression=False).values_list(
+            "old_path", flat=True
+        )
+    )
@@ -0,0 +1,14 @@
+from django.dispatch import Signal
+
+# Sent by HTMLPipeline (see uncms.html) after each of the functions in
+# HTML_CLEANERS or HTML_OUTPUT_FORMATTERS has run, but only if anything is
+# listening for it. `pipeline` is the name of the setting ("HTML_CLEANERS"
+# or "HTML_OUTPUT_FORMATTERS"), `stage` is the dotted path of the function,
+# and `duration` is how long it took, in seconds.
+html_stage_finished = Signal()
+
+# Sent by Page.save and Page.delete when pages have appeared at, moved from
+# or disappeared from some paths. `paths` is a list of the `url_path`s of
+# the branches of pages that have changed; every page below each of them
+# may have changed too.
+page_paths_changed = Signal()
@@ -1,9 +1,18 @@
+import re
 from urllib.parse import urlparse
 
 from django.conf import settings
 
 from uncms.conf import defaults
 
+# Characters after which the rest of a regular expression can no longer be
+# treated as a fixed string.
+REGEX_SPECIAL_CHARACTERS = frozenset(".^$*+?{}[]\\|()")
+
+# Matches numbered or named backreferences in a regular expression, which
+# stop working if it is combined with other expressions into one.
+BACKREFERENCE_RE = re.compile(r"\\[1-9]|\(\?P=")
+
 
 def canonicalise_url(path=None):
     if path is None:
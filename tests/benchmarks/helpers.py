@@ -0,0 +1,75 @@
+import statistics
+import sys
+import time
+
+from django.contrib.contenttypes.models import ContentType
+
+from uncms.pages.models import Page
+from uncms.testhelpers.models import EmptyTestPage
+
+
+def median_time(func, *, repeat=20):
+    """Returns the median time taken to call `func`, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def report(capsys, title, results):
+    """
+    Shows the results of a benchmark, a dict of labels to times in seconds,
+    even if pytest is capturing output.
+    """
+    with capsys.disabled():
+        sys.stdout.write(f"\n{title}\n")
+        for label, seconds in results.items():
+            sys.stdout.write(f"  {label:>30}: {seconds * 1000:9.3f} ms\n")
+
+
+def create_page_tree(size, *, sections=100):
+    """
+    Quickly creates a page tree of `size` pages: a homepage, up to
+    `sections` pages underneath it, and the rest of the pages spread evenly
+    underneath those. Pages are created without content, and are not added
+    to the search index.
+    """
+    content_type = ContentType.objects.get_for_model(EmptyTestPage)
+    sections = min(sections, size - 1)
+    children_per_section = (size - 1 - sections) // max(sections, 1)
+    counter = iter(range(1, size * 2 + 1))
+
+    def build(slug, parent, url_path):
+        return Page(
+            title=slug,
+            slug=slug,
+            parent=parent,
+            content_type=content_type,
+            url_path=url_path,
+            left=next(counter),
+        )
+
+    homepage = build("homepage", None, "/")
+    section_pages = []
+    child_pages = []
+    for section_index in range(sections):
+        section = build(f"section-{section_index}", homepage, None)
+        section.url_path = f"/{section.slug}/"
+        section_pages.append(section)
+        for child_index in range(children_per_section):
+            child = build(f"page-{child_index}", section, None)
+            child.url_path = f"{section.url_path}{child.slug}/"
+            child.right = next(counter)
+            child_pages.append(child)
+        section.right = next(counter)
+    homepage.right = next(counter)
+
+    # Create them one level at a time, so that each level knows the IDs of
+    # its parents.
+    for pages in [[homepage], section_pages, child_pages]:
+        for page in pages:
+            page.parent_id = page.parent.pk if page.parent else None
+        Page.objects.bulk_create(pages, batch_size=1000)
+    return homepage
@@ -0,0 +1,34 @@
+import pytest
+
+from tests.benchmarks.helpers import median_time, report
+from tests.helpers import article_html, format_html_with_beautifulsoup
+from uncms.html import format_html
+from uncms.testhelpers.factories.media import SamplePNGFileFactory
+
+pytestmark = pytest.mark.benchmark
+
+IMAGE_COUNTS = [0, 5, 30]
+
+
+@pytest.mark.django_db
+def test_format_html_against_beautifulsoup(capsys):
+    """
+    format_html should be faster than building a tree with BeautifulSoup,
+    most of all for long articles with few images.
+    """
+    images = SamplePNGFileFactory.create_batch(max(IMAGE_COUNTS))
+    results = {}
+    for count in IMAGE_COUNTS:
+        html = article_html([image.pk for image in images[:count]])
+        # Warm the caches (e.g. ContentType's) first.
+        format_html(html)
+        results[f"HTMLParser, {count} images"] = median_time(
+            lambda html=html: format_html(html)
+        )
+        results[f"BeautifulSoup, {count} images"] = median_time(
+            lambda html=html: format_html_with_beautifulsoup(html)
+        )
+
+    report(capsys, f"format_html, {len(article_html([]))} characters", results)
+    assert results["HTMLParser, 0 images"] < results["BeautifulSoup, 0 images"]
+    assert results["HTMLParser, 30 images"] < results["BeautifulSoup, 30 images"]
@@ -0,0 +1,65 @@
+import random
+from functools import partial
+
+import pytest
+from watson import search
+
+from tests.benchmarks.helpers import create_page_tree, median_time, report
+from uncms.pages.models import Page
+
+pytestmark = pytest.mark.benchmark
+
+SIZES = [100, 1_000, 10_000, 100_000]
+
+
+def save_page(rng, page_ids):
+    page = Page.objects.get(pk=rng.choice(page_ids))
+    page.title = "Changed"
+    page.save()
+
+
+def add_page(rng, parents):
+    parent = rng.choice(parents)
+    Page(
+        title="New",
+        slug=f"new-{rng.random()}",
+        parent=parent,
+        content_type_id=parent.content_type_id,
+    ).save()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("gap", [0, 1000])
+def test_page_save_latency(settings, capsys, gap):
+    """
+    Saving a page should take about the same time no matter how large the
+    page tree is. With PAGE_TREE_GAP, so should adding one.
+    """
+    settings.UNCMS = {**settings.UNCMS, "PAGE_TREE_GAP": gap}
+    rng = random.Random(1)
+    results = {}
+
+    for size in SIZES:
+        Page.objects.all().delete()
+        homepage = create_page_tree(size)
+        if gap:
+            Page.objects.rebuild_tree(force=True)
+        page_ids = list(Page.objects.values_list("pk", flat=True))
+        sections = list(Page.objects.filter(parent=homepage))
+
+        with search.skip_index_update():
+            results[f"save, {size} pages"] = median_time(
+                partial(save_page, rng, page_ids)
+            )
+            if gap:
+                results[f"add, {size} pages"] = median_time(
+                    partial(add_page, rng, sections)
+                )
+        assert not Page.objects.rebuild_tree(dry_run=True)
+
+    report(capsys, f"Page.save with PAGE_TREE_GAP={gap}", results)
+    for action in ["save", "add"] if gap else ["save"]:
+        timings = [results[f"{action}, {size} pages"] for size in SIZES]
+        # Allow plenty of room for noise; reading the whole tree on every save
+        # would be a couple of orders of magnitude slower than this.
+        assert max(timings) < min(timings) * 10
@@ -0,0 +1,57 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from tests.benchmarks.helpers import median_time, report
+from uncms.middleware import PublicationMiddleware
+
+pytestmark = pytest.mark.benchmark
+
+EXCLUSION_COUNTS = [1, 10, 100]
+
+REQUESTS = 1000
+
+
+def exclude_urls(count):
+    """
+    Returns `count` exclusions, alternating between plain prefixes and
+    regular expressions, starting with the default.
+    """
+    patterns = [r"^/admin/"]
+    for index in range(1, count):
+        if index % 2:
+            patterns.append(rf"^/section-{index}/")
+        else:
+            patterns.append(rf"^/[a-z]{{2}}/section-{index}/\d+/")
+    return patterns
+
+
+def test_publication_middleware_overhead(settings, capsys):
+    """
+    The time PublicationMiddleware takes on each request should barely
+    depend on the number of PUBLICATION_MIDDLEWARE_EXCLUDE_URLS.
+    """
+    middleware = PublicationMiddleware(lambda request: HttpResponse())
+    # The worst case: a path which matches none of the exclusions.
+    request = RequestFactory().get("/en/section-2/about/")
+    request.user = AnonymousUser()
+    response = HttpResponse()
+
+    def handle_requests():
+        for _ in range(REQUESTS):
+            middleware.process_request(request)
+            middleware.process_response(request, response)
+
+    results = {}
+    for count in EXCLUSION_COUNTS:
+        settings.UNCMS = {
+            **settings.UNCMS,
+            "PUBLICATION_MIDDLEWARE_EXCLUDE_URLS": exclude_urls(count),
+        }
+        results[f"{count} exclusions"] = median_time(handle_requests) / REQUESTS
+
+    report(capsys, "PublicationMiddleware, per request", results)
+    # Compiling and running 100 patterns one at a time on every request would
+    # take many times longer than this.
+    assert results["100 exclusions"] < results["1 exclusions"] * 5
@@ -0,0 +1,78 @@
+import random
+from functools import partial
+
+import pytest
+
+from tests.benchmarks.helpers import median_time, report
+from uncms.redirects.matcher import RedirectMatcher
+from uncms.redirects.models import Redirect
+
+pytestmark = pytest.mark.benchmark
+
+SIZES = [100, 1_000, 20_000]
+
+
+def create_redirects(size, rng):
+    """
+    Creates `size` redirects; one in ten is a regular expression, and they
+    are spread over 100 top-level sections, much like redirects left by
+    migrating a site.
+    """
+    redirects = []
+    for index in range(size):
+        section = f"section-{rng.randrange(100)}"
+        if index % 10:
+            redirects.append(
+                Redirect(old_path=f"/{section}/page-{index}/", new_path="/new/")
+            )
+        else:
+            redirects.append(
+                Redirect(
+                    old_path=f"^/{section}/archive-{index}/(\\d+)/$",
+                    new_path=r"/archive/\1/",
+                    regular_expression=True,
+                )
+            )
+    Redirect.objects.bulk_create(redirects, batch_size=1000)
+
+
+def look_up(paths):
+    for path in paths:
+        Redirect.objects.get_for_path(path)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("cache", [None, "default"])
+def test_redirect_lookup_latency(settings, capsys, cache):
+    """
+    With REDIRECTS_CACHE, finding a redirect (or the lack of one) should take
+    about the same time no matter how many redirects there are.
+    """
+    settings.UNCMS = {
+        **settings.UNCMS,
+        "REDIRECTS_CACHE": cache,
+        "REGEX_REDIRECTS": True,
+    }
+    rng = random.Random(1)
+    results = {}
+
+    for size in SIZES:
+        Redirect.objects.all().delete()
+        create_redirects(size, rng)
+        paths = [f"/section-{rng.randrange(100)}/missing/" for _ in range(20)]
+        if cache:
+            results[f"build, {size} redirects"] = median_time(
+                partial(RedirectMatcher.build, Redirect, "version"), repeat=3
+            )
+        # Build the matcher outside of the timings.
+        Redirect.objects.get_for_path("/")
+
+        results[f"{size} redirects"] = median_time(
+            partial(look_up, paths), repeat=3
+        ) / len(paths)
+
+    report(capsys, f"Redirect lookups with REDIRECTS_CACHE={cache}", results)
+    if cache:
+        timings = [results[f"{size} redirects"] for size in SIZES]
+        # Checking each regular expression in turn would grow linearly.
+        assert max(timings) < min(timings) * 10
@@ -0,0 +1,53 @@
+import pytest
+from django.urls import reverse
+
+from tests.benchmarks.helpers import median_time, report
+from uncms.media import models as media_models
+from uncms.media.models import File
+from uncms.models import base
+
+pytestmark = pytest.mark.benchmark
+
+IMAGES = 1000
+
+
+def reverse_image_url(pk, **kwargs):
+    return reverse("media:image_view", kwargs={"pk": pk, **kwargs})
+
+
+def test_render_multi_format(monkeypatch, capsys):
+    """
+    Rendering images should not be dominated by building and signing their
+    thumbnail URLs.
+    """
+    images = [
+        File(pk=pk, file=f"uploads/files/image-{pk}.png", width=1920, height=1080)
+        for pk in range(1, IMAGES + 1)
+    ]
+
+    def render_all():
+        for image in images:
+            image.render_multi_format(width=640)
+
+    def get_thumbnails():
+        # The thumbnails that render_multi_format gets for each image.
+        for image in images:
+            image.get_thumbnail(width=640, fmt="webp")
+            image.get_thumbnail(width=640, fmt="source")
+
+    results = {}
+    base._make_path_token.cache_clear()
+    results["render, cold"] = median_time(render_all, repeat=1)
+    results["render, warm"] = median_time(render_all, repeat=5)
+    results["thumbnails, warm"] = median_time(get_thumbnails, repeat=5)
+
+    # The way thumbnail URLs used to be built: reversed and signed every
+    # time.
+    monkeypatch.setattr(media_models, "get_image_url", reverse_image_url)
+    monkeypatch.setattr(base, "_make_path_token", base._make_path_token.__wrapped__)
+    results["render, reverse() and HMAC"] = median_time(render_all, repeat=5)
+    results["thumbnails, reverse() and HMAC"] = median_time(get_thumbnails, repeat=5)
+
+    report(capsys, f"render_multi_format, {IMAGES} images", results)
+    assert results["render, warm"] < results["render, reverse() and HMAC"]
+    assert results["thumbnails, warm"] * 2 < results["thumbnails, reverse() and HMAC"]
@@ -0,0 +1,30 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(name="use_cache")
+def fixture_use_cache(settings):
+    """
+    Returns a function which points a cache option (e.g. "HTML_CACHE") at
+    the default cache. The default cache, and any per-process caches passed
+    to it, are emptied before and after the test, so that nothing built in
+    one test leaks into another.
+    """
+    local_caches = []
+
+    def use(option, *local):
+        settings.UNCMS = {**settings.UNCMS, option: "default"}
+        local_caches.extend(local)
+        caches["default"].clear()
+        for cache in local_caches:
+            cache.clear()
+
+    yield use
+    caches["default"].clear()
+    for cache in local_caches:
+        cache.clear()
+
+
+@pytest.fixture
+def html_cache(use_cache):
+    use_cache("HTML_CACHE")
@@ -0,0 +1,76 @@
+"""
+Sample HTML, shared by the tests for uncms.html and its benchmarks.
+"""
+
+
+def article_html(image_pks, *, paragraphs=60):
+    """
+    Returns the HTML of a long article, much as the HTML editor would save
+    it, with a reference to each of `image_pks` spread through it.
+    """
+    parts = ["<h2>An article &amp; its images</h2>"]
+    images = iter(image_pks)
+    for index in range(paragraphs):
+        parts.append(
+            f"<p>Paragraph {index} has <strong>bold</strong>, <em>emphasised</em>"
+            f' and <a href="/section-{index}/?a=1&amp;b=2">linked</a> text,'
+            " with an&nbsp;entity or two &mdash; and it goes on for a while,"
+            " as paragraphs in articles tend to do.</p>\n"
+        )
+        if index % 10 == 5:
+            parts.append(
+                "<ul>" + "".join(f"<li>Item {item}</li>" for item in range(5)) + "</ul>"
+            )
+        if index % 20 == 10:
+            parts.append(
+                "<table><tr><th>One</th><th>Two</th></tr>"
+                "<tr><td>1</td><td>2</td></tr></table>"
+            )
+        image_pk = next(images, None) if index % 2 else None
+        if image_pk is not None:
+            parts.append(
+                f'<p><img class="left  wide" style="float: left" title="Image {index}"'
+                f' src="/library/redirect/{image_pk}/"></p>\n'
+            )
+    return "".join(parts)
+
+
+def format_html_with_beautifulsoup(text):
+    """
+    The way uncms.html.format_html used to work, by building a tree with
+    BeautifulSoup, for comparison.
+    """
+    # pylint:disable=import-outside-toplevel
+    from bs4 import BeautifulSoup
+    from bs4.element import PreformattedString
+
+    from uncms.media.models import File
+
+    class RawHTML(PreformattedString):
+        PREFIX = ""
+        SUFFIX = ""
+
+    soup = BeautifulSoup(text, "html.parser")
+    references = []
+    for image in soup.find_all("img"):
+        src = image.get("src", "")
+        if src.startswith("/library/redirect/"):
+            references.append((image, int(src[len("/library/redirect/") :].strip("/"))))
+    objs = File.objects.in_bulk({pk for _, pk in references})
+    for image, pk in references:
+        image.replace_with(
+            RawHTML(
+                objs[pk].render_multi_format(
+                    width=1280,
+                    alt_text=image.get("alt_text"),
+                    extra_styles=image.get("style"),
+                    extra_classes=" ".join(image.get("class", [])),
+                    extra_attributes={
+                        key: value
+                        for key, value in image.attrs.items()
+                        if key not in ["class", "style", "src"]
+                    },
+                )
+            )
+        )
+    return str(soup)
@@ -0,0 +1,141 @@
+from urllib.parse import urlencode, urlparse
+
+import pytest
+from django.urls import NoReverseMatch, reverse, set_script_prefix
+from django.utils.crypto import salted_hmac
+
+from uncms.media import image_urls
+from uncms.media.image_urls import get_image_url, get_image_url_template
+from uncms.models import base
+from uncms.models.base import _make_path_token, path_token_generator
+
+
+def reverse_image_url(pk, **kwargs):
+    return reverse("media:image_view", kwargs={"pk": pk, **kwargs})
+
+
+@pytest.mark.parametrize(
+    "pk, kwargs",
+    [
+        (
+            1,
+            {
+                "width": 1280,
+                "height": "auto",
+                "crop": "none",
+                "format": "webp",
+                "colorspace": "auto",
+                "quality": "default",
+            },
+        ),
+        (
+            12345,
+            {
+                "width": "auto",
+                "height": 300,
+                "crop": "50% 50%",
+                "format": "source",
+                "colorspace": "gray",
+                "quality": 80,
+            },
+        ),
+        (
+            2,
+            {
+                "width": "{}",
+                "height": "é?#&",
+                "crop": "a:b@c",
+                "format": "~",
+                "colorspace": "%",
+                "quality": "'\"",
+            },
+        ),
+    ],
+)
+def test_get_image_url_matches_reverse(pk, kwargs):
+    assert get_image_url(pk, **kwargs) == reverse_image_url(pk, **kwargs)
+
+
+def test_get_image_url_script_prefix():
+    kwargs = {
+        "width": 100,
+        "height": "auto",
+        "crop": "none",
+        "format": "webp",
+        "colorspace": "auto",
+        "quality": "default",
+    }
+    set_script_prefix("/prefix/")
+    try:
+        assert get_image_url(1, **kwargs) == reverse_image_url(1, **kwargs)
+        assert get_image_url(1, **kwargs).startswith("/prefix/")
+    finally:
+        set_script_prefix("/")
+    assert get_image_url(1, **kwargs) == reverse_image_url(1, **kwargs)
+
+
+def test_get_image_url_falls_back_to_reverse(monkeypatch):
+    kwargs = {
+        "width": 100,
+        "height": "auto",
+        "crop": "none",
+        "format": "webp",
+        "colorspace": "auto",
+        "quality": "default",
+    }
+    # Values that reverse() would refuse are still refused.
+    with pytest.raises(NoReverseMatch):
+        get_image_url(1, **{**kwargs, "crop": "a/b"})
+    with pytest.raises(NoReverseMatch):
+        get_image_url(1, **{**kwargs, "crop": ""})
+    with pytest.raises(NoReverseMatch):
+        get_image_url(None, **kwargs)
+
+    # If a template can't be made, reverse() is used.
+    assert get_image_url_template() is not None
+    monkeypatch.setattr(
+        image_urls, "_templates", {key: None for key in image_urls._templates}
+    )
+    assert get_image_url(1, **kwargs) == reverse_image_url(1, **kwargs)
+
+
+def test_path_token_generator_memo(settings, monkeypatch):
+    _make_path_token.cache_clear()
+    calls = []
+
+    def counting_salted_hmac(*args, **kwargs):
+        calls.append(kwargs["value"])
+        return salted_hmac(*args, **kwargs)
+
+    monkeypatch.setattr(base, "salted_hmac", counting_salted_hmac)
+    token = path_token_generator.make_token("/library/1/")
+    assert path_token_generator.make_token("/library/1/") == token
+    assert calls == ["/library/1/"]
+    monkeypatch.undo()
+    assert path_token_generator.check_token(token, "/library/1/")
+
+    # Changing the secret changes the signature.
+    settings.UNCMS = {**settings.UNCMS, "PATH_SIGNING_SECRET": "something else"}
+    assert path_token_generator.make_token("/library/1/") != token
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/library/1/",
+        "/library/1/?page=2",
+        "/library/1/#top",
+        "/library/1/;param",
+        "//example.com/library/",
+        "library/1/",
+    ],
+)
+def test_path_token_generator_make_url(path):
+    parsed = urlparse(path)
+    parsed = parsed._replace(
+        query=urlencode({"signature": path_token_generator.make_token(path)})
+    )
+    assert (
+        path_token_generator.make_url(path, token_parameter="signature")
+        == parsed.geturl()
+    )
@@ -254,6 +254,24 @@ def test_file_render_multi_format_obeys_formats(django_assert_num_queries):
     assert list(parsed.srcsets) == ["image/png"]
 
 
+@pytest.mark.django_db
+def test_file_render_multi_format_avif(settings, django_assert_num_queries):
+    image = SamplePNGFileFactory()
+    settings.UNCMS = {**settings.UNCMS, "IMAGE_USE_AVIF": True}
+    with django_assert_num_queries(0):
+        parsed = MultiFormatSoupParser(
+            image.render_multi_format(width=800, widths=[400])
+        )
+    # AVIF is smaller than WebP, so it must go first.
+    assert list(parsed.srcsets) == ["image/avif", "image/webp", "image/png"]
+    assert all(len(sources) == 2 for sources in parsed.srcsets.values())
+    assert "/fmt:avif/" in parsed.srcsets["image/avif"][0]
+
+    settings.UNCMS = {**settings.UNCMS, "IMAGE_USE_WEBP": False}
+    parsed = MultiFormatSoupParser(image.render_multi_format(width=800))
+    assert list(parsed.srcsets) == ["image/avif", "image/png"]
+
+
 @pytest.mark.django_db
 def test_file_render_multi_format_obeys_alt_text():
     # Ensure "None" is not displayed as the alt text if nothing has been
@@ -343,6 +361,77 @@ def test_file_render_multi_format_preserves_extra_classes():
     assert parsed.classes == ["image__image", "nonsense"]
 
 
+@pytest.mark.django_db
+def test_file_get_srcset_dimensions(settings):
+    image = SamplePNGFileFactory()
+    assert image.get_srcset_dimensions(width=800) == [(800, "auto")]
+    # Widths larger than the image, and the requested width, are left out.
+    assert image.get_srcset_dimensions(
+        width=800, widths=[3840, 400, 800, 1600, 400]
+    ) == [(800, "auto"), (400, "auto"), (1600, "auto")]
+    # Heights keep the requested aspect ratio.
+    assert image.get_srcset_dimensions(width=800, height=600, widths=[400]) == [
+        (800, 600),
+        (400, 300),
+    ]
+    assert image.get_srcset_dimensions(height=600, widths=[400]) == [
+        ("auto", 600),
+        (400, "auto"),
+    ]
+
+    settings.UNCMS = {**settings.UNCMS, "IMAGE_WIDTH_SETS": {"article": [320, 640]}}
+    assert image.get_srcset_dimensions(width=800, widths="article") == [
+        (800, "auto"),
+        (320, "auto"),
+        (640, "auto"),
+    ]
+    with pytest.raises(ValueError):
+        image.get_srcset_dimensions(width=800, widths="imaginary")
+
+    # Dimensions from templates may be strings.
+    assert image.get_srcset_dimensions(width="800", height="600", widths=["400"]) == [
+        (800, 600),
+        (400, 300),
+    ]
+
+    # Without the image's width, there is no telling which would be upscaled.
+    image.width = None
+    assert image.get_srcset_dimensions(width=800, widths=[400]) == [(800, "auto")]
+
+
+@pytest.mark.django_db
+def test_file_render_multi_format_widths(django_assert_num_queries):
+    image = SamplePNGFileFactory()
+    with django_assert_num_queries(0):
+        html = image.render_multi_format(width=800, widths=[400, 1600])
+    soup = BeautifulSoup(html, "html.parser")
+    sources = soup.find_all("source")
+    assert [source["type"] for source in sources] == ["image/webp", "image/png"]
+    for source in sources:
+        descriptors = [
+            candidate.split(" ")[1] for candidate in source["srcset"].split(", ")
+        ]
+        assert descriptors == ["400w", "800w", "1600w"]
+        assert source["sizes"] == "(max-width: 800px) 100vw, 800px"
+    # The aspect ratio is still that of the requested size.
+    assert soup.find("img")["style"] == "aspect-ratio: 800 / 450"
+
+    soup = BeautifulSoup(
+        image.render_multi_format(width=800, widths=[400], sizes="50vw"),
+        "html.parser",
+    )
+    assert soup.find("source")["sizes"] == "50vw"
+
+    soup = BeautifulSoup(
+        image.render_multi_format(height=450, widths=[400]), "html.parser"
+    )
+    assert soup.find("source")["sizes"] == "100vw"
+
+    # A single size needs no "sizes".
+    soup = BeautifulSoup(image.render_multi_format(width=800), "html.parser")
+    assert not soup.find("source").has_attr("sizes")
+
+
 @pytest.mark.django_db
 def test_file_render_multi_format_on_nonsense():
     garbage = EmptyFileFactory()
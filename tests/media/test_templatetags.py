@@ -23,3 +23,15 @@ def test_image(client, test_func):
 
     response = client.get(response["Location"])
     assert response.status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("test_func", [image, render_image])
+def test_image_widths(settings, test_func):
+    file = SamplePNGFileFactory()
+    settings.UNCMS = {**settings.UNCMS, "IMAGE_WIDTH_SETS": {"article": [400, 1600]}}
+    html = test_func(file, width=800, widths="article")
+    soup = BeautifulSoup(html, "html.parser")
+    for source in soup.find_all("source"):
+        assert len(source["srcset"].split(", ")) == 3
+        assert source["sizes"] == "(max-width: 800px) 100vw, 800px"
@@ -8,6 +8,7 @@ from django.test.utils import override_settings
 from django.urls import reverse
 from PIL import Image
 
+from uncms.checks import is_avif_supported
 from uncms.models.base import path_token_generator
 from uncms.testhelpers.factories import UserFactory
 from uncms.testhelpers.factories.media import (
@@ -45,6 +46,21 @@ def test_file_redirect_view(client):
     assert response["Location"] == obj.get_absolute_url()
 
 
+@pytest.mark.django_db
+@pytest.mark.skipif(not is_avif_supported(), reason="AVIF is not supported")
+def test_image_view_avif(client):
+    image_file = SamplePNGFileFactory.create()
+    response = client.get(image_file.get_thumbnail(width=960, fmt="avif").url)
+    assert response.status_code == 302
+    assert response["Location"].endswith(".avif")
+
+    response = client.get(response["Location"])
+    assert response.status_code == 200
+    image = Image.open(BytesIO(response.getvalue()))
+    assert image.format == "AVIF"
+    assert image.size == (960, 540)
+
+
 @pytest.mark.django_db
 def test_image_view(client):  # pylint:disable=too-many-statements
     def image_view_kwargs(**kwargs):
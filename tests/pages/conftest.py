@@ -2,6 +2,8 @@ from dataclasses import dataclass
 
 import pytest
 
+from uncms.pages import tree
+
 
 @pytest.fixture
 def simple_page_tree(db):
@@ -72,3 +74,13 @@ def simple_page_tree(db):
         subsection=subsection,
         subsubsection=subsubsection,
     )
+
+
+@pytest.fixture
+def page_tree_cache(use_cache):
+    use_cache("PAGE_TREE_CACHE", tree._snapshots)
+
+
+@pytest.fixture
+def page_tree_gap(settings):
+    settings.UNCMS = {**settings.UNCMS, "PAGE_TREE_GAP": 10}
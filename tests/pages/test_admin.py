@@ -816,6 +816,31 @@ def test_pageadmin_move_page_view(client):
     assert response.status_code == 302
 
 
+@pytest.mark.django_db
+def test_pageadmin_move_page_view_with_gaps(admin_client):
+    homepage = PageFactory()
+    page_1 = PageFactory(parent=homepage)
+    child = PageFactory(parent=page_1)
+    page_2 = PageFactory(parent=homepage)
+    Page.objects.filter(pk=homepage.pk).update(left=1, right=30)
+    Page.objects.filter(pk=page_1.pk).update(left=2, right=10)
+    Page.objects.filter(pk=child.pk).update(left=3, right=4)
+    Page.objects.filter(pk=page_2.pk).update(left=15, right=16)
+
+    admin_client.post(
+        reverse("admin:pages_page_move_page", args=[page_1.pk]),
+        data={"direction": "down"},
+    )
+    assert dict(Page.objects.values_list("pk", "left")) == {
+        homepage.pk: 1,
+        page_2.pk: 2,
+        page_1.pk: 8,
+        child.pk: 9,
+    }
+    assert not Page.objects.rebuild_tree(dry_run=True)
+    assert Page.objects.get_homepage().get_children() == [page_2, page_1]
+
+
 @pytest.mark.django_db
 def test_pageadmin_publish_selected(client):
     client.force_login(UserFactory(superuser=True))
@@ -839,6 +864,29 @@ def test_pageadmin_publish_selected(client):
         assert page.is_online is True
 
 
+@pytest.mark.django_db
+def test_pageadmin_unpublish_selected_creates_revision(admin_client):
+    page_1 = PageFactory()
+    page_2 = PageFactory(parent=page_1)
+    page_3 = PageFactory(parent=page_1, is_online=False)
+
+    admin_client.post(
+        reverse("admin:pages_page_changelist"),
+        data={
+            "action": "unpublish_selected",
+            "_selected_action": [str(page_2.pk), str(page_3.pk)],
+        },
+    )
+    page_2.refresh_from_db()
+    assert page_2.is_online is False
+
+    # Only the page which actually changed should be in the revision.
+    version = Version.objects.get_for_object(page_2).get()
+    assert version.field_dict["is_online"] is False
+    assert list(version.revision.version_set.all()) == [version]
+    assert not Version.objects.get_for_object(page_3).exists()
+
+
 @pytest.mark.django_db
 def test_pageadmin_recover_view(client):
     user = UserFactory(superuser=True)
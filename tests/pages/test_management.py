@@ -0,0 +1,134 @@
+import time
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from django.utils.timezone import now
+
+from uncms.pages.management.commands import sweep_page_publication
+from uncms.pages.models import Page
+from uncms.testhelpers.factories.pages import PageFactory
+
+
+def tree_values():
+    return list(Page.objects.order_by("pk").values_list("pk", "left", "right"))
+
+
+@pytest.mark.django_db
+def test_rebuild_page_tree():
+    PageFactory.create_tree(3, 3, 2)
+    expected = tree_values()
+
+    # A consistent tree should not be changed.
+    call_command("rebuild_page_tree", "--check", stdout=StringIO())
+    assert not Page.objects.rebuild_tree()
+
+    Page.objects.update(left=0, right=0)
+    with pytest.raises(CommandError) as exc:
+        call_command("rebuild_page_tree", "--check", stdout=StringIO())
+    assert str(exc.value) == f"{len(expected)} pages are in the wrong position"
+    # --check must not save anything.
+    assert {(left, right) for _, left, right in tree_values()} == {(0, 0)}
+
+    # With no way to tell which sibling comes first, they are ordered by ID.
+    stdout = StringIO()
+    call_command("rebuild_page_tree", "--batch-size", "5", stdout=stdout)
+    assert stdout.getvalue() == f"{len(expected)} pages moved\n"
+    assert tree_values() == expected
+
+
+@pytest.mark.django_db
+def test_rebuild_page_tree_keeps_sibling_order():
+    homepage = PageFactory()
+    page_1 = PageFactory(parent=homepage)
+    page_2 = PageFactory(parent=homepage)
+    child = PageFactory(parent=page_2)
+    # Swap the two branches, and leave a gap in the numbering.
+    Page.objects.filter(pk=page_2.pk).update(left=2, right=5)
+    Page.objects.filter(pk=child.pk).update(left=3, right=4)
+    Page.objects.filter(pk=page_1.pk).update(left=10, right=11)
+
+    changed = Page.objects.rebuild_tree(dry_run=True)
+    assert [(page.pk, page.left, page.right) for page in changed] == [
+        (page_1.pk, 6, 7),
+    ]
+
+    Page.objects.rebuild_tree()
+    assert Page.objects.get_homepage().get_children() == [page_2, page_1]
+    assert tree_values() == [
+        (homepage.pk, 1, 8),
+        (page_1.pk, 6, 7),
+        (page_2.pk, 2, 5),
+        (child.pk, 3, 4),
+    ]
+
+
+@pytest.mark.django_db
+def test_rebuild_page_tree_unreachable():
+    homepage = PageFactory()
+    page_1 = PageFactory(parent=homepage)
+    page_2 = PageFactory(parent=page_1)
+    Page.objects.filter(pk=page_1.pk).update(parent=page_2)
+
+    with pytest.raises(CommandError) as exc:
+        call_command("rebuild_page_tree", stdout=StringIO())
+    assert (
+        str(exc.value)
+        == f"Pages {page_1.pk}, {page_2.pk} are not connected to the page tree"
+    )
+
+
+@pytest.mark.django_db
+def test_rebuild_page_publication():
+    homepage = PageFactory()
+    page = PageFactory(parent=homepage)
+    child = PageFactory(parent=page)
+    Page.objects.filter(pk=homepage.pk).update(is_online=False)
+
+    stdout = StringIO()
+    call_command("rebuild_page_publication", stdout=stdout)
+    assert stdout.getvalue() == "3 pages updated\n"
+    assert not Page.objects.filter(effective_is_online=True).exists()
+    child.refresh_from_db()
+    assert child.is_online is True
+
+    stdout = StringIO()
+    call_command("rebuild_page_publication", stdout=stdout)
+    assert stdout.getvalue() == "0 pages updated\n"
+
+    Page.objects.filter(pk=page.pk).update(parent=child)
+    with pytest.raises(CommandError) as exc:
+        call_command("rebuild_page_publication", stdout=StringIO())
+    assert str(exc.value) == "The parents of some pages form a cycle"
+
+
+@pytest.mark.django_db
+def test_sweep_page_publication(page_tree_cache, monkeypatch):
+    homepage = PageFactory()
+    PageFactory(parent=homepage, publication_date=now() + timedelta(minutes=1))
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            raise KeyboardInterrupt
+        monkeypatch.setattr(timezone, "now", lambda: now() + timedelta(minutes=2))
+
+    # This would close the connection that the test is running in.
+    monkeypatch.setattr(sweep_page_publication, "close_old_connections", lambda: None)
+
+    stdout = StringIO()
+    call_command("sweep_page_publication", stdout=stdout)
+    assert stdout.getvalue() == "0 pages published or expired\n"
+
+    monkeypatch.setattr(time, "sleep", sleep)
+    stdout = StringIO()
+    with pytest.raises(KeyboardInterrupt):
+        call_command("sweep_page_publication", interval=60, stdout=stdout)
+    assert sleeps == [60, 60]
+    assert stdout.getvalue() == (
+        "0 pages published or expired\n1 pages published or expired\n"
+    )
@@ -6,10 +6,11 @@ from django.test import RequestFactory, override_settings
 from django.urls import reverse
 
 from tests.mocks import MockRequestUser, request_with_pages
-from tests.testing_app.models import MiddlewareURLsTestPage
+from tests.testing_app.models import MiddlewareURLsTestPage, PageContent
 from uncms.pages.middleware import PageMiddleware, RequestPageManager
 from uncms.pages.models import Page
 from uncms.pages.templatetags.uncms_pages import render_navigation
+from uncms.pages.tree import page_not_found_cache
 from uncms.testhelpers.factories import UserFactory
 from uncms.testhelpers.factories.media import EmptyFileFactory
 from uncms.testhelpers.factories.pages import PageFactory
@@ -382,3 +383,51 @@ def test_middleware_query_count(client, django_assert_num_queries):
     with django_assert_num_queries(4):
         response = client.get(subpage.get_absolute_url())
     assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_requestpagemanager_breadcrumbs_below_prefetch_depth(
+    settings, django_assert_num_queries
+):
+    settings.UNCMS = {**settings.UNCMS, "PAGE_TREE_PREFETCH_DEPTH": 1}
+    PageFactory.create_tree(2, 2, 2, 2)
+    homepage = Page.objects.get_homepage()
+    trail = [homepage]
+    for _ in range(4):
+        trail.append(trail[-1].children[-1])
+    deep_page = trail[-1]
+
+    # Everything below the prefetched top level should be fetched at once:
+    # one query for the homepage, one for the prefetch, and one for the rest.
+    with django_assert_num_queries(3):
+        request = request_with_pages(deep_page.get_absolute_url() + "detail/")
+        assert request.pages.breadcrumbs == trail
+        assert request.pages.breadcrumbs[-1].parent.parent == trail[-3]
+
+    # Should not match a page which is not a descendant of the trail so far.
+    path = trail[2].get_absolute_url() + trail[1].children[0].slug + "/"
+    request = request_with_pages(path)
+    assert request.pages.breadcrumbs == trail[:3]
+
+
+@pytest.mark.django_db
+def test_pagemiddleware_not_found_cache(settings, client, django_assert_num_queries):
+    settings.UNCMS = {**settings.UNCMS, "NOT_FOUND_CACHE_SIZE": 100}
+    page_not_found_cache.clear()
+    homepage = PageFactory(content=PageContent())
+    assert client.get("/nope/at/").status_code == 404
+
+    # The second time, the page tree does not need to be consulted.
+    with django_assert_num_queries(0):
+        assert client.get("/nope/at/").status_code == 404
+    assert page_not_found_cache.get_stats()["hits"] >= 1
+
+    # Adding a page clears the cache.
+    PageFactory(parent=homepage, slug="nope", content=PageContent())
+    assert client.get("/nope/at/").status_code == 200
+
+    # Paths which are 404s when previewing are not remembered.
+    client.force_login(UserFactory(superuser=True))
+    page_not_found_cache.clear()
+    assert client.get("/secret/at/?preview=1").status_code == 404
+    assert "/secret/at/" not in page_not_found_cache
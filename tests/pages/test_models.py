@@ -1,10 +1,16 @@
 """Tests for the pages app."""
+import random
 from datetime import timedelta
+from io import StringIO
 
 import pytest
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
 from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_save, pre_save
 from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
 from reversion import create_revision
 from watson import search
@@ -12,11 +18,13 @@ from watson import search
 from tests.testing_app.models import PageContent, PageContentWithSections
 from uncms.models.managers import publication_manager
 from uncms.pages.models import (
+    EFFECTIVE_PUBLICATION_FIELDS,
     Page,
     PageSearchAdapter,
     PageSitemap,
     filter_indexable_pages,
 )
+from uncms.pages.tree import excise_branch, page_tree_version
 from uncms.testhelpers.factories.pages import PageFactory
 from uncms.testhelpers.models import EmptyTestPage
 
@@ -130,7 +138,8 @@ class TestPageComplex(TransactionTestCase):
         self.assertEqual(self.pages["Tree_3___Page_5"].left, 14)
         self.assertEqual(self.pages["Tree_3___Page_5"].right, 15)
 
-        self.pages["Homepage"]._excise_branch()
+        homepage = self.pages["Homepage"]
+        excise_branch(homepage.left, homepage.right - homepage.left + 1)
 
         self.assertEqual(self.pages["Homepage"].left, 1)
         self.assertEqual(self.pages["Homepage"].right, 20)
@@ -368,6 +377,103 @@ def test_page_publication_date():
         assert 1 / "a"
 
 
+@pytest.mark.django_db
+def test_page_effective_publication():
+    homepage = PageFactory()
+    section = PageFactory(parent=homepage)
+    subsection = PageFactory(parent=section)
+    other = PageFactory(parent=homepage)
+    # Creating pages moves their ancestors' right-hand values.
+    for page in [section, subsection]:
+        page.refresh_from_db()
+
+    def published():
+        with publication_manager.select_published(True):
+            return set(Page.objects.all())
+
+    assert published() == {homepage, section, subsection, other}
+
+    # Taking a page offline takes its descendants with it.
+    section.is_online = False
+    section.save()
+    assert published() == {homepage, other}
+    subsection.refresh_from_db()
+    assert subsection.is_online is True
+    assert subsection.effective_is_online is False
+
+    # Moving a page under an online parent brings it back.
+    subsection.parent = other
+    subsection.save()
+    assert published() == {homepage, other, subsection}
+    other.refresh_from_db()
+
+    # Dates are inherited: the latest publication date and the earliest
+    # expiry date win.
+    other.publication_date = now() + timedelta(days=10)
+    other.save()
+    assert published() == {homepage}
+    subsection.refresh_from_db()
+    assert subsection.effective_publication_date == other.publication_date
+
+    other.publication_date = None
+    other.expiry_date = now() - timedelta(days=1)
+    other.save()
+    assert published() == {homepage}
+    subsection.refresh_from_db()
+    assert subsection.effective_publication_date is None
+    assert subsection.effective_expiry_date == other.expiry_date
+
+    other.expiry_date = None
+    other.save()
+    assert published() == {homepage, other, subsection}
+
+
+@pytest.mark.django_db
+def test_page_effective_publication_query():
+    """
+    Filtering on publication must not need to look at a page's ancestors.
+    """
+    homepage = PageFactory()
+    PageFactory(parent=homepage)
+    with publication_manager.select_published(True):
+        query = str(Page.objects.all().query)
+    assert "EXISTS" not in query
+    assert "effective_is_online" in query
+
+
+@pytest.mark.django_db
+def test_pagemanager_update_effective_publication():
+    homepage = PageFactory()
+    section = PageFactory(parent=homepage)
+    subsection = PageFactory(parent=section)
+    expiry_date = now() + timedelta(days=1)
+
+    # Nothing to change.
+    assert not Page.objects.update_effective_publication()
+
+    # Changes that bypass Page.save leave the effective fields out of date...
+    Page.objects.filter(pk=section.pk).update(is_online=False, expiry_date=expiry_date)
+    subsection.refresh_from_db()
+    assert subsection.effective_is_online is True
+
+    # ...until they are brought up to date.
+    changed = Page.objects.update_effective_publication([section])
+    assert sorted(page.pk for page in changed) == [section.pk, subsection.pk]
+    for page in [section, subsection]:
+        page.refresh_from_db()
+        assert page.effective_is_online is False
+        assert page.effective_expiry_date == expiry_date
+    homepage.refresh_from_db()
+    assert homepage.effective_is_online is True
+
+    # The same, for the whole tree.
+    Page.objects.filter(pk=section.pk).update(is_online=True, expiry_date=None)
+    changed = Page.objects.update_effective_publication()
+    assert sorted(page.pk for page in changed) == [section.pk, subsection.pk]
+    with publication_manager.select_published(True):
+        assert Page.objects.count() == 3
+
+
 @pytest.mark.django_db
 def test_page_reverse():
     page = PageFactory(content=PageContent())
@@ -468,6 +574,239 @@ def test_page_get_absolute_url_on_children_is_efficient(django_assert_num_querie
         child.get_absolute_url()
 
 
+@pytest.mark.django_db
+def test_pagemanager_set_is_online(page_tree_cache, django_assert_num_queries):
+    homepage = PageFactory()
+    page_1 = PageFactory(parent=homepage, is_online=False)
+    page_2 = PageFactory(parent=homepage, is_online=False)
+    page_3 = PageFactory(parent=homepage)
+    signals = []
+
+    def receiver(signal, instance, update_fields, **kwargs):
+        signals.append((signal, instance.pk, instance.is_online, update_fields))
+
+    pre_save.connect(receiver, sender=Page)
+    post_save.connect(receiver, sender=Page)
+    version = page_tree_version.get()
+    try:
+        # One SELECT and one UPDATE, three SELECTs and one UPDATE to bring the
+        # effective publication fields up to date, and a savepoint around
+        # them.
+        with search.skip_index_update(), django_assert_num_queries(8):
+            changed = Page.objects.set_is_online(
+                Page.objects.filter(parent=homepage), True
+            )
+    finally:
+        pre_save.disconnect(receiver, sender=Page)
+        post_save.disconnect(receiver, sender=Page)
+
+    assert changed == [page_1, page_2]
+    assert all(page.is_online for page in Page.objects.all())
+    assert page_tree_version.get() != version
+    update_fields = frozenset(["is_online", *EFFECTIVE_PUBLICATION_FIELDS])
+    assert signals == [
+        (pre_save, page_1.pk, True, update_fields),
+        (pre_save, page_2.pk, True, update_fields),
+        (post_save, page_1.pk, True, update_fields),
+        (post_save, page_2.pk, True, update_fields),
+    ]
+
+    # Nothing to change, so nothing to do.
+    with django_assert_num_queries(0):
+        assert Page.objects.set_is_online([page_3], True) == []
+
+
+@pytest.mark.django_db
+def test_page_url_path(django_assert_num_queries):
+    homepage = PageFactory(slug="home")
+    section = PageFactory(parent=homepage, slug="section")
+    subsection = PageFactory(parent=section, slug="subsection")
+    subsubsection = PageFactory(parent=subsection, slug="subsubsection")
+    other = PageFactory(parent=homepage, slug="other")
+
+    assert homepage.url_path == "/"
+    assert subsubsection.url_path == "/section/subsection/subsubsection/"
+
+    # Changing a slug must update all descendants...
+    section.slug = "renamed"
+    section.save()
+    subsubsection.refresh_from_db()
+    assert subsubsection.url_path == "/renamed/subsection/subsubsection/"
+    other.refresh_from_db()
+    assert other.url_path == "/other/"
+
+    # ...as must moving a branch.
+    subsection.refresh_from_db()
+    subsection.parent = other
+    subsection.save()
+    subsubsection.refresh_from_db()
+    assert subsubsection.url_path == "/other/subsection/subsubsection/"
+
+    # Neither the page nor its ancestors are needed to get its URL.
+    page = Page.objects.get(pk=subsubsection.pk)
+    with django_assert_num_queries(0):
+        assert page.get_absolute_url() == "/other/subsection/subsubsection/"
+
+
+@pytest.mark.django_db
+def test_page_clean_url_path_length():
+    homepage = PageFactory()
+    section = PageFactory(parent=homepage, slug="s")
+    page = section
+    for _ in range(6):
+        page = PageFactory(parent=page, slug="a" * 150)
+    assert len(page.url_path) == 909
+    section.clean()
+
+    # A new page would have a URL which is too long...
+    with pytest.raises(ValidationError) as excinfo:
+        Page(parent=page, slug="b" * 150).clean()
+    assert "longer than 1000 characters" in excinfo.value.message_dict["slug"][0]
+    Page(parent=page, slug="b").clean()
+
+    # ...as would the descendants of a page with a longer slug.
+    section.slug = "s" * 150
+    with pytest.raises(ValidationError):
+        section.clean()
+
+
+@pytest.mark.django_db
+def test_page_rebuild_url_paths():
+    homepage = PageFactory()
+    section = PageFactory(parent=homepage, slug="section")
+    subsection = PageFactory(parent=section, slug="subsection")
+
+    Page.objects.filter(pk=section.pk).update(slug="renamed", url_path=None)
+    Page.objects.filter(pk=homepage.pk).update(url_path="/wrong/")
+
+    call_command("rebuild_page_url_paths", stdout=StringIO())
+    assert dict(Page.objects.values_list("pk", "url_path")) == {
+        homepage.pk: "/",
+        section.pk: "/renamed/",
+        subsection.pk: "/renamed/subsection/",
+    }
+    assert Page.objects.rebuild_url_paths() == 0
+
+
+def tree_positions():
+    return {
+        pk: (left, right)
+        for pk, left, right in Page.objects.values_list("pk", "left", "right")
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("gap", [0, 10])
+def test_page_save_does_not_read_whole_tree(settings, gap):
+    settings.UNCMS = {**settings.UNCMS, "PAGE_TREE_GAP": gap}
+    PageFactory.create_tree(3, 3)
+    section = Page.objects.get_homepage().get_children()[1]
+
+    def save_queries(page):
+        with search.skip_index_update(), CaptureQueriesContext(connection) as context:
+            page.save()
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT") and 'FROM "pages_page"' in query["sql"]
+        ]
+
+    # Only this page, its parent and the homepage need to be read.
+    queries = save_queries(section)
+    assert len(queries) == 1
+    assert f'"id" IN ({section.pk}, {section.parent_id})' in queries[0]
+
+    page = Page(
+        title="New",
+        slug="new",
+        parent=section,
+        content_type=section.content_type,
+    )
+    queries = save_queries(page)
+    # With gaps, the only other read is to find the last child of the parent.
+    assert len(queries) == (2 if gap else 1)
+    assert f'"id" IN ({section.pk})' in queries[0]
+    assert not Page.objects.rebuild_tree(dry_run=True)
+
+
+@pytest.mark.django_db
+def test_page_tree_gap(page_tree_gap):
+    homepage = PageFactory()
+    # There is no room in a page without children, so adding its first child
+    # makes some, with PAGE_TREE_GAP to spare...
+    page_1 = PageFactory(parent=homepage)
+    assert tree_positions() == {homepage.pk: (1, 14), page_1.pk: (2, 3)}
+
+    # ...so its next children only need to change themselves.
+    page_2 = PageFactory(parent=homepage)
+    child = PageFactory(parent=page_1)
+    positions = tree_positions()
+    page_3 = PageFactory(parent=homepage)
+    assert tree_positions() == {**positions, page_3.pk: (18, 19)}
+
+    # Moving a branch leaves a gap where it was, rather than closing it up.
+    page_1.refresh_from_db()
+    page_1.parent = page_2
+    page_1.save()
+    assert tree_positions() == {
+        homepage.pk: (1, 50),
+        page_2.pk: (16, 41),
+        page_1.pk: (17, 30),
+        child.pk: (18, 19),
+        page_3.pk: (42, 43),
+    }
+
+    # As does deleting one.
+    positions = tree_positions()
+    del positions[page_1.pk], positions[child.pk]
+    page_1.delete()
+    assert tree_positions() == positions
+
+    assert not Page.objects.rebuild_tree(dry_run=True)
+    assert Page.objects.rebuild_tree(force=True)
+    assert tree_positions() == {
+        homepage.pk: (1, 16),
+        page_2.pk: (2, 3),
+        page_3.pk: (4, 5),
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("gap", [0, 1, 10])
+def test_page_tree_random_changes(settings, gap):
+    """
+    However the tree is changed, it must remain consistent with the parents
+    of its pages.
+    """
+    settings.UNCMS = {**settings.UNCMS, "PAGE_TREE_GAP": gap}
+    rng = random.Random(gap)
+    PageFactory()
+
+    def descendants(page):
+        return set(
+            Page.objects.filter(left__gte=page.left, right__lte=page.right).values_list(
+                "pk", flat=True
+            )
+        )
+
+    for _ in range(60):
+        pages = list(Page.objects.all())
+        action = rng.choice(["create", "create", "move", "delete"])
+        if action == "create":
+            PageFactory(parent=rng.choice(pages))
+        elif action == "move" and len(pages) > 2:
+            page = rng.choice(pages[1:])
+            excluded = descendants(page) | {page.parent_id}
+            parents = [parent for parent in pages if parent.pk not in excluded]
+            if parents:
+                page.parent = rng.choice(parents)
+                page.save()
+        elif action == "delete" and len(pages) > 1:
+            rng.choice(pages[1:]).delete()
+
+        assert not Page.objects.rebuild_tree(dry_run=True)
+
+
 @pytest.mark.django_db
 def test_page_get_children_is_efficient(django_assert_num_queries):
     """
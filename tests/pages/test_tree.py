@@ -0,0 +1,288 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from tests.mocks import request_with_pages
+from uncms.models.managers import publication_manager
+from uncms.pages.models import Page
+from uncms.pages.signals import page_publication_changed
+from uncms.pages.templatetags.uncms_pages import render_navigation
+from uncms.pages.tree import (
+    get_page_tree,
+    invalidate_page_tree,
+    page_tree_version,
+    sweep_publication,
+)
+from uncms.testhelpers.factories import UserFactory
+from uncms.testhelpers.factories.pages import PageFactory
+
+
+@pytest.mark.django_db
+def test_page_tree_disabled_by_default():
+    PageFactory()
+    assert request_with_pages().pages.tree is None
+
+
+@pytest.mark.django_db
+def test_page_tree_structure(page_tree_cache):
+    PageFactory.create_tree(3, 2)
+    homepage = Page.objects.get_homepage()
+    tree = get_page_tree()
+
+    assert tree.homepage == homepage
+    assert [page.pk for page in tree.homepage.children] == [
+        page.pk for page in homepage.get_children()
+    ]
+    for page in Page.objects.all():
+        tree_page = tree.get(page.pk)
+        assert tree_page == page
+        assert tree_page.parent == page.parent
+        assert tree_page.get_absolute_url() == page.get_absolute_url()
+        # The same instance should be returned every time.
+        assert tree.get(page.pk) is tree_page
+
+    assert tree.get(-1) is None
+
+
+@pytest.mark.django_db
+def test_page_tree_is_efficient(page_tree_cache, django_assert_num_queries):
+    PageFactory.create_tree(5, 5, 2)
+    homepage = Page.objects.get_homepage()
+    deep_page = homepage.get_children()[-1].get_children()[-1].get_children()[-1]
+
+    # Warm the cache.
+    get_page_tree()
+
+    with django_assert_num_queries(0):
+        request = request_with_pages(deep_page.get_absolute_url())
+        render_navigation({"request": request}, pages=request.pages.homepage.navigation)
+        assert request.pages.current == deep_page
+        assert request.pages.breadcrumbs[-2].parent == deep_page.parent.parent
+        assert request.pages.get_page(deep_page.pk).get_absolute_url() == (
+            deep_page.get_absolute_url()
+        )
+
+
+@pytest.mark.django_db
+def test_page_tree_empty(page_tree_cache):
+    request = request_with_pages()
+    assert request.pages.homepage is None
+    # pylint:disable-next=use-implicit-booleaness-not-comparison
+    assert request.pages.breadcrumbs == []
+    assert request.pages.get_page(1) is None
+
+
+@pytest.mark.django_db
+def test_page_tree_invalidated_by_save_and_delete(page_tree_cache):
+    homepage = PageFactory()
+    version = page_tree_version.get()
+    assert get_page_tree().homepage.children == []
+
+    page = PageFactory(parent=homepage)
+    assert page_tree_version.get() != version
+    assert get_page_tree().homepage.children == [page]
+
+    page.title = "Changed"
+    page.save()
+    assert get_page_tree().get(page.pk).title == "Changed"
+
+    page.delete()
+    assert get_page_tree().homepage.children == []
+
+
+@pytest.mark.django_db
+def test_page_tree_invalidated_by_move_page_view(page_tree_cache, client):
+    client.force_login(UserFactory(superuser=True))
+    homepage = PageFactory()
+    page_1 = PageFactory(parent=homepage)
+    page_2 = PageFactory(parent=homepage)
+    assert get_page_tree().homepage.children == [page_1, page_2]
+
+    client.post(
+        reverse("admin:pages_page_move_page", args=[page_1.pk]),
+        data={"direction": "down"},
+    )
+    assert get_page_tree().homepage.children == [page_2, page_1]
+
+
+@pytest.mark.django_db
+def test_page_tree_invalidate_on_commit(
+    page_tree_cache, django_capture_on_commit_callbacks
+):
+    version = page_tree_version.get()
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        invalidate_page_tree()
+        bumped_version = page_tree_version.get()
+        assert bumped_version != version
+    assert len(callbacks) == 1
+    assert page_tree_version.get() != bumped_version
+
+
+@pytest.mark.django_db
+def test_page_tree_publication(page_tree_cache):
+    homepage = PageFactory()
+    online_page = PageFactory(parent=homepage)
+    offline_page = PageFactory(parent=homepage, is_online=False)
+    offline_child = PageFactory(parent=offline_page)
+
+    with publication_manager.select_published(True):
+        tree = get_page_tree()
+        assert tree.homepage.children == [online_page]
+        assert tree.get(offline_page.pk) is None
+        assert tree.get(offline_child.pk) is None
+
+    with publication_manager.select_published(False):
+        tree = get_page_tree()
+        assert tree.homepage.children == [online_page, offline_page]
+        assert tree.get(offline_child.pk) == offline_child
+
+
+@pytest.mark.django_db
+def test_page_tree_publication_dates(page_tree_cache, monkeypatch):
+    now = timezone.now().replace(second=0, microsecond=0)
+    homepage = PageFactory()
+    future_page = PageFactory(
+        parent=homepage, publication_date=now + timedelta(minutes=5)
+    )
+    expiring_page = PageFactory(
+        parent=homepage, expiry_date=now + timedelta(minutes=10)
+    )
+
+    with publication_manager.select_published(True):
+        assert get_page_tree().homepage.children == [expiring_page]
+
+        # Nothing has been saved, but the passage of time has made the
+        # snapshot stale.
+        monkeypatch.setattr(timezone, "now", lambda: now + timedelta(minutes=5))
+        assert get_page_tree().homepage.children == [future_page, expiring_page]
+
+        monkeypatch.setattr(timezone, "now", lambda: now + timedelta(minutes=10))
+        assert get_page_tree().homepage.children == [future_page]
+
+
+@pytest.mark.django_db
+def test_page_tree_admin_form(page_tree_cache, admin_client):
+    homepage = PageFactory()
+    offline_page = PageFactory(parent=homepage, is_online=False)
+    other_page = PageFactory(parent=homepage)
+
+    # The admin must still see offline pages in the parent choices.
+    response = admin_client.get(
+        reverse("admin:pages_page_change", args=[other_page.pk])
+    )
+    assert response.status_code == 200
+    choices = dict(response.context["adminform"].form.fields["parent"].choices)
+    assert offline_page.pk in choices
+
+
+@pytest.mark.django_db
+def test_page_tree_middleware_query_count(
+    page_tree_cache, client, django_assert_num_queries
+):
+    """
+    Only the page content should be fetched from the database once the tree
+    has been loaded.
+    """
+    PageFactory.create_tree(2, 2)
+    homepage = Page.objects.get_homepage()
+    subpage = homepage.children[0].children[0]
+    client.get(homepage.get_absolute_url())
+
+    for page in [homepage, subpage]:
+        with django_assert_num_queries(1):
+            response = client.get(page.get_absolute_url())
+        assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_page_tree_get_for_path(page_tree_cache):
+    homepage = PageFactory(slug="home")
+    section = PageFactory(parent=homepage, slug="section")
+    subsection = PageFactory(parent=section, slug="subsection")
+    other = PageFactory(parent=homepage, slug="other")
+    tree = get_page_tree()
+
+    assert tree.snapshot.paths == {
+        "": homepage.pk,
+        "section": section.pk,
+        "section/subsection": subsection.pk,
+        "other": other.pk,
+    }
+
+    assert tree.get_for_path("/") == homepage
+    assert tree.get_for_path("") == homepage
+    assert tree.get_for_path("/home/") == homepage
+    assert tree.get_for_path("/section/") == section
+    assert tree.get_for_path("/section/subsection/") == subsection
+    assert tree.get_for_path("/section/subsection/detail/view/") == subsection
+    assert tree.get_for_path("/section//subsection/") == section
+    assert tree.get_for_path("/other/subsection/") == other
+
+    assert tree.get_breadcrumbs("/section/subsection/detail/") == [
+        homepage,
+        section,
+        subsection,
+    ]
+
+
+@pytest.mark.django_db
+def test_page_tree_breadcrumbs_match_uncached(page_tree_cache, settings):
+    PageFactory.create_tree(3, 3, 3)
+    paths = [page.get_absolute_url() for page in Page.objects.all()]
+    paths += [f"{path}nope/" for path in paths] + ["/nope/", "//"]
+
+    cached = [request_with_pages(path).pages.breadcrumbs for path in paths]
+
+    settings.UNCMS = {**settings.UNCMS, "PAGE_TREE_CACHE": None}
+    uncached = [request_with_pages(path).pages.breadcrumbs for path in paths]
+    assert cached == uncached
+
+
+@pytest.mark.django_db
+def test_sweep_publication(page_tree_cache):
+    now = timezone.now().replace(second=0, microsecond=0)
+    homepage = PageFactory()
+    future_page = PageFactory(
+        parent=homepage, publication_date=now + timedelta(minutes=5)
+    )
+    future_child = PageFactory(parent=future_page)
+    expiring_page = PageFactory(
+        parent=homepage, expiry_date=now + timedelta(minutes=10)
+    )
+    # Offline pages never become published.
+    PageFactory(
+        parent=homepage, is_online=False, publication_date=now + timedelta(minutes=5)
+    )
+    signals = []
+
+    def receiver(sender, pages, **kwargs):
+        signals.append((sender, pages))
+
+    page_publication_changed.connect(receiver)
+    try:
+        # With no record of the last sweep, all we can do is invalidate.
+        version = page_tree_version.get()
+        assert not sweep_publication(now)
+        assert page_tree_version.get() != version
+
+        version = page_tree_version.get()
+        assert not sweep_publication(now + timedelta(minutes=4, seconds=59))
+        assert page_tree_version.get() == version
+
+        assert sweep_publication(now + timedelta(minutes=5)) == [
+            future_page,
+            future_child,
+        ]
+        assert page_tree_version.get() != version
+
+        assert sweep_publication(now + timedelta(minutes=20)) == [expiring_page]
+        assert not sweep_publication(now + timedelta(minutes=30))
+    finally:
+        page_publication_changed.disconnect(receiver)
+
+    assert signals == [
+        (Page, [future_page, future_child]),
+        (Page, [expiring_page]),
+    ]
@@ -0,0 +1,19 @@
+import pytest
+
+from uncms.redirects import matcher
+
+
+@pytest.fixture
+def redirects_cache(use_cache):
+    use_cache("REDIRECTS_CACHE", matcher._matchers)
+
+
+@pytest.fixture(autouse=True)
+def redirect_hit_counter():
+    # pylint:disable=import-outside-toplevel
+    from uncms.redirects.hits import redirect_hit_counter as counter
+
+    # Don't let unflushed hits from other tests be written in this one.
+    counter.discard()
+    yield counter
+    counter.discard()
@@ -1,3 +1,4 @@
+from datetime import timedelta
 from io import BytesIO
 
 import pytest
@@ -5,6 +6,7 @@ from bs4 import BeautifulSoup
 from django.contrib.admin.sites import AdminSite
 from django.test import RequestFactory, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from tests.redirects.helpers import generate_csv
 from uncms.redirects.admin import RedirectAdmin
@@ -12,6 +14,7 @@ from uncms.redirects.forms import RedirectImportForm
 from uncms.redirects.models import Redirect
 from uncms.testhelpers.factories import UserFactory
 from uncms.testhelpers.factories.media import MINIMAL_GIF_DATA
+from uncms.testhelpers.factories.pages import PageFactory
 
 IMPORT_PERMISSIONS = ["redirects.add_redirect", "redirects.change_redirect"]
 
@@ -70,6 +73,8 @@ def test_redirectadmin_list(admin_client):
         "old_path",
         "new_path",
         "type",
+        "hit_count",
+        "last_hit",
         "test_redirect",
     ]
 
@@ -84,6 +89,8 @@ def test_redirectadmin_list(admin_client):
         "new_path",
         "regular_expression",
         "type",
+        "hit_count",
+        "last_hit",
         "test_redirect",
     ]
 
@@ -211,3 +218,79 @@ def test_redirectadmin_import_csv_view(client):
         ("/example/", "/sample/"),
         ("/example2/", "/sample2/"),
     ]
+
+
+@pytest.mark.django_db
+def test_redirectadmin_analysis_view(client):
+    url = reverse("admin:redirects_redirect_analysis")
+    client.force_login(UserFactory(is_staff=True))
+    assert client.get(url).status_code == 403
+
+    client.force_login(
+        UserFactory(is_staff=True, permissions=["redirects.view_redirect"])
+    )
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.context["chains"] == []
+    assert response.context["loops"] == []
+
+    Redirect.objects.bulk_create(
+        [
+            Redirect(old_path="/a/", new_path="/b/"),
+            Redirect(old_path="/b/", new_path=""),
+            Redirect(old_path="/loop-1/", new_path="/loop-2/"),
+            Redirect(old_path="/loop-2/", new_path="/loop-1/"),
+        ]
+    )
+    response = client.get(url)
+    assert response.status_code == 200
+    assert [
+        [redirect.old_path for redirect in chain]
+        for chain in response.context["chains"]
+    ] == [["/a/", "/b/"]]
+    assert [
+        [redirect.old_path for redirect in loop] for loop in response.context["loops"]
+    ] == [["/loop-1/", "/loop-2/"]]
+    assert "410 Gone" in response.content.decode()
+
+    Redirect.objects.filter(old_path="/b/").update(new_path="/c/")
+    response = client.get(url)
+    assert response.context["chains"][0][0].final_path == "/c/"
+    assert "clients are sent to /c/" in response.content.decode()
+    # The report does not save anything.
+    assert Redirect.objects.get(old_path="/a/").final_path == ""
+
+    # Chains stop at pages, as they do when final_path is saved.
+    PageFactory(parent=PageFactory(slug="home"), slug="b")
+    response = client.get(url)
+    assert response.context["chains"][0][0].final_path == ""
+    assert "clients are sent to /b/" in response.content.decode()
+
+    changelist = client.get(reverse("admin:redirects_redirect_changelist"))
+    assert url in changelist.content.decode()
+
+
+@pytest.mark.django_db
+def test_redirectadmin_stale_filter(admin_client):
+    now = timezone.now()
+    for old_path, last_hit in [
+        ("/never/", None),
+        ("/recent/", now - timedelta(days=1)),
+        ("/month/", now - timedelta(days=45)),
+        ("/old/", now - timedelta(days=400)),
+    ]:
+        Redirect.objects.create(old_path=old_path, new_path="/new/", last_hit=last_hit)
+
+    def filtered(value):
+        response = admin_client.get(
+            reverse("admin:redirects_redirect_changelist"), {"stale": value}
+        )
+        assert response.status_code == 200
+        return [
+            redirect.old_path for redirect in response.context_data["cl"].result_list
+        ]
+
+    assert filtered("never") == ["/never/"]
+    assert filtered("30") == ["/month/", "/never/", "/old/"]
+    assert filtered("90") == ["/never/", "/old/"]
+    assert filtered("365") == ["/never/", "/old/"]
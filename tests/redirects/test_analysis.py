@@ -0,0 +1,242 @@
+import pytest
+from django.apps import apps
+
+from uncms.redirects.analysis import analyse_redirects, get_local_path
+from uncms.redirects.models import Redirect, get_page_paths
+from uncms.redirects.types import RedirectTypeChoices
+from uncms.testhelpers.factories.pages import PageFactory
+
+
+def make_redirects(*redirects):
+    return [
+        Redirect(old_path=old_path, new_path=new_path, type=redirect_type)
+        for old_path, new_path, redirect_type in (
+            redirect + (RedirectTypeChoices.PERMANENT,) * (3 - len(redirect))
+            for redirect in redirects
+        )
+    ]
+
+
+def test_get_local_path():
+    assert get_local_path("/one/") == "/one/"
+    assert get_local_path("https://example.com/one/") is None
+    assert get_local_path("/one/?query=1") is None
+    assert get_local_path("/one/#fragment") is None
+    assert get_local_path("one/") is None
+    assert get_local_path("") is None
+
+
+def test_analyse_redirects_chains():
+    analysis = analyse_redirects(
+        make_redirects(
+            ("/a/", "/b/"),
+            ("/b/", "/c/"),
+            # The trailing slash is added when looking for the next redirect,
+            # as it would be by RedirectFallbackMiddleware.
+            ("/c/", "/d"),
+            ("/d/", "/e/"),
+            ("/unrelated/", "/elsewhere/"),
+            ("/external/", "https://example.com/a/"),
+        )
+    )
+    assert analysis.final_paths == {"/a/": "/e/", "/b/": "/e/", "/c/": "/e/"}
+    assert [[redirect.old_path for redirect in chain] for chain in analysis.chains] == [
+        ["/a/", "/b/", "/c/", "/d/"]
+    ]
+    assert not analysis.loops
+
+    changed = analysis.apply()
+    assert [redirect.old_path for redirect in changed] == ["/a/", "/b/", "/c/"]
+    assert analysis.redirects["/a/"].final_path == "/e/"
+    assert analysis.redirects["/d/"].final_path == ""
+    assert not analysis.apply()
+
+
+def test_analyse_redirects_stops_at_temporary_and_gone():
+    analysis = analyse_redirects(
+        make_redirects(
+            ("/a/", "/b/"),
+            ("/b/", "/c/"),
+            ("/c/", "/d/", RedirectTypeChoices.TEMPORARY),
+            ("/d/", "/e/"),
+            ("/x/", "/y/"),
+            ("/y/", "/z/"),
+            ("/z/", ""),
+        )
+    )
+    assert analysis.final_paths == {
+        "/a/": "/c/",
+        "/c/": "/e/",
+        "/x/": "/z/",
+    }
+    assert len(analysis.chains) == 2
+
+
+def test_analyse_redirects_stops_at_served_paths():
+    redirects = make_redirects(
+        ("/a/", "/b/"),
+        ("/b/", "/c/"),
+        ("/c/", "/d/"),
+        ("/x/", "/y/"),
+    )
+    calls = []
+
+    def get_served_paths(paths):
+        calls.append(paths)
+        return {"/c/"}
+
+    analysis = analyse_redirects(redirects, get_served_paths=get_served_paths)
+    assert analysis.final_paths == {"/a/": "/c/"}
+    # Only the paths that redirects lead to are asked about.
+    assert calls == [{"/b/", "/c/"}]
+
+
+def test_analyse_redirects_loops():
+    analysis = analyse_redirects(
+        make_redirects(
+            ("/a/", "/b/"),
+            ("/b/", "/c/"),
+            ("/c/", "/b/"),
+            ("/into-loop/", "/a/"),
+            # This redirects to itself once the trailing slash is removed.
+            ("/self/", "/self"),
+            ("/fine/", "/also-fine/"),
+            ("/also-fine/", "/done/"),
+        )
+    )
+    assert sorted(analysis.loops) == [["/b/", "/c/"], ["/self/"]]
+    assert analysis.looping == {"/a/", "/b/", "/c/", "/into-loop/", "/self/"}
+    assert analysis.final_paths == {"/fine/": "/done/"}
+    assert [[redirect.old_path for redirect in chain] for chain in analysis.chains] == [
+        ["/fine/", "/also-fine/"]
+    ]
+    assert [redirect.old_path for redirect in analysis.get_chain("/into-loop/")] == [
+        "/into-loop/",
+        "/a/",
+        "/b/",
+        "/c/",
+    ]
+
+
+@pytest.mark.django_db
+def test_redirectmanager_update_final_paths(django_assert_num_queries):
+    # Saving a redirect updates the chains through it.
+    Redirect.objects.create(old_path="/a/", new_path="/b/")
+    Redirect.objects.create(old_path="/b/", new_path="/c/")
+    assert Redirect.objects.get(old_path="/a/").final_path == "/c/"
+
+    third = Redirect.objects.create(old_path="/c/", new_path="/d/")
+    assert dict(Redirect.objects.values_list("old_path", "final_path")) == {
+        "/a/": "/d/",
+        "/b/": "/d/",
+        "/c/": "",
+    }
+    response = Redirect.objects.get(old_path="/a/").response_for_path("/a/")
+    assert response.status_code == 301
+    assert response["Location"] == "/d/"
+
+    third.delete()
+    assert Redirect.objects.get(old_path="/a/").final_path == "/c/"
+
+    # Nothing is written if nothing has changed (this looks for redirects,
+    # then for pages at the paths that they lead to).
+    with django_assert_num_queries(2):
+        analysis = Redirect.objects.update_final_paths()
+    assert not analysis.changed
+
+    # Changes made without signals are picked up.
+    Redirect.objects.filter(old_path="/b/").update(new_path="/e/")
+    assert [
+        redirect.old_path for redirect in Redirect.objects.update_final_paths().changed
+    ] == ["/a/"]
+    assert Redirect.objects.get(old_path="/a/").final_path == "/e/"
+
+
+@pytest.mark.django_db
+def test_redirectmanager_get_connected():
+    for old_path, new_path in [
+        ("/a/", "/b"),
+        ("/b/", "/c/"),
+        ("/c/", "https://example.com/"),
+        ("/x/", "/a/"),
+        ("/unrelated/", "/elsewhere/"),
+    ]:
+        Redirect.objects.create(old_path=old_path, new_path=new_path)
+
+    for path in ["/a/", "/b/", "/c/", "/x/"]:
+        assert sorted(
+            redirect.old_path for redirect in Redirect.objects.get_connected([path])
+        ) == ["/a/", "/b/", "/c/", "/x/"]
+    assert not Redirect.objects.get_connected(["/nowhere/"])
+
+
+@pytest.mark.django_db
+def test_redirect_update_chains(django_assert_num_queries):
+    Redirect.objects.create(old_path="/a/", new_path="/b/")
+    Redirect.objects.create(old_path="/b/", new_path="/c/")
+    for index in range(20):
+        Redirect.objects.create(old_path=f"/other-{index}/", new_path="/d/")
+
+    # Only the chain through the changed redirect is looked at (two hops, a
+    # query for pages, and the update).
+    redirect = Redirect.objects.get(old_path="/b/")
+    Redirect.objects.filter(old_path="/b/").update(new_path="/e/")
+    with django_assert_num_queries(4):
+        assert [changed.old_path for changed in redirect.update_chains().changed] == [
+            "/a/"
+        ]
+
+    # Moving a redirect updates the chains that used to pass through it.
+    redirect.old_path = "/moved/"
+    redirect.save()
+    assert dict(
+        Redirect.objects.filter(old_path__in=["/a/", "/moved/"]).values_list(
+            "old_path", "final_path"
+        )
+    ) == {"/a/": "", "/moved/": ""}
+
+
+@pytest.mark.django_db
+def test_redirect_chains_stop_at_pages():
+    homepage = PageFactory(slug="home")
+    Redirect.objects.create(old_path="/a/", new_path="/b/")
+    Redirect.objects.create(old_path="/b/", new_path="/c/")
+    assert Redirect.objects.get(old_path="/a/").final_path == "/c/"
+
+    # Once a page is published at /b/, /a/ must lead to it.
+    page = PageFactory(parent=homepage, slug="b")
+    assert Redirect.objects.get(old_path="/a/").final_path == ""
+
+    # ...including if it is moved there.
+    page.slug = "elsewhere"
+    page.save()
+    assert Redirect.objects.get(old_path="/a/").final_path == "/c/"
+    page.slug = "b"
+    page.save()
+    assert Redirect.objects.get(old_path="/a/").final_path == ""
+
+    page.delete()
+    assert Redirect.objects.get(old_path="/a/").final_path == "/c/"
+
+    # Redirects that are saved check for pages too.
+    PageFactory(parent=homepage, slug="b")
+    Redirect.objects.create(old_path="/x/", new_path="/a/")
+    assert dict(Redirect.objects.values_list("old_path", "final_path")) == {
+        "/a/": "",
+        "/b/": "",
+        "/x/": "/b/",
+    }
+    assert not Redirect.objects.update_final_paths().changed
+
+
+@pytest.mark.django_db
+def test_get_page_paths(monkeypatch):
+    homepage = PageFactory(slug="home")
+    PageFactory(parent=homepage, slug="b")
+    assert get_page_paths(["/", "/b/", "/c/"]) == {"/", "/b/"}
+
+    # The redirects app does not need the pages app.
+    monkeypatch.setattr(
+        apps, "is_installed", lambda app_name: app_name != "uncms.pages"
+    )
+    assert get_page_paths(["/", "/b/", "/c/"]) == set()
@@ -0,0 +1,121 @@
+import time
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from uncms.redirects.hits import RedirectHitCounter
+from uncms.redirects.models import Redirect
+
+
+@pytest.mark.django_db
+def test_redirecthitcounter_flush(settings, django_assert_num_queries):
+    settings.UNCMS = {**settings.UNCMS, "REDIRECTS_HIT_FLUSH_INTERVAL": 3600}
+    redirects = [
+        Redirect.objects.create(old_path=f"/example-{index}/", new_path="/sample/")
+        for index in range(5)
+    ]
+    counter = RedirectHitCounter(batch_size=2)
+
+    with django_assert_num_queries(0):
+        for redirect in redirects[:3]:
+            counter.record(redirect)
+        counter.record(redirects[0])
+    assert len(counter) == 3
+
+    before = timezone.now()
+    # Two batches of two, then one.
+    with django_assert_num_queries(2):
+        counter.flush()
+    assert not counter
+
+    assert dict(Redirect.objects.values_list("old_path", "hit_count")) == {
+        "/example-0/": 2,
+        "/example-1/": 1,
+        "/example-2/": 1,
+        "/example-3/": 0,
+        "/example-4/": 0,
+    }
+    last_hit = Redirect.objects.get(old_path="/example-0/").last_hit
+    assert before - timedelta(seconds=5) < last_hit <= before
+    assert Redirect.objects.get(old_path="/example-4/").last_hit is None
+
+    # Counts are added to, not replaced.
+    counter.record(redirects[0])
+    counter.flush()
+    assert Redirect.objects.get(old_path="/example-0/").hit_count == 3
+
+    # A redirect deleted before its hits are written is skipped.
+    counter.record(redirects[4])
+    redirects[4].delete()
+    counter.flush()
+
+    with django_assert_num_queries(0):
+        counter.flush()
+
+
+@pytest.mark.django_db
+def test_redirecthitcounter_record_flushes_when_due(settings):
+    redirect = Redirect.objects.create(old_path="/example/", new_path="/sample/")
+    counter = RedirectHitCounter()
+
+    settings.UNCMS = {**settings.UNCMS, "REDIRECTS_HIT_FLUSH_INTERVAL": None}
+    counter.record(redirect)
+    assert not counter
+
+    settings.UNCMS = {**settings.UNCMS, "REDIRECTS_HIT_FLUSH_INTERVAL": 0}
+    counter.record(redirect)
+    assert not counter
+    redirect.refresh_from_db()
+    assert redirect.hit_count == 1
+    assert redirect.last_hit is not None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_redirecthitcounter_record_flushes_without_more_hits(settings):
+    # The background thread has its own database connection, so it cannot
+    # see anything in an uncommitted test transaction.
+    settings.UNCMS = {**settings.UNCMS, "REDIRECTS_HIT_FLUSH_INTERVAL": 0.1}
+    redirect = Redirect.objects.create(old_path="/example/", new_path="/sample/")
+    counter = RedirectHitCounter()
+    counter.record(redirect)
+    counter.record(redirect)
+    assert len(counter) == 1
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        redirect.refresh_from_db()
+        if redirect.hit_count:
+            break
+        time.sleep(0.05)
+    assert redirect.hit_count == 2
+    assert not counter
+
+    # Nothing is scheduled until there is something to write.
+    counter.record(redirect)
+    counter.discard()
+    time.sleep(0.2)
+    redirect.refresh_from_db()
+    assert redirect.hit_count == 2
+
+
+@pytest.mark.django_db
+def test_redirect_fallback_middleware_counts_hits(
+    client, settings, redirect_hit_counter
+):
+    # Not @modify_settings: tearing down the `settings` fixture afterwards
+    # would put the modified MIDDLEWARE back, for every later test.
+    settings.MIDDLEWARE = [
+        *settings.MIDDLEWARE,
+        "uncms.redirects.middleware.RedirectFallbackMiddleware",
+    ]
+    redirect = Redirect.objects.create(old_path="/example/", new_path="/sample/")
+    settings.UNCMS = {**settings.UNCMS, "REDIRECTS_HIT_FLUSH_INTERVAL": 3600}
+    client.get("/example/")
+    client.get("/example")
+    client.get("/nope/")
+    assert len(redirect_hit_counter) == 1
+
+    redirect_hit_counter.flush()
+    redirect.refresh_from_db()
+    assert redirect.hit_count == 2
@@ -166,3 +166,74 @@ def test_redirectimporter_save():
     ]
     assert importer.statistics["created"] == 0
     assert importer.statistics["updated"] == 2
+
+
+@pytest.mark.django_db
+def test_redirectimporter_save_in_batches(django_assert_num_queries):
+    Redirect.objects.create(old_path="/existing-0/", new_path="/old/")
+    Redirect.objects.create(old_path="/existing-1/", new_path="/new/")
+    lines = [(f"/example-{index}/", f"/sample-{index}/") for index in range(250)]
+    lines += [
+        ("/existing-0/", "/new/"),
+        ("/existing-1/", "/new/"),
+        # The last line for a path wins.
+        ("/example-0/", "/sample-0-again/"),
+    ]
+    importer = RedirectImporter()
+    importer.load(generate_csv(lines))
+
+    # Three queries to fetch existing redirects, three to create, one to
+    # update, one to look for chains of redirects, and a savepoint around
+    # them.
+    with django_assert_num_queries(10):
+        importer.save(batch_size=100)
+
+    assert importer.statistics == {"total": 253, "created": 250, "updated": 3}
+    assert Redirect.objects.count() == 252
+    assert dict(
+        Redirect.objects.filter(
+            old_path__in=["/example-0/", "/example-249/", "/existing-0/"]
+        ).values_list("old_path", "new_path")
+    ) == {
+        "/example-0/": "/sample-0-again/",
+        "/example-249/": "/sample-249/",
+        "/existing-0/": "/new/",
+    }
+
+
+def test_redirectimporter_start_workers():
+    lines = [(f"/example-{index}/", f"/sample-{index}/") for index in range(30)]
+    importer = RedirectImporter()
+    with importer.start_workers(2):
+        executor = importer._executor
+        assert executor is not None
+        chunks = list(importer.iter_load(generate_csv(lines), chunk_size=10, workers=2))
+        # The pool which was already running is used.
+        assert importer._executor is executor
+    assert importer._executor is None
+    assert [len(chunk) for chunk in chunks] == [10, 10, 10]
+
+    with importer.start_workers(1):
+        assert importer._executor is None
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_redirectimporter_iter_load(workers):
+    lines = [(f"/example-{index}/", f"/sample-{index}/") for index in range(100)]
+    lines[3] = ("example-3/", "/sample-3/")
+    lines[20] = ("https://example.invalid/example-20/", "/sample-20/")
+    importer = RedirectImporter()
+    chunks = importer.iter_load(generate_csv(lines), chunk_size=10, workers=workers)
+
+    # Lines are read lazily.
+    first_chunk = next(chunks)
+    assert importer.line_count < 100
+    chunks = [first_chunk] + list(chunks)
+    assert importer.line_count == 100
+
+    assert [len(chunk) for chunk in chunks] == [9] + [10] * 9
+    assert [error.line_number for error in importer.errors] == [4]
+    assert chunks[2][0].old_path == "/example-20/"
+    assert [redirect.old_path for redirect in chunks[0]] == [
+        f"/example-{index}/" for index in range(10) if index != 3
+    ]
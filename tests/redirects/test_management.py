@@ -1,4 +1,5 @@
 import os
+from io import StringIO
 
 import pytest
 from django.core.management import call_command
@@ -71,3 +72,58 @@ def test_importredirectscsv_verbosity():
         "--ignore-errors",
     )
     assert Redirect.objects.count() == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("workers", [1, 2])
+def test_importredirectscsv_workers(tmp_path, workers):
+    csv_path = tmp_path / "redirects.csv"
+    csv_path.write_text(
+        "".join(f"/example-{index}/,/sample-{index}/\n" for index in range(30)),
+        encoding="utf-8",
+    )
+    stdout = StringIO()
+    call_command(
+        "import_redirects_csv",
+        str(csv_path),
+        "--batch-size=10",
+        f"--workers={workers}",
+        "--verbosity=2",
+        stdout=stdout,
+    )
+    assert Redirect.objects.count() == 30
+    output = stdout.getvalue()
+    # Progress is reported after each chunk, and at the end.
+    assert output.count(" lines processed in ") == 4
+    assert "30 lines processed in" in output
+    assert output.endswith("30 redirects created, 0 updated, 30 total\n")
+
+
+@pytest.mark.django_db
+def test_analyseredirects():
+    Redirect.objects.bulk_create(
+        [
+            Redirect(old_path="/a/", new_path="/b/"),
+            Redirect(old_path="/b/", new_path="/c/"),
+        ]
+    )
+    stdout = StringIO()
+    call_command("analyse_redirects", "--verbosity=2", stdout=stdout)
+    assert "chain: /a/ 🡢 /b/ 🡢 /c/" in stdout.getvalue()
+    assert "1 redirects updated, 1 chains found" in stdout.getvalue()
+    assert Redirect.objects.get(old_path="/a/").final_path == "/c/"
+
+    # Loops are an error, but chains are still updated.
+    Redirect.objects.bulk_create(
+        [
+            Redirect(old_path="/c/", new_path="/d/"),
+            Redirect(old_path="/loop-1/", new_path="/loop-2/"),
+            Redirect(old_path="/loop-2/", new_path="/loop-1/"),
+        ]
+    )
+    stderr = StringIO()
+    with pytest.raises(CommandError) as exc:
+        call_command("analyse_redirects", stdout=StringIO(), stderr=stderr)
+    assert str(exc.value) == "1 redirect loops found"
+    assert "loop: /loop-1/ 🡢 /loop-2/ 🡢 /loop-1/" in stderr.getvalue()
+    assert Redirect.objects.get(old_path="/a/").final_path == "/d/"
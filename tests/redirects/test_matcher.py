@@ -0,0 +1,110 @@
+import pytest
+
+from uncms.redirects.matcher import (
+    RedirectMatcher,
+    get_bucket,
+    get_literal_prefix,
+    get_redirect_matcher,
+)
+from uncms.redirects.models import Redirect
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("/blog/", "/blog/"),
+        ("/blog/2020/post/", "/blog/"),
+        ("/blog", None),
+        ("/", None),
+        ("", None),
+        ("blog/", None),
+    ],
+)
+def test_get_bucket(path, expected):
+    assert get_bucket(path) == expected
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (r"^/blog/(.*)/$", "/blog/"),
+        (r"/blog/(.*)/$", "/blog/"),
+        (r"^/blog/\d+/", "/blog/"),
+        (r"^/blogs?/", "/blog"),
+        (r"^/blog/a*", "/blog/"),
+        (r"^/b{0,1}log/", "/"),
+        (r"^/blog/|^/news/", ""),
+        (r"(?i)^/blog/", ""),
+        (r".*", ""),
+        (r"/fixed/", "/fixed/"),
+    ],
+)
+def test_get_literal_prefix(pattern, expected):
+    assert get_literal_prefix(pattern) == expected
+
+
+def make_matcher(redirects):
+    """
+    Returns a RedirectMatcher for `redirects`, a list of (old_path,
+    regular_expression) tuples.
+    """
+    field_names = ("old_path", "regular_expression")
+    return RedirectMatcher("version", "default", field_names, sorted(redirects))
+
+
+@pytest.mark.parametrize(
+    "redirects, path, expected",
+    [
+        ([("/a/", False)], "/a/", "/a/"),
+        ([("/a/", False)], "/a", None),
+        # An exact match which comes first wins...
+        ([("/blog/", False), ("/blog/(.*)", True)], "/blog/", "/blog/"),
+        # ...but so does a regular expression which comes first.
+        ([("/blog/", False), ("/b.*", True)], "/blog/", "/b.*"),
+        ([("/blog/(.*)/", True), ("/news/(.*)/", True)], "/news/a/", "/news/(.*)/"),
+        ([("/blog/(.*)/", True), ("/news/(.*)/", True)], "/other/a/", None),
+        # Patterns which could match anything are checked for every path.
+        ([("/blog/(.*)/", True), ("(?i)/NEWS/", True)], "/news/a/", "(?i)/NEWS/"),
+        ([("/blog/(.*)/", True), (".*/feed/", True)], "/blog/feed/", ".*/feed/"),
+        ([("/blog/(.*)/", True), ("/blog/feed/", True)], "/blog/feed/", "/blog/(.*)/"),
+        # Groups in one pattern must not confuse the others.
+        (
+            [("/a/(?P<x>.*)/", True), ("/a/(.*)/(?P<y>.*)/", True)],
+            "/a/b/c/",
+            "/a/(.*)/(?P<y>.*)/",
+        ),
+        ([("/a/(.)\\1/", True), ("/a/(.)/", True)], "/a/bb/", "/a/(.)\\1/"),
+        ([("/a/(.)\\1/", True), ("/a/(.)/", True)], "/a/b/", "/a/(.)/"),
+    ],
+)
+def test_redirectmatcher_get_for_path(redirects, path, expected):
+    redirect = make_matcher(redirects).get_for_path(path, Redirect)
+    if expected is None:
+        assert redirect is None
+    else:
+        assert redirect.old_path == expected
+
+
+@pytest.mark.django_db
+def test_get_redirect_matcher(redirects_cache, settings, django_assert_num_queries):
+    redirect = Redirect.objects.create(old_path="/a/", new_path="/b/")
+    regex_redirect = Redirect.objects.create(
+        old_path="/c/(.*)/", new_path=r"/d/\1/", regular_expression=True
+    )
+
+    matcher = get_redirect_matcher(Redirect)
+    with django_assert_num_queries(0):
+        assert get_redirect_matcher(Redirect) is matcher
+        assert Redirect.objects.get_for_path("/a/") == redirect
+        assert Redirect.objects.get_for_path("/c/e/") is None
+
+    settings.UNCMS = {**settings.UNCMS, "REGEX_REDIRECTS": True}
+    assert Redirect.objects.get_for_path("/c/e/") == regex_redirect
+
+    # Saving or deleting a redirect must rebuild the matcher.
+    redirect.old_path = "/e/"
+    redirect.save()
+    assert Redirect.objects.get_for_path("/a/") is None
+    assert Redirect.objects.get_for_path("/e/") == redirect
+    regex_redirect.delete()
+    assert Redirect.objects.get_for_path("/c/e/") is None
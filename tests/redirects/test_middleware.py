@@ -1,6 +1,7 @@
 import pytest
 from django.test import modify_settings
 
+from uncms.redirects.matcher import redirect_not_found_cache
 from uncms.redirects.models import Redirect
 from uncms.testhelpers.factories import UserFactory
 
@@ -45,3 +46,28 @@ def test_redirect_fallback_middleware_works(client):
     # branch
     response = client.get("/wobble/")
     assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_redirect_fallback_middleware_not_found_cache(
+    settings, client, django_assert_num_queries
+):
+    # Not @modify_settings: tearing down the `settings` fixture afterwards
+    # would put the modified MIDDLEWARE back, for every later test.
+    settings.MIDDLEWARE = [
+        *settings.MIDDLEWARE,
+        "uncms.redirects.middleware.RedirectFallbackMiddleware",
+    ]
+    settings.UNCMS = {**settings.UNCMS, "NOT_FOUND_CACHE_SIZE": 100}
+    redirect_not_found_cache.clear()
+    assert client.get("/example/").status_code == 404
+
+    # No need to look for a redirect the second time.
+    with django_assert_num_queries(0):
+        assert client.get("/example/").status_code == 404
+
+    # Adding a redirect clears the cache.
+    Redirect.objects.create(old_path="/example", new_path="/sample/")
+    response = client.get("/example/")
+    assert response.status_code == 301
+    assert response["Location"] == "/sample/"
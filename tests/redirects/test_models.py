@@ -46,6 +46,48 @@ def test_redirectmanager_get_for_path():
         assert Redirect.objects.get_for_path("/splat/") is None
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize("regex_redirects", [False, True])
+def test_redirectmanager_get_for_paths(
+    settings, django_assert_num_queries, regex_redirects
+):
+    settings.UNCMS = {**settings.UNCMS, "REGEX_REDIRECTS": regex_redirects}
+    with_slash = Redirect.objects.create(old_path="/a/", new_path="/b/")
+    without_slash = Redirect.objects.create(old_path="/c", new_path="/d/")
+    regex_redirect = Redirect.objects.create(
+        old_path="/e/(.*)",
+        new_path=r"/f/\1",
+        test_path="/e/g",
+        regular_expression=True,
+    )
+
+    with django_assert_num_queries(1):
+        assert Redirect.objects.get_for_paths(["/a/", "/a"]) == with_slash
+    with django_assert_num_queries(1):
+        assert Redirect.objects.get_for_paths(["/a", "/a/"]) == with_slash
+    with django_assert_num_queries(1):
+        assert Redirect.objects.get_for_paths(["/c/", "/c"]) == without_slash
+    with django_assert_num_queries(1):
+        assert Redirect.objects.get_for_paths(["/x/", "/x"]) is None
+
+    # The first path with a redirect wins, even if it's a regular expression.
+    expected = regex_redirect if regex_redirects else without_slash
+    with django_assert_num_queries(1):
+        assert Redirect.objects.get_for_paths(["/e/g", "/c"]) == expected
+
+
+@pytest.mark.django_db
+def test_redirectmanager_get_for_paths_cached(
+    redirects_cache, django_assert_num_queries
+):
+    redirect = Redirect.objects.create(old_path="/a", new_path="/b/")
+    Redirect.objects.get_for_path("/")
+
+    with django_assert_num_queries(0):
+        assert Redirect.objects.get_for_paths(["/a/", "/a"]) == redirect
+        assert Redirect.objects.get_for_paths(["/x/", "/x"]) is None
+
+
 def test_redirect_clean():
     base_data = {
         "old_path": "/example/",
@@ -181,6 +223,8 @@ def test_redirect_sub_path():
     )
 
     assert non_regex.sub_path("/sample/") == "/example/"
+    non_regex.final_path = "/final/"
+    assert non_regex.sub_path("/sample/") == "/final/"
     assert regex_redirect.sub_path("/sample/wicked/") == "/example/wicked/"
 
 
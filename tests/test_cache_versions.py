@@ -0,0 +1,37 @@
+import pytest
+from django.core.cache import caches
+
+from uncms.cache_versions import CacheVersion
+
+
+def test_cacheversion_disabled():
+    version = CacheVersion("HTML_CACHE", "test.version")
+    assert version.get() is None
+    version.bump()
+    version.invalidate()
+    assert caches["default"].get("test.version") is None
+
+
+@pytest.mark.django_db
+def test_cacheversion(use_cache, django_capture_on_commit_callbacks):
+    use_cache("HTML_CACHE")
+    version = CacheVersion("HTML_CACHE", "test.version")
+    token = version.get()
+    assert token
+    assert version.get() == token
+
+    version.bump()
+    assert version.get() != token
+
+    # A new token is created if the old one is gone.
+    token = version.get()
+    caches["default"].clear()
+    assert version.get() not in (None, token)
+
+    token = version.get()
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        version.invalidate()
+        bumped_token = version.get()
+        assert bumped_token != token
+    assert len(callbacks) == 1
+    assert version.get() != bumped_token
@@ -1,8 +1,11 @@
 from io import StringIO
 
+import pytest
 from django.core.management import call_command
 from django.test.utils import override_settings
 
+from uncms import checks
+
 
 def get_command_output(command, *args, **kwargs):
     stdout = StringIO()
@@ -112,3 +115,55 @@ def test_check_nh3_options():
         "NH3_OPTIONS caused an exception in `nh3.clean()`: clean() got an unexpected keyword"
         in stderr
     )
+
+
+@pytest.mark.parametrize(
+    "option, check_id",
+    [
+        ("PAGE_TREE_CACHE", "uncms.010"),
+        ("REDIRECTS_CACHE", "uncms.011"),
+        ("HTML_CACHE", "uncms.012"),
+    ],
+)
+def test_check_cache_options(option, check_id):
+    with override_settings(UNCMS={"SITE_DOMAIN": "example.com", option: "default"}):
+        _, stderr = get_command_output("check")
+    assert stderr == ""
+
+    with override_settings(UNCMS={"SITE_DOMAIN": "example.com", option: "imaginary"}):
+        _, stderr = get_command_output("check")
+    assert f'UNCMS["{option}"] is "imaginary"' in stderr
+    assert check_id in stderr
+
+
+def test_check_image_width_sets():
+    with override_settings(
+        UNCMS={"SITE_DOMAIN": "example.com", "IMAGE_WIDTH_SETS": {"ok": [320, 640]}}
+    ):
+        _, stderr = get_command_output("check")
+    assert stderr == ""
+
+    for widths in [[], "320", [320, "640"], [0]]:
+        with override_settings(
+            UNCMS={"SITE_DOMAIN": "example.com", "IMAGE_WIDTH_SETS": {"bad": widths}}
+        ):
+            _, stderr = get_command_output("check")
+        assert 'UNCMS["IMAGE_WIDTH_SETS"]["bad"]' in stderr
+        assert "uncms.014" in stderr
+
+
+def test_check_image_use_avif(monkeypatch):
+    with override_settings(
+        UNCMS={"SITE_DOMAIN": "example.com", "IMAGE_USE_AVIF": True}
+    ):
+        monkeypatch.setattr(checks, "is_avif_supported", lambda: True)
+        _, stderr = get_command_output("check")
+        assert stderr == ""
+
+        monkeypatch.setattr(checks, "is_avif_supported", lambda: False)
+        _, stderr = get_command_output("check")
+    assert "uncms.015" in stderr
+
+    # It doesn't matter if AVIF is not being used.
+    _, stderr = get_command_output("check")
+    assert stderr == ""
@@ -3,8 +3,23 @@ from bs4 import BeautifulSoup
 from django.contrib.contenttypes.models import ContentType
 from django.test import override_settings
 
-from uncms.html import clean_all, clean_html, format_html
+from tests.helpers import article_html, format_html_with_beautifulsoup
+from uncms import html as html_module
+from uncms.conf import defaults
+from uncms.html import (
+    HTMLPipeline,
+    clean_all,
+    clean_html,
+    format_all,
+    format_html,
+    get_html_pipeline,
+    get_html_settings_digest,
+    html_cache_version,
+    invalidate_html_cache,
+    process_html,
+)
 from uncms.media.models import File
+from uncms.signals import html_stage_finished
 from uncms.testhelpers.factories.media import SamplePNGFileFactory
 
 
@@ -31,13 +46,8 @@ def test_format_html():
         f'<p><img src="{new_prefix}"></p>'
     )
 
-    assert format_html(html).strip() == (
-        "<p><img/></p>"
-        '<p><img src="/nothing.jpg"/></p>'
-        f'<p><img src="{old_prefix}nonsense"/></p>'
-        f'<p><img src="{old_prefix}0"/></p>'
-        f'<p><img src="{new_prefix}"/></p>'
-    )
+    # Anything that isn't replaced is passed through as it is.
+    assert format_html(html) == html
 
     html = (
         # Test with no alt text to ensure it gets an empty string and not
@@ -73,6 +83,71 @@ def test_format_html():
     assert img_tags[6]["class"] == ["image__image", "left"]
 
 
+@pytest.mark.django_db
+def test_format_html_fetches_images_in_bulk(django_assert_num_queries):
+    images = SamplePNGFileFactory.create_batch(3)
+    missing_pk = images[-1].pk + 1
+    html = "".join(
+        f'<p><img src="/library/redirect/{pk}/"></p>'
+        for pk in [image.pk for image in images] * 2 + [missing_pk]
+    )
+    # Warm ContentType's cache.
+    format_html("")
+
+    with django_assert_num_queries(1):
+        formatted = format_html(html)
+
+    # Rendered images are included exactly as render_multi_format renders
+    # them, not parsed and serialised again.
+    for image in images:
+        rendered = image.render_multi_format(width=1280, extra_attributes={})
+        assert formatted.count(rendered) == 2
+    assert formatted.endswith(f'<p><img src="/library/redirect/{missing_pk}/"></p>')
+
+
+@pytest.mark.django_db
+def test_format_html_matches_beautifulsoup():
+    """
+    Apart from markup not being normalised, the output should be the same
+    as when format_html was implemented with BeautifulSoup.
+    """
+    images = SamplePNGFileFactory.create_batch(5)
+    html = article_html([image.pk for image in images])
+    formatted = format_html(html)
+    assert formatted.count("<picture") == 5
+    assert str(BeautifulSoup(formatted, "html.parser")) == str(
+        BeautifulSoup(format_html_with_beautifulsoup(html), "html.parser")
+    )
+
+
+@pytest.mark.django_db
+def test_format_html_edge_cases():
+    image = SamplePNGFileFactory()
+    rendered = image.render_multi_format(width=1280, extra_attributes={})
+    src = f"/library/redirect/{image.pk}/"
+    html = (
+        "<p>Line one\nline two\r\n"
+        # Images in comments and scripts are not images.
+        f'<!-- <img src="{src}"> --><script>"<img src=\'{src}\'>"</script>'
+        # Upper case, self-closing, and spread over several lines.
+        f'<IMG\nSRC="{src}"\n/>'
+        "&amp; more</p>"
+    )
+    assert format_html(html) == (
+        "<p>Line one\nline two\r\n"
+        f'<!-- <img src="{src}"> --><script>"<img src=\'{src}\'>"</script>'
+        f"{rendered}"
+        "&amp; more</p>"
+    )
+
+    # Attribute values are unescaped before they are passed on, and
+    # valueless attributes have an empty value.
+    formatted = format_html(f'<img data-a="&amp;" src="{src}" hidden>')
+    assert formatted == image.render_multi_format(
+        width=1280, extra_attributes={"data-a": "&", "hidden": ""}
+    )
+
+
 def example_processor(html):
     # sample processor for testing config overrides
     return html.replace("woof", "meow")
@@ -107,3 +182,145 @@ def test_html_clean():
             clean_all(html)
             == '<img loading="lazy" title="example" class="test" src="/example.png"><p>meow</p>'
         )
+
+
+@pytest.mark.django_db
+def test_process_html_cache(html_cache, django_assert_num_queries, settings):
+    image = SamplePNGFileFactory()
+    html = f'<p>woof</p><p><img src="/library/redirect/{image.pk}/"></p>'
+
+    processed = process_html(html)
+    assert "<picture" in processed
+    # The second time, nothing is cleaned or formatted.
+    with django_assert_num_queries(0):
+        assert process_html(html) == processed
+
+    # Saving a media file invalidates the cache.
+    image.alt_text = "Changed"
+    image.save()
+    assert 'alt="Changed"' in process_html(html)
+
+    # Changing a setting which affects the output changes the cache key.
+    settings.UNCMS = {**settings.UNCMS, "HTML_IMAGE_WIDTH": 640}
+    assert "width:640" in process_html(html)
+    settings.UNCMS = {
+        **settings.UNCMS,
+        "HTML_CLEANERS": ["tests.test_html.example_processor"],
+    }
+    assert "meow" in process_html(html)
+    settings.UNCMS = {
+        **settings.UNCMS,
+        "NH3_OPTIONS": {
+            **defaults.NH3_OPTIONS,
+            "tags": {"p"},
+        },
+        "HTML_CLEANERS": ["uncms.html.clean_html"],
+    }
+    assert "<picture" not in process_html(html)
+
+    # Changes that send no signals need the cache to be invalidated.
+    settings.UNCMS = {
+        key: value for key, value in settings.UNCMS.items() if key != "NH3_OPTIONS"
+    }
+    File.objects.filter(pk=image.pk).update(alt_text="Updated")
+    assert 'alt="Changed"' in process_html(html)
+    invalidate_html_cache()
+    assert 'alt="Updated"' in process_html(html)
+
+    # Empty fields are fine.
+    assert process_html("") == ""
+    assert process_html(None) == ""
+
+    # Long input is not cached.
+    settings.UNCMS = {**settings.UNCMS, "HTML_CACHE_MAX_LENGTH": 10}
+    with django_assert_num_queries(1):
+        process_html(html)
+
+
+@pytest.mark.django_db
+def test_process_html_cache_invalidate_on_commit(
+    html_cache, django_capture_on_commit_callbacks
+):
+    version = html_cache_version.get()
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        SamplePNGFileFactory().delete()
+        bumped_version = html_cache_version.get()
+        assert bumped_version != version
+    assert callbacks
+    assert html_cache_version.get() != bumped_version
+
+
+def test_html_pipeline_is_cached(monkeypatch):
+    imported = []
+    original_import_string = html_module.import_string
+
+    def import_string(path):
+        imported.append(path)
+        return original_import_string(path)
+
+    monkeypatch.setattr(html_module, "import_string", import_string)
+    get_html_pipeline.cache_clear()
+
+    with override_settings(
+        UNCMS={"HTML_CLEANERS": ["tests.test_html.example_processor"]}
+    ):
+        assert clean_all("woof") == "meow"
+        assert clean_all("woof woof") == "meow meow"
+    assert imported == ["tests.test_html.example_processor"]
+
+    # Changing the setting builds a new pipeline.
+    with override_settings(
+        UNCMS={
+            "HTML_CLEANERS": [
+                "tests.test_html.example_processor",
+                "uncms.html.clean_html",
+            ]
+        }
+    ):
+        assert clean_all("<script></script>woof") == "meow"
+    assert len(imported) == 3
+
+
+def test_html_pipeline_timing():
+    stages = []
+
+    def receiver(sender, pipeline, stage, duration, **kwargs):
+        stages.append((sender, pipeline, stage))
+        assert duration >= 0
+
+    html_stage_finished.connect(receiver)
+    try:
+        with override_settings(
+            UNCMS={
+                "HTML_CLEANERS": [
+                    "uncms.html.clean_html",
+                    "tests.test_html.example_processor",
+                ],
+                "HTML_OUTPUT_FORMATTERS": ["tests.test_html.example_processor"],
+            }
+        ):
+            assert format_all(clean_all("<p>woof</p>")) == "<p>meow</p>"
+    finally:
+        html_stage_finished.disconnect(receiver)
+
+    assert stages == [
+        (HTMLPipeline, "HTML_CLEANERS", "uncms.html.clean_html"),
+        (HTMLPipeline, "HTML_CLEANERS", "tests.test_html.example_processor"),
+        (HTMLPipeline, "HTML_OUTPUT_FORMATTERS", "tests.test_html.example_processor"),
+    ]
+
+
+def test_get_html_settings_digest(settings):
+    digest = get_html_settings_digest()
+    assert get_html_settings_digest() == digest
+    # The same settings in a different order give the same digest.
+    settings.UNCMS = {
+        **settings.UNCMS,
+        "NH3_OPTIONS": {
+            **defaults.NH3_OPTIONS,
+            "tags": set(sorted(defaults.NH3_OPTIONS["tags"], reverse=True)),
+        },
+    }
+    assert get_html_settings_digest() == digest
+    settings.UNCMS = {**settings.UNCMS, "IMAGE_USE_WEBP": False}
+    assert get_html_settings_digest() != digest
@@ -1,10 +1,14 @@
+import re
+
 import pytest
 from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
 from django.template.response import SimpleTemplateResponse
 from django.test import RequestFactory
 from django.test.utils import override_settings
 
-from uncms.middleware import PublicationMiddleware
+from uncms.middleware import PublicationMiddleware, compile_exclude_urls
+from uncms.models import publication_manager
 from uncms.testhelpers.factories import UserFactory
 from uncms.testhelpers.factories.pages import PageFactory
 
@@ -74,3 +78,55 @@ def test_publicationmiddleware_preview(client):
     # Ensure getting its preview URL works.
     response = client.get(page_obj.get_preview_url())
     assert response.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "patterns, path, expected",
+    [
+        ([], "/admin/", False),
+        ([r"^/admin/"], "/admin/pages/", True),
+        ([r"^/admin/"], "/administrator/", False),
+        ([r"/admin/"], "/admin/", True),
+        ([r"/admin/"], "/en/admin/", False),
+        ([r"^/admin/", r"^/[a-z]{2}/admin/"], "/en/admin/", True),
+        ([r"^/admin/", r"^/[a-z]{2}/admin/"], "/eng/admin/", False),
+        ([r"^/api/v\d+/$", r"^/news/.*\.json"], "/api/v2/", True),
+        ([r"^/api/v\d+/$", r"^/news/.*\.json"], "/api/v2/news/", False),
+        ([r"^/api/v\d+/$", r"^/news/.*\.json"], "/news/2/feed.json", True),
+        # Patterns with global flags cannot be combined with others.
+        ([r"(?i)^/ADMIN/", r"^/[a-z]{2}/admin/"], "/admin/", True),
+        ([r"(?i)^/ADMIN/", r"^/[a-z]{2}/admin/"], "/en/admin/", True),
+        ([r"(?i)^/ADMIN/", r"^/[a-z]{2}/admin/"], "/eng/admin/", False),
+        # Backreferences must still refer to the groups in their own pattern.
+        ([r"^/(a)/", r"^/(\w+)/\1/"], "/b/b/", True),
+        ([r"^/(a)/", r"^/(\w+)/\1/"], "/b/c/", False),
+    ],
+)
+def test_compile_exclude_urls(patterns, path, expected):
+    is_excluded = compile_exclude_urls(tuple(patterns))
+    assert is_excluded(path) is expected
+    # It must agree with checking the patterns one by one.
+    assert any(re.match(pattern, path) for pattern in patterns) is expected
+
+
+def test_publicationmiddleware_exclude_urls(settings):
+    publication_middleware = PublicationMiddleware(lambda: None)
+
+    def select_published(path):
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        publication_middleware.process_request(request)
+        try:
+            return publication_manager.select_published_active()
+        finally:
+            publication_middleware.process_response(request, HttpResponse())
+
+    assert select_published("/admin/") is False
+    assert select_published("/news/") is True
+
+    settings.UNCMS = {
+        **settings.UNCMS,
+        "PUBLICATION_MIDDLEWARE_EXCLUDE_URLS": [r"^/admin/", r"^/news/\d+/"],
+    }
+    assert select_published("/news/") is True
+    assert select_published("/news/1/") is False
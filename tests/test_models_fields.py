@@ -1,8 +1,29 @@
+from io import StringIO
+from unittest.mock import patch
+
 import pytest
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import models
+from django.test.utils import isolate_apps
+from django.utils.safestring import SafeString
 
-from tests.testing_app.models import LinkFieldModel
-from uncms.models.fields import LinkResolutionError, link_validator, resolve_link
+from tests.testing_app.models import (
+    LinkFieldModel,
+    RenderedHtmlFieldChildModel,
+    RenderedHtmlFieldModel,
+    RenderedHtmlFieldProxyModel,
+)
+from uncms.checks import check_rendered_html_fields
+from uncms.html import process_html
+from uncms.media.models import File, rerender_html_references
+from uncms.models.fields import (
+    HtmlField,
+    LinkResolutionError,
+    link_validator,
+    resolve_link,
+)
+from uncms.testhelpers.factories.media import SamplePNGFileFactory
 
 
 def test_resolve_link():
@@ -32,3 +53,131 @@ def test_linkfield_get_xxx_resolved():
     obj = LinkFieldModel.objects.create(link="https://[a")
 
     assert obj.get_link_resolved() == "https://[a"
+
+
+@pytest.mark.django_db
+def test_htmlfield_rendered_field():
+    image = SamplePNGFileFactory()
+    obj = RenderedHtmlFieldModel.objects.create(
+        body=f'<script></script><p><img src="/library/redirect/{image.pk}/"></p>'
+    )
+    assert obj.body_rendered == process_html(obj.body)
+    assert "<script>" not in obj.body_rendered
+    assert "<picture" in obj.body_rendered
+    assert obj.get_body_rendered() == obj.body_rendered
+    assert isinstance(obj.get_body_rendered(), SafeString)
+
+    obj.body = "<p>Changed</p>"
+    obj.save()
+    assert RenderedHtmlFieldModel.objects.get().body_rendered == "<p>Changed</p>"
+
+    # Saving only the HTML saves the rendered HTML too.
+    obj.body = "<p>Updated</p><script>alert(1)</script>"
+    obj.save(update_fields=["body"])
+    assert RenderedHtmlFieldModel.objects.get().body_rendered == "<p>Updated</p>"
+
+    # Objects which have not been rendered are rendered on the fly.
+    RenderedHtmlFieldModel.objects.update(body_rendered="")
+    assert RenderedHtmlFieldModel.objects.get().get_body_rendered() == "<p>Updated</p>"
+    assert RenderedHtmlFieldModel(body="").get_body_rendered() == ""
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "model", [RenderedHtmlFieldProxyModel, RenderedHtmlFieldChildModel]
+)
+def test_htmlfield_rendered_field_subclasses(model):
+    obj = model.objects.create(body="<p>Woof</p><script>alert(1)</script>")
+    assert obj.body_rendered == "<p>Woof</p>"
+    obj.body = "<p>Meow</p>"
+    obj.save(update_fields=["body"])
+    assert model.objects.get().body_rendered == "<p>Meow</p>"
+
+
+@pytest.mark.django_db
+def test_htmlfield_rendered_field_updated_with_media_file():
+    other = RenderedHtmlFieldModel.objects.create(body="<p>No images</p>")
+    # Nothing can refer to a new file yet.
+    with patch("uncms.media.models.rerender_html_fields") as rerender:
+        image = SamplePNGFileFactory(alt_text="Before")
+    rerender.assert_not_called()
+    obj = RenderedHtmlFieldModel.objects.create(
+        body=f'<p><img src="/library/redirect/{image.pk}/"></p>'
+    )
+    assert 'alt="Before"' in obj.body_rendered
+
+    image.alt_text = "After"
+    image.save()
+    obj.refresh_from_db()
+    assert 'alt="After"' in obj.body_rendered
+    assert obj.body_rendered == process_html(obj.body)
+
+    # Nothing is rendered again if nothing has changed...
+    image = File.objects.get(pk=image.pk)
+    RenderedHtmlFieldModel.objects.filter(pk=obj.pk).update(body_rendered="")
+    image.save()
+    obj.refresh_from_db()
+    assert obj.body_rendered == ""
+
+    # ...and references to other files (e.g. file 10 for file 1) are left
+    # alone.
+    similar = RenderedHtmlFieldModel.objects.create(
+        body=f'<p><img src="/library/redirect/{image.pk}0/"></p>'
+    )
+    RenderedHtmlFieldModel.objects.exclude(pk=other.pk).update(body_rendered="")
+    rerender_html_references(image)
+    obj.refresh_from_db()
+    assert 'alt="After"' in obj.body_rendered
+    similar.refresh_from_db()
+    assert similar.body_rendered == ""
+
+    image.delete()
+    obj.refresh_from_db()
+    assert obj.body_rendered == obj.body
+    other.refresh_from_db()
+    assert other.body_rendered == "<p>No images</p>"
+
+
+def test_htmlfield_deconstruct():
+    field = RenderedHtmlFieldModel._meta.get_field("body")
+    _, _, _, kwargs = field.deconstruct()
+    assert kwargs["rendered_field"] == "body_rendered"
+    assert "rendered_field" not in HtmlField().deconstruct()[3]
+
+
+def test_check_rendered_html_fields():
+    assert not check_rendered_html_fields(None)
+
+    with isolate_apps("tests.testing_app") as apps:
+
+        class BadRenderedHtmlFieldModel(models.Model):
+            body = HtmlField(rendered_field="nope")
+
+            class Meta:
+                app_label = "testing_app"
+
+        errors = check_rendered_html_fields([apps.get_app_config("testing_app")])
+    assert [error.id for error in errors] == ["uncms.013"]
+    assert errors[0].obj is BadRenderedHtmlFieldModel._meta.get_field("body")
+
+
+@pytest.mark.django_db
+def test_rerenderhtmlfields(settings):
+    objs = [
+        RenderedHtmlFieldModel.objects.create(body=f"<p>woof {index}</p>")
+        for index in range(5)
+    ]
+    settings.UNCMS = {
+        **settings.UNCMS,
+        "HTML_CLEANERS": ["uncms.html.clean_html", "tests.test_html.example_processor"],
+    }
+    stdout = StringIO()
+    call_command("rerender_html_fields", "--batch-size=2", stdout=stdout)
+    assert "5 objects updated" in stdout.getvalue()
+    for obj in objs:
+        obj.refresh_from_db()
+        assert obj.body_rendered == obj.body.replace("woof", "meow")
+
+    stdout = StringIO()
+    call_command("rerender_html_fields", stdout=stdout)
+    assert "0 objects updated" in stdout.getvalue()
@@ -0,0 +1,52 @@
+import time
+
+from uncms.not_found import NotFoundCache, get_not_found_cache_stats
+
+
+def test_notfoundcache_disabled_by_default():
+    cache = NotFoundCache("test-disabled")
+    cache.add("/nope/")
+    assert "/nope/" not in cache
+    assert cache.get_stats() == {"hits": 0, "misses": 0, "size": 0}
+
+
+def test_notfoundcache(settings, monkeypatch):
+    settings.UNCMS = {
+        **settings.UNCMS,
+        "NOT_FOUND_CACHE_SIZE": 2,
+        "NOT_FOUND_CACHE_TIMEOUT": 10,
+    }
+    now = 1000
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = NotFoundCache("test")
+
+    assert "/a/" not in cache
+    cache.add("/a/")
+    assert "/a/" in cache
+    assert get_not_found_cache_stats()["test"] == {"hits": 1, "misses": 1, "size": 1}
+
+    # The least recently used path is evicted.
+    cache.add("/b/")
+    assert "/a/" in cache
+    cache.add("/c/")
+    assert "/a/" in cache
+    assert "/b/" not in cache
+    assert "/c/" in cache
+
+    # Entries expire.
+    now = 1010
+    assert "/a/" not in cache
+    assert cache.get_stats()["size"] == 1
+
+    cache.clear()
+    assert "/c/" not in cache
+
+
+def test_notfoundcache_version(settings):
+    settings.UNCMS = {**settings.UNCMS, "NOT_FOUND_CACHE_SIZE": 10}
+    version = 1
+    cache = NotFoundCache("test-version", get_version=lambda: version)
+    cache.add("/a/")
+    assert "/a/" in cache
+    version = 2
+    assert "/a/" not in cache
@@ -9,7 +9,7 @@ from uncms.models.base import (
 from uncms.models.base import (
     SearchMetaBaseSearchAdapter as CMSSearchMetaBaseSearchAdapter,
 )
-from uncms.models.fields import LinkField
+from uncms.models.fields import HtmlField, LinkField
 from uncms.moderation.models import ModerationBase
 from uncms.pages.models import ContentBase, Page
 
@@ -91,6 +91,21 @@ class LinkFieldModel(models.Model):
     link = LinkField()
 
 
+class RenderedHtmlFieldModel(models.Model):
+    body = HtmlField(blank=True, rendered_field="body_rendered")
+
+    body_rendered = models.TextField(blank=True, editable=False)
+
+
+class RenderedHtmlFieldProxyModel(RenderedHtmlFieldModel):
+    class Meta:
+        proxy = True
+
+
+class RenderedHtmlFieldChildModel(RenderedHtmlFieldModel):
+    title = models.CharField(max_length=100, blank=True)
+
+
 class AbstractImageFieldModel(models.Model):
     image = ImageRefField(null=True, blank=True, on_delete=models.SET_NULL)
 